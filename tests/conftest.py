@@ -1,34 +1,33 @@
 import pytest
 import os
 import sys
-import tempfile
 
-# Add the project root to the path so we can import todo_app
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# The app package uses top-level imports ('from app import db', 'from config import config'),
+# so todo_app/ itself has to be on the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "todo_app")))
 
-from todo_app.app import app, init_db, get_db
+from app import create_app, db
 
 
 @pytest.fixture
-def client():
-    db_fd, db_path = tempfile.mkstemp()
-    app.config["TESTING"] = True
-    app.config["DATABASE"] = db_path
+def app():
+    app = create_app("testing")
 
-    # Override the DATABASE global in app.py for the duration of the test
-    # This is a bit hacky because app.py uses a global variable for the DB path
-    # A better approach in app.py would be to use app.config['DATABASE']
-    import todo_app.app
+    with app.app_context():
+        db.create_all()
 
-    todo_app.app.DATABASE = db_path
+    # Requests push their own app context (fresh session and flask-login user)
+    yield app
 
-    with app.test_client() as client:
-        with app.app_context():
-            init_db()
-        yield client
+    with app.app_context():
+        db.drop_all()
 
-    os.close(db_fd)
-    os.unlink(db_path)
+
+@pytest.fixture
+def client(app):
+    # Not a context manager: a preserved request context would be reused by
+    # the next client's requests, flask-login user included
+    return app.test_client()
 
 
 @pytest.fixture
@@ -44,3 +43,19 @@ def auth_client(client):
     )
     client.post("/login", data={"username": "testuser", "password": "password123"})
     return client
+
+
+@pytest.fixture
+def other_client(app, auth_client):
+    # A second user (registered after testuser), for sharing and visibility tests
+    client = app.test_client()
+    client.post(
+        "/register",
+        data={
+            "username": "otheruser",
+            "email": "other@example.com",
+            "password": "password123",
+        },
+    )
+    client.post("/login", data={"username": "otheruser", "password": "password123"})
+    return client
@@ -0,0 +1,233 @@
+from datetime import datetime
+
+from app import db
+from app.api.events import apply_range_filter
+from app.models.event import Event
+from app.services.access import visible_query
+
+
+def create_event(client, **data):
+    response = client.post("/api/events", json={"title": "Planning", "start": "2030-01-06T09:00",
+                                                "end": "2030-01-06T10:00", **data})
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def test_update_event_rejects_stale_version(auth_client):
+    event_id = create_event(auth_client)
+    etag = auth_client.get(f"/api/events/{event_id}").headers["ETag"]
+
+    # Moving keeps the duration
+    response = auth_client.put(f"/api/events/{event_id}", json={"start": "2030-01-07T09:00"},
+                               headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.json["end"] == "2030-01-07T10:00:00"
+    assert response.headers["ETag"] != etag
+
+    response = auth_client.put(f"/api/events/{event_id}", json={"title": "Lost update"},
+                               headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert response.json["event"]["title"] == "Planning"
+
+
+def test_move_events_is_all_or_nothing(auth_client):
+    first = create_event(auth_client)
+    second = create_event(auth_client, rrule="FREQ=DAILY;COUNT=3")
+
+    response = auth_client.post("/api/events/move", json={
+        "delta_minutes": 30, "events": [{"id": first}, {"id": second, "version": 99}]})
+    assert response.status_code == 412
+    assert auth_client.get(f"/api/events/{first}").json["start"] == "2030-01-06T09:00:00"
+
+    response = auth_client.post("/api/events/move", json={
+        "delta_minutes": 30, "events": [{"id": first}, {"id": second, "version": 1}]})
+    assert response.status_code == 200
+    assert [e["start"] for e in response.json["events"]] == ["2030-01-06T09:30:00"] * 2
+
+
+def test_free_busy_merges_overlapping_events(auth_client):
+    create_event(auth_client, start="2030-01-07T09:00", end="2030-01-07T10:00")
+    create_event(auth_client, start="2030-01-07T09:30", end="2030-01-07T11:00")
+    # No end: counts as the default length (30 minutes)
+    create_event(auth_client, start="2030-01-07T14:00", end=None)
+    standup = create_event(auth_client, start="2030-01-01T08:00", end="2030-01-01T08:15", rrule="FREQ=DAILY")
+    auth_client.post(f"/api/events/{standup}/exceptions", json={"original_start": "2030-01-07T08:00",
+                                                                "cancelled": True})
+
+    response = auth_client.get("/api/freebusy?start=2030-01-07T00:00&end=2030-01-08T00:00&min_minutes=60")
+    assert response.status_code == 200
+    (busy,) = response.json["busy"].values()
+    assert [(b["start"][11:16], b["end"][11:16]) for b in busy] == [("09:00", "11:00"), ("14:00", "14:30")]
+    assert [(f["start"][11:16], f["end"][11:16]) for f in response.json["free"]] == [
+        ("00:00", "09:00"), ("11:00", "14:00"), ("14:30", "00:00")]
+
+
+def test_free_busy_is_limited_to_collaborators(auth_client):
+    response = auth_client.get("/api/freebusy?users=2&start=2030-01-07&end=2030-01-08")
+    assert response.status_code == 403
+
+
+def test_update_event_rejects_malformed_versions(auth_client):
+    event_id = create_event(auth_client)
+
+    for version in ([1], {}, True, 1.5, "one"):
+        response = auth_client.put(f"/api/events/{event_id}", json={"title": "Nope", "version": version})
+        assert response.status_code == 400
+    response = auth_client.put(f"/api/events/{event_id}", json={"title": "Nope"}, headers={"If-Match": '"abc"'})
+    assert response.status_code == 400
+
+    response = auth_client.put(f"/api/events/{event_id}", json={"title": "Renamed"}, headers={"If-Match": 'W/"1"'})
+    assert response.status_code == 200
+    assert auth_client.get(f"/api/events/{event_id}").json["title"] == "Renamed"
+
+
+def test_title_only_update_keeps_a_recurring_series_in_place(auth_client):
+    weekly = create_event(auth_client, start="2025-01-06T09:00", end="2025-01-06T10:00", rrule="FREQ=WEEKLY")
+
+    # What the calendar sends when an occurrence in March is renamed
+    response = auth_client.put(f"/api/events/{weekly}", json={"title": "Weekly sync", "version": 1})
+    assert response.status_code == 200
+    assert response.json["start"] == "2025-01-06T09:00:00"
+    assert response.json["end"] == "2025-01-06T10:00:00"
+
+    january = auth_client.get("/api/events?start=2025-01-01&end=2025-02-01").json
+    assert [e["start"][:10] for e in january] == ["2025-01-06", "2025-01-13", "2025-01-20", "2025-01-27"]
+    assert {e["title"] for e in january} == {"Weekly sync"}
+
+    # Editing one occurrence's times goes through an exception instead
+    response = auth_client.post(f"/api/events/{weekly}/exceptions", json={
+        "original_start": "2025-03-03T09:00", "start": "2025-03-04T14:00", "end": "2025-03-04T15:00",
+        "title": "Moved sync"})
+    assert response.status_code == 201
+    march = auth_client.get("/api/events?start=2025-03-01&end=2025-03-11").json
+    assert [(e["start"], e["title"], e["recurrence_id"]) for e in march] == [
+        ("2025-03-04T14:00:00", "Moved sync", "2025-03-03T09:00:00"),
+        ("2025-03-10T09:00:00", "Weekly sync", "2025-03-10T09:00:00")]
+    assert auth_client.get(f"/api/events/{weekly}").json["start"] == "2025-01-06T09:00:00"
+
+
+def titles_in(client, start, end):
+    response = client.get(f"/api/events?start={start}&end={end}")
+    assert response.status_code == 200
+    return [e["title"] for e in response.json]
+
+
+def test_range_filter_keeps_events_overlapping_the_window(auth_client):
+    for title, start, end in [
+        ("Ends at window start", "2030-03-01T08:00", "2030-03-02T00:00"),
+        ("Straddles start", "2030-03-01T22:00", "2030-03-02T01:00"),
+        ("Instant at start", "2030-03-02T00:00", None),
+        ("Inside", "2030-03-02T12:00", "2030-03-02T13:00"),
+        ("Spans the window", "2030-03-01T00:00", "2030-03-04T00:00"),
+        ("Straddles end", "2030-03-02T23:00", "2030-03-03T01:00"),
+        ("Starts at window end", "2030-03-03T00:00", "2030-03-03T01:00"),
+    ]:
+        create_event(auth_client, title=title, start=start, end=end)
+
+    assert titles_in(auth_client, "2030-03-02", "2030-03-03") == [
+        "Spans the window", "Straddles start", "Instant at start", "Inside", "Straddles end"]
+    # Offsets are dropped, not converted: the bounds are wall-clock times
+    assert titles_in(auth_client, "2030-03-02T00:00%2B05:00", "2030-03-02T12:00%2B05:00") == [
+        "Spans the window", "Straddles start", "Instant at start"]
+
+    assert auth_client.get("/api/events?start=2030-03-03&end=2030-03-02").status_code == 400
+    assert auth_client.get("/api/events?start=March").status_code == 400
+
+
+def test_range_filter_with_one_bound(app, auth_client):
+    create_event(auth_client, title="Early", start="2030-03-01T09:00", end="2030-03-01T10:00")
+    create_event(auth_client, title="Late", start="2030-03-05T09:00", end="2030-03-05T10:00")
+    create_event(auth_client, title="Finished series", start="2030-01-01T09:00", end="2030-01-01T10:00",
+                 rrule="FREQ=DAILY;COUNT=3")
+    create_event(auth_client, title="Open series", start="2030-01-01T09:00", end="2030-01-01T10:00",
+                 rrule="FREQ=DAILY")
+
+    with app.app_context():
+        def titles(start, end):
+            query = apply_range_filter(visible_query(Event, 1), start, end)
+            return sorted(e.title for e, _ in query.all())
+
+        assert titles(datetime(2030, 3, 2), None) == ["Late", "Open series"]
+        assert titles(None, datetime(2030, 3, 2)) == ["Early", "Finished series", "Open series"]
+        assert titles(None, None) == ["Early", "Finished series", "Late", "Open series"]
+        db.session.remove()
+
+
+def test_range_expands_series_that_started_before_it(auth_client):
+    weekly = create_event(auth_client, title="Weekly", start="2029-12-03T09:00", end="2029-12-03T10:00",
+                          rrule="FREQ=WEEKLY;BYDAY=MO,TH")
+    create_event(auth_client, title="Done", start="2029-12-03T09:00", end="2029-12-03T10:00",
+                 rrule="FREQ=DAILY;UNTIL=20291210")
+    # Runs over midnight into the window
+    create_event(auth_client, title="Night shift", start="2029-12-01T22:00", end="2029-12-02T02:00",
+                 rrule="FREQ=DAILY")
+
+    auth_client.post(f"/api/events/{weekly}/exceptions", json={"original_start": "2030-03-07T09:00",
+                                                               "cancelled": True})
+    auth_client.post(f"/api/events/{weekly}/exceptions", json={"original_start": "2030-03-11T09:00",
+                                                               "start": "2030-03-11T15:00", "title": "Moved"})
+
+    events = auth_client.get("/api/events?start=2030-03-04&end=2030-03-12").json
+    weekly_starts = [(e["start"], e["title"]) for e in events if e["id"] == weekly]
+    assert weekly_starts == [("2030-03-04T09:00:00", "Weekly"), ("2030-03-11T15:00:00", "Moved")]
+    assert all(e["title"] != "Done" for e in events)
+
+    nights = [e for e in events if e["title"] == "Night shift"]
+    assert nights[0]["start"] == "2030-03-03T22:00:00"
+    assert nights[0]["recurrence_id"] == "2030-03-03T22:00:00"
+    assert len(nights) == 9
+
+    # Without a closed window the series comes back unexpanded, with its exceptions
+    (series,) = [e for e in auth_client.get("/api/events?start=2030-03-04").json if e["id"] == weekly]
+    assert series["rrule"] == "FREQ=WEEKLY;BYDAY=MO,TH"
+    assert [(x["original_start"], x["cancelled"]) for x in series["exceptions"]] == [
+        ("2030-03-07T09:00:00", True), ("2030-03-11T09:00:00", False)]
+
+
+def test_exceptions_must_name_an_occurrence(auth_client):
+    daily = create_event(auth_client, rrule="FREQ=DAILY;COUNT=3")
+    single = create_event(auth_client)
+
+    response = auth_client.post(f"/api/events/{daily}/exceptions", json={"original_start": "2030-01-06T10:00"})
+    assert response.status_code == 400
+    response = auth_client.post(f"/api/events/{daily}/exceptions", json={"original_start": "2030-01-09T09:00"})
+    assert response.status_code == 400
+    response = auth_client.post(f"/api/events/{single}/exceptions", json={"original_start": "2030-01-06T09:00"})
+    assert response.status_code == 400
+
+    exception = auth_client.post(f"/api/events/{daily}/exceptions", json={
+        "original_start": "2030-01-07T09:00", "cancelled": True}).json
+    assert titles_in(auth_client, "2030-01-01", "2030-02-01") == ["Planning", "Planning", "Planning"]
+    assert auth_client.delete(f"/api/events/{daily}/exceptions/{exception['id']}").status_code == 200
+    assert titles_in(auth_client, "2030-01-01", "2030-02-01") == ["Planning"] * 4
+
+
+def test_reminder_must_be_a_non_negative_number_of_minutes(auth_client):
+    event_id = create_event(auth_client, reminder="15")
+    assert auth_client.get(f"/api/events/{event_id}").json["reminder"] == 15
+
+    for reminder in ("soon", -5, "-5", 1.5, True, [15]):
+        response = auth_client.post("/api/events", json={"title": "Nope", "start": "2030-01-06T09:00",
+                                                         "reminder": reminder})
+        assert response.status_code == 400
+        response = auth_client.put(f"/api/events/{event_id}", json={"reminder": reminder})
+        assert response.status_code == 400
+    assert auth_client.get(f"/api/events/{event_id}").json["reminder"] == 15
+
+    response = auth_client.put(f"/api/events/{event_id}", json={"reminder": "30"})
+    assert response.json["reminder"] == 30
+
+
+def test_exceptions_of_hidden_events_are_not_found(auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+    viewed = create_event(other_client, rrule="FREQ=DAILY")
+    hidden = create_event(other_client, rrule="FREQ=DAILY")
+    other_client.post("/api/share", json={"item_type": "event", "item_id": viewed, "shared_with_id": my_id})
+    exception = other_client.post(f"/api/events/{hidden}/exceptions", json={
+        "original_start": "2030-01-07T09:00", "cancelled": True}).json
+
+    body = {"original_start": "2030-01-08T09:00", "cancelled": True}
+    assert auth_client.post(f"/api/events/{viewed}/exceptions", json=body).status_code == 403
+    assert auth_client.post(f"/api/events/{hidden}/exceptions", json=body).status_code == 404
+    assert auth_client.post("/api/events/999/exceptions", json=body).status_code == 404
+    assert auth_client.delete(f"/api/events/{hidden}/exceptions/{exception['id']}").status_code == 404
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from app import db
+from app.models.notification import Notification
+from app.services.notifications import insert_notifications
+from app.services.pubsub import Broker, Subscription
+
+
+def notify(app, count, user_id=1):
+    with app.app_context():
+        notifications = [Notification(user_id=user_id, message=f"Message {i}") for i in range(count)]
+        db.session.add_all(notifications)
+        db.session.commit()
+        return [n.id for n in notifications]
+
+
+def test_notifications_are_paged_by_default(app, auth_client):
+    app.config["NOTIFICATIONS_PAGE_SIZE"] = 3
+    ids = notify(app, 5)
+
+    response = auth_client.get("/api/notifications")
+    assert [n["id"] for n in response.json] == ids[:-4:-1]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = auth_client.get("/api/notifications", query_string={"cursor": cursor})
+    assert [n["id"] for n in response.json] == ids[1::-1]
+    assert "X-Next-Cursor" not in response.headers
+
+    assert len(auth_client.get("/api/notifications?limit=5").json) == 5
+    assert auth_client.get("/api/notifications/unread-count").json == {"unread": 5}
+
+
+def test_stream_replays_the_whole_backlog(app, auth_client):
+    # Smaller batches than the backlog, and a stream that ends right away
+    app.config.update(PUBSUB_QUEUE_SIZE=2, SSE_KEEPALIVE=0.01, SSE_MAX_DURATION=0.05)
+    ids = notify(app, 5)
+
+    response = auth_client.get("/api/notifications/stream", headers={"Last-Event-ID": str(ids[0])})
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert [int(i) for i in re.findall(r"^id: (\d+)$", body, re.M)] == ids[1:]
+    assert ": keepalive" in body
+
+    # Without Last-Event-ID only new notifications are sent
+    body = auth_client.get("/api/notifications/stream").get_data(as_text=True)
+    assert "event: notification" not in body
+
+
+def test_brokers_must_implement_the_interface():
+    class Incomplete(Broker):
+        def publish(self, channel, message):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(None)
+    with pytest.raises(TypeError):
+        Subscription()
+
+
+def unread(client):
+    return client.get("/api/notifications/unread-count").json["unread"]
+
+
+def test_unread_counter_follows_inserts_and_reads(app, auth_client):
+    first, second, third = notify(app, 3)
+    assert unread(auth_client) == 3
+    with app.app_context():
+        insert_notifications([{"user_id": 1, "message": "Bulk"}, {"user_id": 1, "message": "Read", "is_read": True}])
+        db.session.commit()
+    assert unread(auth_client) == 4
+
+    assert auth_client.put(f"/api/notifications/{first}/read").status_code == 200
+    assert unread(auth_client) == 3
+    # Marking it again doesn't count twice
+    auth_client.put(f"/api/notifications/{first}/read")
+    assert unread(auth_client) == 3
+
+    response = auth_client.put("/api/notifications/read", json={"ids": [first, second, third]})
+    assert response.json == {"marked": 2, "unread": 1}
+    response = auth_client.put("/api/notifications/read", json={"all": True})
+    assert response.json == {"marked": 1, "unread": 0}
+    assert auth_client.get("/api/notifications?unread=true").json == []
+    assert auth_client.put("/api/notifications/read", json={}).status_code == 400
+    for body in ({"task_id": [1]}, {"task_id": "1"}, {"ids": [[1]]}, {"before": 5}):
+        assert auth_client.put("/api/notifications/read", json=body).status_code == 400
@@ -0,0 +1,239 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.comment import Comment
+from app.models.event import Event
+from app.models.shared import SharedItem
+from app.models.task import Task
+from app.models.user import User
+from app.services.mentions import resolve_usernames
+
+
+@contextmanager
+def count_queries(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def share_items_from_new_owners(app, count, offset):
+    """Create ``count`` users, each sharing one task and one event with testuser."""
+    with app.app_context():
+        me = User.query.filter_by(username="testuser").first()
+        for i in range(offset, offset + count):
+            owner = User(username=f"owner{i}", email=f"owner{i}@example.com")
+            db.session.add(owner)
+            db.session.flush()
+
+            task = Task(title=f"Task {i}", user_id=owner.id)
+            ev = Event(title=f"Event {i}", start_date=datetime(2025, 1, 1), user_id=owner.id)
+            db.session.add_all([task, ev])
+            db.session.flush()
+
+            db.session.add_all([
+                SharedItem(item_type="todo", item_id=task.id, owner_id=owner.id, shared_with_id=me.id),
+                SharedItem(item_type="event", item_id=ev.id, owner_id=owner.id, shared_with_id=me.id),
+            ])
+        db.session.commit()
+
+
+def queries_for(app, client, url):
+    with count_queries(app) as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements), response.json
+
+
+def test_task_listing_query_count_is_constant(app, auth_client):
+    share_items_from_new_owners(app, 2, 0)
+    few, data = queries_for(app, auth_client, "/api/tasks")
+    assert len(data) == 2
+
+    share_items_from_new_owners(app, 10, 2)
+    many, data = queries_for(app, auth_client, "/api/tasks")
+    assert len(data) == 12
+    assert {t["owner_name"] for t in data} == {f"owner{i}" for i in range(12)}
+
+    assert many == few
+
+
+def test_event_listing_query_count_is_constant(app, auth_client):
+    share_items_from_new_owners(app, 2, 0)
+    few, data = queries_for(app, auth_client, "/api/events")
+    assert len(data) == 2
+
+    share_items_from_new_owners(app, 10, 2)
+    many, data = queries_for(app, auth_client, "/api/events")
+    assert len(data) == 12
+    assert {e["owner_name"] for e in data} == {f"owner{i}" for i in range(12)}
+
+    assert many == few
+
+
+def test_comment_mentions_are_resolved_in_one_query(app, auth_client):
+    with app.app_context():
+        me = User.query.filter_by(username="testuser").first()
+        db.session.add_all([User(username=f"friend{i}", email=f"friend{i}@example.com") for i in range(20)])
+        task = Task(title="Mentions", user_id=me.id)
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+    content = " ".join(f"@friend{i}" for i in range(20)) + " @nobody @testuser"
+    with count_queries(app) as statements:
+        response = auth_client.post(f"/api/tasks/{task_id}/comments", json={"content": content})
+    assert response.status_code == 201
+
+    user_lookups = [s for s in statements if s.startswith("SELECT users.username")]
+    notification_inserts = [s for s in statements if s.startswith("INSERT INTO notifications")]
+    assert len(user_lookups) == 1
+    assert len(notification_inserts) == 1
+
+    with app.app_context():
+        friend = User.query.filter_by(username="friend3").first()
+        assert friend.unread_notifications == 1
+        assert User.query.filter_by(username="testuser").first().unread_notifications == 0
+
+
+def test_username_cache_is_per_app(app):
+    other = create_app("testing")
+    for application, names in ((app, ["alice", "bob"]), (other, ["bob", "alice"])):
+        with application.app_context():
+            db.create_all()
+            db.session.add_all([User(username=name, email=f"{name}@example.com") for name in names])
+            db.session.commit()
+
+    with app.app_context():
+        assert resolve_usernames(["alice", "bob"]) == {"alice": 1, "bob": 2}
+    # Same names, other database: the first app's ids must not leak in
+    with other.app_context():
+        assert resolve_usernames(["alice", "bob"]) == {"alice": 2, "bob": 1}
+        db.drop_all()
+
+
+def test_username_cache_hits_skip_the_query_and_renames_evict(app):
+    with app.app_context():
+        db.session.add_all([User(username=name, email=f"{name}@example.com") for name in ("alice", "bob")])
+        db.session.commit()
+        assert resolve_usernames(["alice", "bob"]) == {"alice": 1, "bob": 2}
+
+    with count_queries(app) as statements, app.app_context():
+        assert resolve_usernames(["alice", "bob"]) == {"alice": 1, "bob": 2}
+    assert statements == []
+
+    with app.app_context():
+        alice = User.query.filter_by(username="alice").one()
+        alice.username = "carol"
+        db.session.commit()
+        # The old name is free again and the new one resolves
+        assert resolve_usernames(["alice", "carol", "bob"]) == {"carol": 1, "bob": 2}
+        db.session.add(User(username="alice", email="new-alice@example.com"))
+        db.session.commit()
+        assert resolve_usernames(["alice"]) == {"alice": 3}
+
+def test_comment_listing_query_count_is_constant(app, auth_client):
+    with app.app_context():
+        me = User.query.filter_by(username="testuser").first()
+        task = Task(title="Busy", user_id=me.id)
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+    def add_comments(count, offset):
+        with app.app_context():
+            for i in range(offset, offset + count):
+                author = User(username=f"author{i}", email=f"author{i}@example.com")
+                db.session.add(author)
+                db.session.flush()
+                db.session.add(Comment(content=f"Comment {i}", user_id=author.id, task_id=task_id))
+            db.session.commit()
+
+    add_comments(2, 0)
+    few, data = queries_for(app, auth_client, f"/api/tasks/{task_id}/comments")
+    assert len(data) == 2
+
+    add_comments(10, 2)
+    many, data = queries_for(app, auth_client, f"/api/tasks/{task_id}/comments")
+    assert len(data) == 12
+    assert {c["user"]["username"] for c in data} == {f"author{i}" for i in range(12)}
+
+    assert many == few
+
+
+def test_task_subtree_query_count_is_constant(app, auth_client):
+    with app.app_context():
+        me = User.query.filter_by(username="testuser").first()
+        root = Task(title="Root", user_id=me.id)
+        db.session.add(root)
+        db.session.flush()
+        root_id = root.id
+        parents = [root]
+        for depth in range(4):
+            children = [Task(title=f"Task {depth}", user_id=me.id, parent_id=p.id) for p in parents for _ in range(3)]
+            db.session.add_all(children)
+            db.session.flush()
+            parents = children
+        db.session.commit()
+
+    shallow, data = queries_for(app, auth_client, f"/api/tasks/{root_id}/subtree?max_depth=1")
+    deep, data = queries_for(app, auth_client, f"/api/tasks/{root_id}/subtree")
+
+    assert len(data["subtasks"]) == 3
+    assert len(data["subtasks"][0]["subtasks"][0]["subtasks"][0]["subtasks"]) == 3
+    assert deep == shallow
+
+
+def test_custom_field_batch_query_count_is_constant(app, auth_client):
+    points = auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"}).json["id"]
+    task_ids = [auth_client.post("/api/tasks", json={"title": f"Task {i}"}).json["id"] for i in range(12)]
+
+    def batch(ids, value):
+        with count_queries(app) as statements:
+            response = auth_client.post("/api/custom-fields/values/batch", json={
+                "values": [{"task_id": task_id, "definition_id": points, "value": value} for task_id in ids]
+            })
+        assert response.status_code == 200
+        assert {r["status"] for r in response.json["results"]} == {200}
+        return len(statements)
+
+    # Inserts (after one that fills the definition cache), then updates of the same rows
+    batch(task_ids[:1], 1)
+    assert batch(task_ids[1:3], 1) == batch(task_ids[3:], 1)
+    assert batch(task_ids[1:3], 2) == batch(task_ids[3:], 2)
+
+    few, _ = queries_for(app, auth_client, f"/api/custom-fields/values?task_ids={','.join(map(str, task_ids[:2]))}")
+    many, data = queries_for(app, auth_client, f"/api/custom-fields/values?task_ids={','.join(map(str, task_ids))}")
+    assert few == many
+    assert len(data["definitions"]) == 1
+    assert data["values"][str(task_ids[-1])][0]["value"] == "2"
+
+
+def test_custom_field_definitions_are_cached_until_changed(app, auth_client):
+    auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"})
+    cold, _ = queries_for(app, auth_client, "/api/custom-fields/definitions")
+    warm, data = queries_for(app, auth_client, "/api/custom-fields/definitions")
+    assert warm == cold - 1
+    assert [d["name"] for d in data] == ["Points"]
+
+    auth_client.post("/api/custom-fields/definitions", json={"name": "Size", "field_type": "select", "options": ["S", "M"]})
+    count, data = queries_for(app, auth_client, "/api/custom-fields/definitions")
+    assert count == cold
+    assert [d["name"] for d in data] == ["Points", "Size"]
+
+    # Process-wide numbers, hidden unless enabled
+    assert auth_client.get("/api/custom-fields/cache").status_code == 404
+    app.config["CACHE_STATS_ENABLED"] = True
+    stats = auth_client.get("/api/custom-fields/cache").json
+    assert (stats["hits"], stats["misses"]) == (1, 2)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.recurrence import RecurrenceError, expand, parse_rrule, series_end
+
+HOUR = timedelta(hours=1)
+
+
+def test_weekly_byday_with_count_starts_counting_at_dtstart():
+    # 2025-01-01 is a Wednesday, so Monday 2024-12-30 is not an occurrence
+    starts = expand("FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=4", datetime(2025, 1, 1, 9), HOUR,
+                    datetime(2024, 12, 1), datetime(2025, 2, 1), 100)
+    assert [s.day for s in starts] == [1, 3, 6, 8]
+
+
+def test_distant_window_and_limit():
+    starts = expand("FREQ=DAILY;INTERVAL=2", datetime(1990, 1, 1, 9), HOUR,
+                    datetime(2025, 3, 1), datetime(2025, 4, 1), 5)
+    assert len(starts) == 5
+    assert all((s - datetime(1990, 1, 1, 9)).days % 2 == 0 for s in starts)
+
+
+def test_monthly_skips_short_months():
+    starts = expand("FREQ=MONTHLY", datetime(2025, 1, 31), HOUR,
+                    datetime(2025, 1, 1), datetime(2025, 6, 1), 100)
+    assert [s.month for s in starts] == [1, 3, 5]
+
+
+def test_occurrence_overlapping_window_start_is_included():
+    starts = expand("FREQ=WEEKLY", datetime(2025, 1, 1, 22), timedelta(hours=4),
+                    datetime(2025, 1, 9), datetime(2025, 1, 10), 100)
+    assert starts == (datetime(2025, 1, 8, 22),)
+
+
+def test_series_end():
+    assert series_end("FREQ=DAILY;COUNT=3", datetime(2025, 1, 1, 9), HOUR) == datetime(2025, 1, 3, 10)
+    assert series_end("FREQ=DAILY", datetime(2025, 1, 1, 9), HOUR) is None
+
+
+@pytest.mark.parametrize("rule", ["FREQ=HOURLY", "FREQ=DAILY;COUNT=0", "FREQ=MONTHLY;BYDAY=MO",
+                                  "FREQ=DAILY;BYSETPOS=1", "FREQ=DAILY;COUNT=2;UNTIL=20250101"])
+def test_unsupported_rules_are_rejected(rule):
+    with pytest.raises(RecurrenceError):
+        parse_rrule(rule)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.event import Event
+from app.models.notification import Notification
+from app.models.user import User
+from app.services import reminders
+from app.services.reminders import ReminderScheduler
+
+
+def test_scheduler_fires_due_reminders_and_advances_recurring_events(app, auth_client):
+    now = datetime.utcnow().replace(microsecond=0)
+    for title, start, reminder, rrule in [
+        ("Soon", now + timedelta(minutes=10), 15, None),
+        ("Standup", now + timedelta(minutes=20), 30, "FREQ=DAILY;COUNT=2"),
+        ("Next week", now + timedelta(days=7), 15, None),
+        ("No reminder", now + timedelta(minutes=5), 0, None),
+    ]:
+        response = auth_client.post("/api/events", json={
+            "title": title, "start": start.isoformat(), "reminder": reminder, "rrule": rrule})
+        assert response.status_code == 201
+
+    with app.app_context():
+        scheduler = ReminderScheduler(app)
+        assert scheduler.tick(now) == 2
+        assert {n.message.split("'")[1] for n in Notification.query.all()} == {"Soon", "Standup"}
+        assert User.query.filter_by(username="testuser").first().unread_notifications == 2
+
+        remind_at = {e.title: e.remind_at for e in Event.query.all()}
+        assert remind_at["Soon"] is None
+        assert remind_at["Standup"] == now + timedelta(days=1, minutes=-10)
+        assert remind_at["No reminder"] is None
+
+        # Nothing is fired twice
+        assert scheduler.tick(now + timedelta(minutes=1)) == 0
+        assert scheduler.tick(now + timedelta(days=1)) == 1
+        db.session.remove()
+
+
+def test_reminders_edited_while_firing_are_not_sent(app, auth_client, monkeypatch):
+    now = datetime.utcnow().replace(microsecond=0)
+    for title in ("Kept", "Edited"):
+        auth_client.post("/api/events", json={
+            "title": title, "start": (now + timedelta(minutes=10)).isoformat(), "reminder": 15})
+
+    with app.app_context():
+        edited = Event.query.filter_by(title="Edited").one()
+        moved = now + timedelta(hours=1)
+        next_remind_at = reminders.next_remind_at
+
+        def edit_meanwhile(event, after):
+            # Another writer moves the reminder between the read and the claim
+            if event.id == edited.id:
+                db.session.connection().execute(
+                    Event.__table__.update().where(Event.__table__.c.id == edited.id).values(remind_at=moved))
+            return next_remind_at(event, after)
+
+        monkeypatch.setattr(reminders, "next_remind_at", edit_meanwhile)
+        assert ReminderScheduler(app).tick(now) == 1
+        assert [n.message.split("'")[1] for n in Notification.query.all()] == ["Kept"]
+        db.session.expire_all()
+        assert db.session.get(Event, edited.id).remind_at == moved
+        db.session.remove()
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.task import Task
+from app.services.pagination import encode_cursor
+from test_tasks import create_task
+
+
+def sync(client, since=None):
+    response = client.get("/api/sync", query_string={"cursor": encode_cursor([since])} if since else {})
+    assert response.status_code == 200
+    return response.json
+
+
+def test_sync_returns_changes_after_the_cursor(app, auth_client):
+    old = create_task(auth_client, "Old")
+    with app.app_context():
+        db.session.get(Task, old).updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+    new = create_task(auth_client, "New")
+
+    snapshot = sync(auth_client)
+    assert sorted(t["id"] for t in snapshot["tasks"]) == [old, new]
+    assert snapshot["deleted"] == []
+    assert snapshot["cursor"]
+
+    delta = sync(auth_client, datetime.utcnow() - timedelta(minutes=30))
+    assert [t["id"] for t in delta["tasks"]] == [new]
+    assert delta["tasks"][0]["access_type"] == "owner"
+
+    # The returned cursor round-trips
+    assert auth_client.get("/api/sync", query_string={"cursor": snapshot["cursor"]}).status_code == 200
+
+
+def test_deletes_and_unshares_leave_tombstones(auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+    mine = create_task(auth_client, "Mine")
+    theirs = create_task(other_client, "Theirs")
+    other_client.post("/api/share", json={"item_type": "task", "item_id": theirs, "shared_with_id": my_id})
+    since = datetime.utcnow() - timedelta(seconds=1)
+    assert [t["id"] for t in sync(auth_client, since)["tasks"]] == [mine, theirs]
+
+    assert auth_client.delete(f"/api/tasks/{mine}").status_code == 200
+    share_id = other_client.get(f"/api/shared/todo/{theirs}").json[0]["id"]
+    assert other_client.delete(f"/api/share/{share_id}").status_code == 200
+
+    delta = sync(auth_client, since)
+    assert delta["tasks"] == []
+    deleted = {(d["item_type"], d["item_id"]) for d in delta["deleted"]}
+    assert deleted == {("todo", mine), ("todo", theirs), ("share", share_id)}
+
+    # The owner keeps the task and only drops the share
+    delta = sync(other_client, since)
+    assert [d["item_type"] for d in delta["deleted"]] == ["share"]
+    assert [t["id"] for t in delta["tasks"]] == [theirs]
+
+    # A cursor from long ago still gets every tombstone since then
+    stale = sync(auth_client, datetime(2000, 1, 1))
+    assert {(d["item_type"], d["item_id"]) for d in stale["deleted"]} == deleted
+
+
+def test_sync_rejects_invalid_cursors(auth_client):
+    for cursor in ("not-a-cursor", encode_cursor([5]), encode_cursor(["2030-01-01"])):
+        response = auth_client.get("/api/sync", query_string={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json["error"] == "Invalid cursor"
@@ -0,0 +1,549 @@
+import csv
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import pytest
+
+from app import create_app, db
+from app.api import custom_fields as custom_fields_api
+from app.models.custom_field import CustomFieldValue
+from app.models.project import ProjectStats
+from app.models.search import SearchPosting
+from app.models.task import Task
+from app.models.time import TimeEntry
+from app.services.dependencies import project_graph
+from app.services.ranking import rebalance_job, rebalance_siblings
+from app.services.time_reports import ReportRange, check_dialect, report_query
+
+
+def create_task(client, title, **data):
+    response = client.post("/api/tasks", json={"title": title, **data})
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def block(client, blocker_id, blocked_id):
+    return client.post(f"/api/tasks/{blocked_id}/dependencies", json={"blocker_id": blocker_id})
+
+
+def test_dependencies_reject_cycles_and_plan_project(auth_client):
+    project_id = auth_client.post("/api/projects", json={"title": "Launch"}).json["id"]
+    design, build, ship = (
+        create_task(auth_client, title, project_id=project_id, deadline=deadline)
+        for title, deadline in [("Design", "2030-01-05T00:00"), ("Build", "2030-01-20T00:00"),
+                                ("Ship", "2030-01-10T00:00")]
+    )
+    assert block(auth_client, design, build).status_code == 201
+    assert block(auth_client, build, ship).status_code == 201
+    assert block(auth_client, ship, design).status_code == 409
+
+    plan = auth_client.get(f"/api/projects/{project_id}/plan").json
+    assert plan["order"] == [design, build, ship]
+    assert plan["ready"] == [design]
+    # Ship can't finish before Build's later deadline
+    assert plan["critical_path"] == {"tasks": [design, build, ship], "length": 3, "finish": "2030-01-20T00:00:00"}
+
+    auth_client.put(f"/api/tasks/{design}", json={"status": "completed"})
+    assert auth_client.delete(f"/api/tasks/{ship}/dependencies/{build}").status_code == 200
+    plan = auth_client.get(f"/api/projects/{project_id}/plan").json
+    assert plan["ready"] == [build, ship]
+    assert plan["critical_path"]["tasks"] == [build]
+
+
+
+def test_dependency_graphs_are_cached_per_app(app, auth_client):
+    project_id = auth_client.post("/api/projects", json={"title": "Launch"}).json["id"]
+    design, build = (create_task(auth_client, title, project_id=project_id) for title in ("Design", "Build"))
+    block(auth_client, design, build)
+
+    with app.app_context():
+        graph = project_graph(project_id)
+        assert project_graph(project_id) is graph
+        assert app.extensions["dependency_graphs"].get(project_id)[1] is graph
+        db.session.remove()
+
+    # Same project id in another app's database: nothing carries over
+    other = create_app("testing")
+    with other.app_context():
+        db.create_all()
+        assert "dependency_graphs" not in other.extensions
+        assert project_graph(project_id).nodes == {}
+        db.drop_all()
+
+def test_moving_a_subtree_rewrites_paths_and_rejects_cycles(auth_client):
+    root = create_task(auth_client, "Root")
+    child = create_task(auth_client, "Child", parent_id=root)
+    grandchild = create_task(auth_client, "Grandchild", parent_id=str(child))
+    other = create_task(auth_client, "Other")
+
+    response = auth_client.put(f"/api/tasks/{root}", json={"parent_id": grandchild})
+    assert response.status_code == 400
+
+    assert auth_client.put(f"/api/tasks/{child}", json={"parent_id": other}).status_code == 200
+    response = auth_client.get(f"/api/tasks/{grandchild}/ancestors")
+    assert [a["id"] for a in response.json["ancestors"]] == [other, child]
+    assert auth_client.get(f"/api/tasks/{other}/ancestors").json["descendant_count"] == 2
+    assert auth_client.get(f"/api/tasks/{root}/ancestors").json["descendant_count"] == 0
+
+
+def test_move_task_between_siblings(auth_client):
+    first, second, third = (create_task(auth_client, title) for title in ("First", "Second", "Third"))
+
+    response = auth_client.post(f"/api/tasks/{third}/move", json={"after_id": first, "before_id": second})
+    assert response.status_code == 200
+    listing = auth_client.get("/api/tasks?sort=order&parent_id=none").json
+    assert [t["id"] for t in listing] == [first, third, second]
+
+    assert auth_client.post(f"/api/tasks/{first}/move", json={"after_id": second}).status_code == 200
+    listing = auth_client.get("/api/tasks?sort=order&parent_id=none").json
+    assert [t["id"] for t in listing] == [third, second, first]
+
+    response = auth_client.post(f"/api/tasks/{first}/move", json={"after_id": second, "before_id": third})
+    assert response.status_code == 400
+
+
+def test_project_summary_follows_task_writes(auth_client):
+    project_id = auth_client.post("/api/projects", json={"title": "Launch"}).json["id"]
+    late = create_task(auth_client, "Late", project_id=project_id, deadline="2000-01-01T00:00")
+    done = create_task(auth_client, "Done", project_id=project_id)
+    auth_client.put(f"/api/tasks/{done}", json={"status": "completed"})
+    auth_client.post(f"/api/tasks/{late}/time/start")
+    auth_client.post(f"/api/tasks/{late}/time/stop")
+
+    summary, = auth_client.get("/api/projects/summary").json
+    assert summary["task_count"] == 2
+    assert summary["status_counts"]["pending"] == 1
+    assert summary["status_counts"]["completed"] == 1
+    assert summary["overdue_count"] == 1
+    assert summary["completion_ratio"] == 0.5
+
+    # Its time entries go with it
+    assert auth_client.delete(f"/api/tasks/{late}").status_code == 200
+    summary, = auth_client.get("/api/projects/summary").json
+    assert summary["task_count"] == 1
+    assert summary["overdue_count"] == 0
+
+
+
+def test_project_summary_reads_do_not_write(app, auth_client):
+    project_id = auth_client.post("/api/projects", json={"title": "Launch"}).json["id"]
+    create_task(auth_client, "Design", project_id=project_id)
+    with app.app_context():
+        assert db.session.get(ProjectStats, project_id).task_count == 1
+        # A row lost some other way is computed on read, not stored
+        db.session.query(ProjectStats).delete()
+        db.session.commit()
+
+    summary, = auth_client.get("/api/projects/summary").json
+    assert summary["task_count"] == 1
+    with app.app_context():
+        assert db.session.query(ProjectStats).count() == 0
+        db.session.remove()
+
+def test_search_matches_tasks_comments_and_checklists(auth_client):
+    rocket = create_task(auth_client, "Launch rocket", description="Fuel the booster")
+    groceries = create_task(auth_client, "Buy groceries")
+    auth_client.post(f"/api/tasks/{groceries}/checklist", json={"content": "Rocket salad"})
+    auth_client.post(f"/api/tasks/{rocket}/comments", json={"content": "Start the countdown"})
+
+    def search(text):
+        return [t["id"] for t in auth_client.get("/api/search", query_string={"q": text}).json]
+
+    # Title matches rank above body matches; words match as prefixes
+    assert search("rocket") == [rocket, groceries]
+    assert search("count") == [rocket]
+    assert search("rocket salad") == [groceries]
+
+    auth_client.put(f"/api/tasks/{rocket}", json={"title": "Land shuttle"})
+    assert search("launch") == []
+    assert auth_client.delete(f"/api/tasks/{groceries}").status_code == 200
+    assert search("salad") == []
+
+
+
+def test_search_postings_fallback_intersects_in_sql(app, auth_client):
+    # As on databases without FTS5
+    with app.app_context():
+        app.extensions["search_backend"] = {str(db.engine.url): False}
+    rocket = create_task(auth_client, "Launch rocket", description="Fuel the booster")
+    groceries = create_task(auth_client, "Buy groceries")
+    auth_client.post(f"/api/tasks/{groceries}/checklist", json={"content": "Rocket salad"})
+    auth_client.post(f"/api/tasks/{rocket}/comments", json={"content": "Start the countdown"})
+    rockets = [create_task(auth_client, f"Rocket {i}") for i in range(3)]
+
+    def search(text, **args):
+        return auth_client.get("/api/search", query_string={"q": text, **args})
+
+    with app.app_context():
+        assert db.session.query(SearchPosting).count() > 0
+    assert [t["id"] for t in search("rocket").json] == [*reversed(rockets), rocket, groceries]
+    assert [t["id"] for t in search("count").json] == [rocket]
+    # Both words in one document, so the title "Launch rocket" doesn't match
+    assert [t["id"] for t in search("rocket salad").json] == [groceries]
+    assert [t["id"] for t in search("launch booster").json] == [rocket]
+
+    pages = []
+    response = search("rocket", limit=2)
+    while True:
+        pages.append([t["id"] for t in response.json])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = search("rocket", limit=2, cursor=cursor)
+    assert pages == [list(reversed(rockets))[:2], [rockets[0], rocket], [groceries]]
+
+def test_filter_and_sort_tasks_by_custom_field(auth_client):
+    points = auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"}).json["id"]
+    small, large, unset = (create_task(auth_client, title) for title in ("Small", "Large", "Unset"))
+    for task_id, value in [(small, 3), (large, "13")]:
+        response = auth_client.post(f"/api/tasks/{task_id}/custom-fields", json={"definition_id": points, "value": value})
+        assert response.status_code == 200
+    response = auth_client.post(f"/api/tasks/{unset}/custom-fields", json={"definition_id": points, "value": "many"})
+    assert response.status_code == 400
+
+    def ids(**args):
+        return [t["id"] for t in auth_client.get("/api/tasks", query_string=args).json]
+
+    # Compared as numbers, not text ("13" < "3")
+    assert ids(sort=f"field.{points}") == [small, large]
+    assert ids(sort=f"-field.{points}") == [large, small]
+    assert ids(**{f"field.{points}.gte": 5}) == [large]
+    assert ids(**{f"field.{points}.set": "false"}) == [unset]
+
+    stats = auth_client.get(f"/api/custom-fields/definitions/{points}/stats").json
+    assert (stats["count"], stats["sum"]) == (2, 16)
+
+
+def test_time_report_splits_entries_by_local_day(app, auth_client):
+    task_id = create_task(auth_client, "Design")
+    with app.app_context():
+        entry = TimeEntry(task_id=task_id, user_id=1, start_time=datetime(2026, 1, 10, 22, 30),
+                          end_time=datetime(2026, 1, 11, 0, 30), duration=7200)
+        db.session.add(entry)
+        db.session.commit()
+
+    # 23:30-01:30 in Berlin (UTC+1)
+    report = auth_client.get("/api/time/report", query_string={
+        "start": "2026-01-10", "end": "2026-01-11", "tz": "Europe/Berlin", "group_by": "task,day"}).json
+    assert [(row["day"], row["seconds"]) for row in report["rows"]] == [("2026-01-10", 1800), ("2026-01-11", 5400)]
+    assert report["total_seconds"] == 7200
+
+    response = auth_client.get("/api/time/report?start=2026-01-10&end=2026-01-10&format=csv")
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).splitlines() == [
+        "task_id,task_title,seconds,entries,running,hours", f"{task_id},Design,5400,1,0,1.5"]
+
+
+
+def test_time_report_caps_running_timers_and_seeks_the_range(app, auth_client):
+    task_id = create_task(auth_client, "Forgotten")
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.add(TimeEntry(task_id=task_id, user_id=1, start_time=now - timedelta(days=10)))
+        db.session.commit()
+
+    # A running timer counts up to TIME_ENTRY_MAX_HOURS, like it will when stopped
+    report = auth_client.get("/api/time/report", query_string={
+        "start": (now - timedelta(days=12)).date().isoformat(), "end": now.date().isoformat()}).json
+    assert [(row["seconds"], row["running"]) for row in report["rows"]] == [(168 * 3600, 1)]
+    assert auth_client.post(f"/api/tasks/{task_id}/time/stop").json["duration"] == 168 * 3600
+
+    # 92 days by day: one seek on start_time, then the matching entries joined to the days
+    with app.app_context():
+        query = report_query(1, ReportRange(date(2026, 1, 1), date(2026, 4, 2), ZoneInfo("UTC")), ["day"])
+        sql = str(query.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = [row[3] for row in db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        assert [step for step in plan if "time_entries" in step] == [
+            "SEARCH time_entries USING INDEX ix_time_entries_start_time (start_time>? AND start_time<?)"]
+        db.session.remove()
+
+def test_entries_longer_than_the_cap_are_clamped_for_reports(app, auth_client):
+    project_id = auth_client.post("/api/projects", json={"title": "Archive"}).json["id"]
+    task_id = create_task(auth_client, "Legacy", project_id=project_id)
+    with app.app_context():
+        # Stopped before stop_timer clamped entries: 10 days, and one without a duration
+        db.session.add_all([
+            TimeEntry(task_id=task_id, user_id=1, start_time=datetime(2026, 1, 1),
+                      end_time=datetime(2026, 1, 11), duration=10 * 86400),
+            TimeEntry(task_id=task_id, user_id=1, start_time=datetime(2026, 2, 1), end_time=datetime(2026, 2, 11)),
+            TimeEntry(task_id=task_id, user_id=1, start_time=datetime(2026, 3, 1),
+                      end_time=datetime(2026, 3, 1, 2), duration=7200),
+        ])
+        db.session.commit()
+
+    def seconds(start, end):
+        rows = auth_client.get("/api/time/report", query_string={"start": start, "end": end}).json["rows"]
+        return [row["seconds"] for row in rows]
+
+    # The seek only reaches back TIME_ENTRY_MAX_HOURS, so the tail on the 10th is missed
+    assert seconds("2026-01-10", "2026-01-10") == []
+
+    result = app.test_cli_runner().invoke(args=["time-clamp-entries"])
+    assert result.output == "Clamped 2 time entries\n"
+    with app.app_context():
+        entries = db.session.query(TimeEntry.end_time, TimeEntry.duration).order_by(TimeEntry.start_time).all()
+        assert entries == [(datetime(2026, 1, 8), 168 * 3600), (datetime(2026, 2, 8), 168 * 3600),
+                           (datetime(2026, 3, 1, 2), 7200)]
+        assert db.session.get(ProjectStats, project_id).tracked_seconds == 2 * 168 * 3600 + 7200
+    # Reports now agree with the stored entries
+    assert seconds("2026-01-07", "2026-01-10") == [86400]
+    assert seconds("2026-01-01", "2026-03-31") == [2 * 168 * 3600 + 7200]
+
+
+def test_reports_refuse_databases_they_are_not_compiled_for(app):
+    check_dialect(app)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "mssql+pyodbc://reports"
+    with pytest.raises(RuntimeError, match="support mysql, postgresql, sqlite databases, not mssql"):
+        check_dialect(app)
+
+
+def test_task_listing_pages_with_cursor(app, auth_client):
+    ids = [create_task(auth_client, f"Task {i}") for i in range(5)]
+
+    seen = []
+    cursor = None
+    while True:
+        response = auth_client.get("/api/tasks", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        assert len(response.json) <= 2
+        seen += [t["id"] for t in response.json]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    # Newest first, every task exactly once
+    assert seen == ids[::-1]
+
+    assert auth_client.get("/api/tasks?cursor=not-a-cursor").status_code == 400
+    # Well-formed base64, but not a cursor for this listing
+    assert auth_client.get("/api/tasks?cursor=WzFd").status_code == 400
+    assert auth_client.get("/api/tasks?limit=0").status_code == 400
+
+    app.config["API_MAX_PAGE_SIZE"] = 3
+    response = auth_client.get("/api/tasks?limit=100")
+    assert len(response.json) == 3
+    assert response.headers.get("X-Next-Cursor")
+
+
+def test_access_type_for_owned_and_shared_tasks(auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+
+    own = create_task(auth_client, "Mine")
+    viewed = create_task(other_client, "Viewed")
+    edited = create_task(other_client, "Edited")
+    hidden = create_task(other_client, "Hidden")
+    for task_id, permission in [(viewed, "view"), (edited, "edit")]:
+        response = other_client.post("/api/share", json={
+            "item_type": "task", "item_id": task_id, "shared_with_id": my_id, "permission": permission,
+        })
+        assert response.status_code == 200
+    # Sharing your own task with yourself must not list it twice
+    auth_client.post("/api/share", json={"item_type": "task", "item_id": own, "shared_with_id": my_id})
+
+    tasks = auth_client.get("/api/tasks").json
+    assert sorted((t["id"], t["access_type"]) for t in tasks) == [
+        (own, "owner"), (viewed, "view"), (edited, "edit")
+    ]
+
+    assert auth_client.put(f"/api/tasks/{viewed}", json={"title": "Nope"}).status_code == 403
+    assert auth_client.put(f"/api/tasks/{edited}", json={"title": "Edited too"}).status_code == 200
+    assert auth_client.post(f"/api/tasks/{viewed}/move", json={}).status_code == 403
+    for response in (
+        auth_client.get(f"/api/tasks/{hidden}/ancestors"),
+        auth_client.put(f"/api/tasks/{hidden}", json={"title": "Nope"}),
+        auth_client.post(f"/api/tasks/{hidden}/move", json={}),
+        auth_client.delete(f"/api/tasks/{hidden}"),
+    ):
+        assert response.status_code == 404
+
+
+def test_batch_mixes_operations_with_per_item_results(auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+    keep, remove = create_task(auth_client, "Keep"), create_task(auth_client, "Remove")
+    viewed, hidden = create_task(other_client, "Viewed"), create_task(other_client, "Hidden")
+    other_client.post("/api/share", json={"item_type": "task", "item_id": viewed, "shared_with_id": my_id})
+
+    response = auth_client.post("/api/tasks/batch", json={"operations": [
+        {"op": "create", "data": {"title": "New"}},
+        {"op": "update", "id": keep, "data": {"status": "completed"}},
+        {"op": "delete", "id": remove},
+        {"op": "create", "data": {}},
+        {"op": "update", "id": viewed, "data": {"title": "Nope"}},
+        {"op": "delete", "id": viewed},
+        {"op": "update", "id": hidden, "data": {"title": "Nope"}},
+        {"op": "delete", "id": remove},
+        {"op": "archive", "id": keep},
+    ]})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [r["status"] for r in results] == [201, 200, 200, 400, 403, 403, 404, 404, 400]
+    assert results[0]["task"]["title"] == "New"
+    assert results[1]["task"]["status"] == "completed"
+
+    titles = sorted(t["title"] for t in auth_client.get("/api/tasks").json)
+    assert titles == ["Keep", "New", "Viewed"]
+
+
+def test_batch_rejects_non_object_data_and_ranks_creates_in_order(auth_client):
+    create_task(auth_client, "Existing")
+
+    response = auth_client.post("/api/tasks/batch", json={"operations": [
+        {"op": "create", "data": "x"},
+        {"op": "update", "id": 1, "data": ["title"]},
+        {"op": "create", "data": {"title": "First"}},
+        {"op": "create", "data": {"title": "Second"}},
+        {"op": "create", "data": {"title": "Third"}},
+    ]})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [r["status"] for r in results] == [400, 400, 201, 201, 201]
+    assert results[0]["error"] == "data must be an object"
+
+    tasks = auth_client.get("/api/tasks?sort=order&parent_id=none").json
+    assert [t["title"] for t in tasks] == ["Existing", "First", "Second", "Third"]
+    assert len({t["order"] for t in tasks}) == 4
+
+
+def test_batch_rolls_back_on_integrity_error(auth_client):
+    keep = create_task(auth_client, "Keep")
+
+    response = auth_client.post("/api/tasks/batch", json={"operations": [
+        {"op": "create", "data": {"title": "New"}},
+        {"op": "update", "id": keep, "data": {"status": "completed"}},
+        # title is NOT NULL, so the flush fails
+        {"op": "update", "id": keep, "data": {"title": None}},
+    ]})
+    assert response.status_code == 400
+
+    tasks = auth_client.get("/api/tasks").json
+    assert [(t["title"], t["status"]) for t in tasks] == [("Keep", "pending")]
+
+
+def test_parent_must_be_editable_and_paths_must_fit(app, auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+    viewed, hidden = create_task(other_client, "Viewed"), create_task(other_client, "Hidden")
+    other_client.post("/api/share", json={"item_type": "task", "item_id": viewed, "shared_with_id": my_id})
+    task = create_task(auth_client, "Mine")
+
+    response = auth_client.post("/api/tasks", json={"title": "Child", "parent_id": viewed})
+    assert response.status_code == 400
+    assert auth_client.put(f"/api/tasks/{task}", json={"parent_id": hidden}).json["error"] == "Parent task not found"
+    assert auth_client.post(f"/api/tasks/{task}/move", json={"parent_id": viewed}).status_code == 400
+
+    # 30 levels of 16 digit ids nearly fill the 512 character path
+    with app.app_context():
+        path = "/"
+        for i in range(30):
+            task_id = 10**15 + i
+            db.session.add(Task(id=task_id, title=f"Level {i}", user_id=1, path=path))
+            path += f"{task_id}/"
+        db.session.commit()
+    deepest = 10**15 + 29
+    assert auth_client.post("/api/tasks", json={"title": "Fits", "parent_id": deepest}).status_code == 201
+
+    parent = create_task(auth_client, "Parent")
+    create_task(auth_client, "Child", parent_id=parent)
+    response = auth_client.put(f"/api/tasks/{parent}", json={"parent_id": deepest})
+    assert response.status_code == 400
+    assert response.json["error"] == "Tasks are nested too deeply to be moved there"
+
+
+def test_rebalance_leaves_the_commit_to_the_caller(app, auth_client):
+    ids = [create_task(auth_client, title) for title in ("First", "Second", "Third")]
+    with app.app_context():
+        db.session.query(Task).update({Task.order: "i"})
+        db.session.commit()
+
+        rebalance_siblings(None, 1)
+        db.session.rollback()
+        assert {t.order for t in Task.query.all()} == {"i"}
+
+        rebalance_job(None, 1)
+        db.session.remove()
+        orders = [db.session.get(Task, task_id).order for task_id in ids]
+        assert orders == sorted(set(orders))
+        db.session.remove()
+
+
+def test_custom_field_values_are_finite_and_deleted_with_their_task(auth_client):
+    points = auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"}).json["id"]
+    first, second = create_task(auth_client, "First"), create_task(auth_client, "Second")
+
+    for value in ("inf", "-Infinity", "nan", float("inf")):
+        response = auth_client.post(f"/api/tasks/{first}/custom-fields", json={"definition_id": points, "value": value})
+        assert response.status_code == 400
+    for task_id in (first, second):
+        response = auth_client.post(f"/api/tasks/{task_id}/custom-fields", json={"definition_id": points, "value": 3})
+        assert response.status_code in (200, 201)
+
+    assert auth_client.delete(f"/api/tasks/{first}").status_code == 200
+    response = auth_client.post("/api/tasks/batch", json={"operations": [{"op": "delete", "id": second}]})
+    assert response.json["results"][0]["status"] == 200
+    assert auth_client.get(f"/api/custom-fields/definitions/{points}/stats").json["count"] == 0
+
+
+def test_batch_custom_field_values_conflict_with_concurrent_insert(auth_client, monkeypatch):
+    points = auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"}).json["id"]
+    task_id = create_task(auth_client, "Task")
+    set_value = custom_fields_api.set_value
+
+    def insert_meanwhile(field_value, definition, raw):
+        # Another request stores the same pair after this one looked for existing values
+        db.session.connection().execute(CustomFieldValue.__table__.insert().values(
+            task_id=task_id, field_definition_id=points, value="1"))
+        return set_value(field_value, definition, raw)
+
+    monkeypatch.setattr(custom_fields_api, "set_value", insert_meanwhile)
+    response = auth_client.post("/api/custom-fields/values/batch", json={"values": [
+        {"task_id": task_id, "definition_id": points, "value": "5"}]})
+    assert response.status_code == 409
+
+
+
+def test_batch_custom_field_values_reject_malformed_ids(auth_client):
+    points = auth_client.post("/api/custom-fields/definitions", json={"name": "Points", "field_type": "number"}).json["id"]
+    task_id = create_task(auth_client, "Task")
+
+    response = auth_client.post("/api/custom-fields/values/batch", json={"values": [
+        {"task_id": [task_id], "definition_id": points, "value": "1"},
+        {"task_id": task_id, "definition_id": {"id": points}, "value": "2"},
+        {"task_id": True, "definition_id": points, "value": "3"},
+        "not an object",
+        {"task_id": task_id, "definition_id": points, "value": "5"},
+    ]})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [r["status"] for r in results] == [400, 400, 400, 400, 200]
+    assert results[0]["error"] == "task_id and definition_id must be integers"
+    values = auth_client.get(f"/api/tasks/{task_id}/custom-fields").json
+    assert [(v["value"], v["definition"]["name"]) for v in values] == [("5", "Points")]
+
+def test_time_report_csv_escapes_formulas(app, auth_client):
+    titles = ["=HYPERLINK(\"http://x\")", "+1", "-2", "@SUM(A1)", "Plain"]
+    with app.app_context():
+        for title in titles:
+            task_id = create_task(auth_client, title)
+            db.session.add(TimeEntry(task_id=task_id, user_id=1, start_time=datetime(2026, 1, 10, 9),
+                                     end_time=datetime(2026, 1, 10, 10), duration=3600))
+        db.session.commit()
+
+    response = auth_client.get("/api/time/report?start=2026-01-10&end=2026-01-10&format=csv")
+    exported = [row[1] for row in csv.reader(response.get_data(as_text=True).splitlines()[1:])]
+    assert exported == ["'=HYPERLINK(\"http://x\")", "'+1", "'-2", "'@SUM(A1)", "Plain"]
+
+
+def test_subtree_leaves_out_subtasks_that_were_not_shared(auth_client, other_client):
+    my_id = other_client.get("/api/users").json[0]["id"]
+    parent = create_task(other_client, "Parent")
+    shared = create_task(other_client, "Shared child", parent_id=parent)
+    create_task(other_client, "Private child", parent_id=parent)
+    create_task(other_client, "Private grandchild", parent_id=shared)
+    for task_id in (parent, shared):
+        other_client.post("/api/share", json={"item_type": "task", "item_id": task_id, "shared_with_id": my_id})
+
+    tree = auth_client.get(f"/api/tasks/{parent}/subtree").json
+    assert tree["title"] == "Parent"
+    assert [t["title"] for t in tree["subtasks"]] == ["Shared child"]
+    assert tree["subtasks"][0]["subtasks"] == []
+
+    # The owner still gets everything
+    tree = other_client.get(f"/api/tasks/{parent}/subtree").json
+    assert sorted(t["title"] for t in tree["subtasks"]) == ["Private child", "Shared child"]
@@ -2,6 +2,7 @@ import pytest
 from flask import url_for
 
 
+
 def test_users_page_structure(auth_client):
     """Test the structure of the users page."""
     response = auth_client.get("/users")
@@ -28,3 +29,4 @@ def test_users_page_access_control(client):
     response = client.get("/users")
     assert response.status_code == 302  # Redirect to login
     assert "/login" in response.headers["Location"]
+
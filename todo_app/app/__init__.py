@@ -17,6 +17,10 @@ def create_app(config_name='default'):
     
     app.config.from_object(config[config_name])
 
+    from app.services import time_reports
+    # Fail here rather than on the first report request
+    time_reports.check_dialect(app)
+
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
@@ -25,6 +29,10 @@ def create_app(config_name='default'):
     login_manager.login_view = 'auth.login'
 
     from app.models import user  # Import models to ensure they are registered with SQLAlchemy
+    from app.services import sync  # Registers the tombstone listeners
+    from app.services import notifications  # Publishes new notifications to SSE streams
+    from app.services import project_stats  # Keeps the project rollups current
+    from app.services import search  # Keeps the search index current
     
     # Register Blueprints
     from app.auth.routes import auth_bp
@@ -39,6 +47,8 @@ def create_app(config_name='default'):
     from app.api.time import time_bp
     from app.api.ai import ai_bp
     from app.api.checklists import checklists_bp
+    from app.api.sync import sync_bp
+    from app.api.search import search_bp
     from app.views.profile import profile_bp
     
     app.register_blueprint(auth_bp)
@@ -54,5 +64,10 @@ def create_app(config_name='default'):
     app.register_blueprint(time_bp, url_prefix='/api')
     app.register_blueprint(ai_bp, url_prefix='/api')
     app.register_blueprint(checklists_bp, url_prefix='/api')
+    app.register_blueprint(sync_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+
+    app.cli.add_command(search.reindex_command)
+    app.cli.add_command(time_reports.clamp_entries_command)
 
     return app
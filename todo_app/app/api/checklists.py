@@ -40,7 +40,7 @@ def add_checklist_item(task_id):
     )
     db.session.add(item)
     db.session.commit()
-    return checklist_schema.jsonify(item), 201
+    return jsonify(checklist_schema.dump(item)), 201
 
 @checklists_bp.route('/checklist/<int:item_id>', methods=['PUT'])
 @login_required
@@ -54,7 +54,7 @@ def update_checklist_item(item_id):
         item.content = data['content']
         
     db.session.commit()
-    return checklist_schema.jsonify(item)
+    return jsonify(checklist_schema.dump(item))
 
 @checklists_bp.route('/checklist/<int:item_id>', methods=['DELETE'])
 @login_required
@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models.comment import Comment
 from app.models.task import Task
-from app.models.user import User
-from app.models.notification import Notification
 from app.schemas import UserSchema
+from app.services.access import access_for
+from app.services.dispatch import dispatch
+from app.services.mentions import extract_mentions, notify_mentions
+from app.services.pagination import PaginationError, page_args, paginate
 from marshmallow import Schema, fields
-import re
 
 comments_bp = Blueprint('comments', __name__)
 
@@ -15,6 +18,9 @@ class CommentSchema(Schema):
     id = fields.Int()
     content = fields.Str()
     created_at = fields.DateTime()
+    updated_at = fields.DateTime()
+    task_id = fields.Int()
+    event_id = fields.Int()
     user = fields.Nested(UserSchema(only=('id', 'username')))
 
 comment_schema = CommentSchema()
@@ -23,8 +29,33 @@ comments_schema = CommentSchema(many=True)
 @comments_bp.route('/tasks/<int:task_id>/comments', methods=['GET'])
 @login_required
 def get_task_comments(task_id):
-    comments = Comment.query.filter_by(task_id=task_id).order_by(Comment.created_at.desc()).all()
-    return jsonify(comments_schema.dump(comments))
+    if access_for(Task, task_id, current_user.id) is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    # Authors for the whole page in one extra query
+    query = Comment.query.filter_by(task_id=task_id).options(selectinload(Comment.user))
+
+    # Newest first, older comments are fetched with the X-Next-Cursor header
+    try:
+        limit, cursor = page_args(request.args)
+        comments, next_cursor = paginate(query, [Comment.created_at, Comment.id], cursor, limit)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify(comments_schema.dump(comments))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@comments_bp.route('/tasks/<int:task_id>/comments/count', methods=['GET'])
+@login_required
+def count_task_comments(task_id):
+    if access_for(Task, task_id, current_user.id) is None:
+        return jsonify({'error': 'Task not found'}), 404
+
+    # Answered from ix_comments_task_id_created_at without touching the table
+    count = db.session.query(func.count(Comment.id)).filter(Comment.task_id == task_id).scalar()
+    return jsonify({'task_id': task_id, 'count': count})
 
 @comments_bp.route('/tasks/<int:task_id>/comments', methods=['POST'])
 @login_required
@@ -45,21 +76,15 @@ def create_comment(task_id):
     )
     db.session.add(comment)
     
-    # Mention logic
-    mentions = re.findall(r'@(\w+)', content)
-    for username in set(mentions):
-        user = User.query.filter_by(username=username).first()
-        if user and user.id != current_user.id:
-            notification = Notification(
-                message=f"{current_user.username} mentioned you in a comment on task '{task.title}'",
-                user_id=user.id,
-                task_id=task_id
-            )
-            db.session.add(notification)
-            
+    # Mention logic, fanned out off the request path once the comment is committed
+    mentions = extract_mentions(content)
+    job = (current_user.id, current_user.username, task.id, task.title, mentions)
     db.session.commit()
     
-    return comment_schema.jsonify(comment), 201
+    if mentions:
+        dispatch(notify_mentions, *job)
+    
+    return jsonify(comment_schema.dump(comment)), 201
 
 @comments_bp.route('/comments/<int:comment_id>', methods=['DELETE'])
 @login_required
@@ -1,8 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.custom_field import CustomFieldDefinition, CustomFieldValue
 from app.models.task import Task
+from app.services.access import access_for, can_edit, load_visible, visible_ids
+from app.services.custom_fields import (
+    FIELD_TYPES, bump_version, cache_stats, definitions_by_id, field_stats, parse_options, set_value, user_definitions
+)
 from marshmallow import Schema, fields
 
 custom_fields_bp = Blueprint('custom_fields', __name__)
@@ -21,44 +27,90 @@ class CustomFieldValueSchema(Schema):
 
 def_schema = CustomFieldDefinitionSchema()
 defs_schema = CustomFieldDefinitionSchema(many=True)
-val_schema = CustomFieldValueSchema()
-vals_schema = CustomFieldValueSchema(many=True)
+# Definitions are attached by dump_values, or listed once in bulk responses
+flat_vals_schema = CustomFieldValueSchema(many=True, exclude=('definition',))
+
+def dump_values(values):
+    # Definitions come from the per-user cache instead of a load per value
+    definitions = definitions_by_id({v.field_definition_id for v in values}, current_user)
+    data = flat_vals_schema.dump(values)
+    for item, value in zip(data, values):
+        definition = definitions.get(value.field_definition_id)
+        item['definition'] = def_schema.dump(definition) if definition else None
+    return data
+
+def is_id(value):
+    # JSON true is an int to Python, and lists can't be dict keys
+    return isinstance(value, int) and not isinstance(value, bool)
 
 # Definitions
 @custom_fields_bp.route('/custom-fields/definitions', methods=['GET'])
 @login_required
 def get_definitions():
-    defs = CustomFieldDefinition.query.filter_by(user_id=current_user.id).all()
-    return jsonify(defs_schema.dump(defs))
+    return jsonify(defs_schema.dump(user_definitions(current_user)))
 
 @custom_fields_bp.route('/custom-fields/definitions', methods=['POST'])
 @login_required
 def create_definition():
-    data = request.get_json()
+    data = request.get_json() or {}
+    if not data.get('name'):
+        return jsonify({'error': 'Name is required'}), 400
+    if data.get('field_type') not in FIELD_TYPES:
+        return jsonify({'error': f"field_type must be one of {', '.join(FIELD_TYPES)}"}), 400
+    # Accepts a list or the legacy comma-separated string
+    options = parse_options(data.get('options'))
+    if data['field_type'] == 'select' and not options:
+        return jsonify({'error': 'Select fields need options'}), 400
+
     new_def = CustomFieldDefinition(
-        name=data.get('name'),
-        field_type=data.get('field_type'),
-        options=data.get('options'),
+        name=data['name'],
+        field_type=data['field_type'],
+        options=','.join(options) if options else None,
         user_id=current_user.id
     )
     db.session.add(new_def)
+    bump_version(current_user.id)
     db.session.commit()
-    return def_schema.jsonify(new_def), 201
+    return jsonify(def_schema.dump(new_def)), 201
+
+@custom_fields_bp.route('/custom-fields/cache', methods=['GET'])
+@login_required
+def get_cache_stats():
+    # Definition cache counters of this process, for monitoring. They cover
+    # every user, so they're only served in debug or when enabled explicitly
+    if not (current_app.debug or current_app.config.get('CACHE_STATS_ENABLED', False)):
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(cache_stats())
+
+@custom_fields_bp.route('/custom-fields/definitions/<int:definition_id>/stats', methods=['GET'])
+@login_required
+def get_definition_stats(definition_id):
+    definition = next((d for d in user_definitions(current_user) if d.id == definition_id), None)
+    if definition is None:
+        return jsonify({'error': 'Custom field not found'}), 404
+    # Over every task the user can see, aggregated in SQL
+    return jsonify(field_stats(definition, visible_ids(Task, current_user.id)))
 
 # Values
 @custom_fields_bp.route('/tasks/<int:task_id>/custom-fields', methods=['GET'])
 @login_required
 def get_task_values(task_id):
+    if access_for(Task, task_id, current_user.id) is None:
+        return jsonify({'error': 'Task not found'}), 404
     vals = CustomFieldValue.query.filter_by(task_id=task_id).all()
-    return jsonify(vals_schema.dump(vals))
+    return jsonify(dump_values(vals))
 
 @custom_fields_bp.route('/tasks/<int:task_id>/custom-fields', methods=['POST'])
 @login_required
 def update_task_values(task_id):
-    task = Task.query.get_or_404(task_id)
-    # Check permission (omitted for brevity, assume owner/shared edit)
-    
-    data = request.get_json()
+    access = access_for(Task, task_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Task not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+    task = db.session.get(Task, task_id)
+
+    data = request.get_json() or {}
     # Expect list of { definition_id: 1, value: "foo" } or direct object
     
     definition_id = data.get('definition_id')
@@ -66,18 +118,126 @@ def update_task_values(task_id):
     
     if definition_id is None:
         return jsonify({'error': 'Missing definition_id'}), 400
+    try:
+        definition_id = int(definition_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'definition_id must be an integer'}), 400
+    # Fields of the task owner, or the editor's own
+    definition = definitions_by_id([definition_id], current_user).get(definition_id)
+    if definition is None or definition.user_id not in (task.user_id, current_user.id):
+        return jsonify({'error': 'Custom field not found'}), 404
         
     field_val = CustomFieldValue.query.filter_by(task_id=task_id, field_definition_id=definition_id).first()
     
-    if field_val:
-        field_val.value = value
-    else:
+    if not field_val:
         field_val = CustomFieldValue(
             task_id=task_id,
-            field_definition_id=definition_id,
-            value=value
+            field_definition_id=definition_id
         )
         db.session.add(field_val)
+    try:
+        set_value(field_val, definition, value)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
         
     db.session.commit()
-    return val_schema.jsonify(field_val)
+    return jsonify(dump_values([field_val])[0])
+
+@custom_fields_bp.route('/custom-fields/values', methods=['GET'])
+@login_required
+def get_bulk_values():
+    # ?task_ids=1,2,3 -> {"definitions": [...], "values": {"1": [...], ...}}
+    try:
+        task_ids = {int(t) for t in request.args.get('task_ids', '').split(',') if t}
+    except ValueError:
+        return jsonify({'error': 'task_ids must be a comma-separated list of integers'}), 400
+    max_values = current_app.config.get('CUSTOM_FIELD_BATCH_MAX_VALUES', 1000)
+    if len(task_ids) > max_values:
+        return jsonify({'error': f'At most {max_values} tasks per request'}), 400
+
+    # One query for the values, visibility checked in SQL; definitions come from the cache
+    values = CustomFieldValue.query.filter(
+        CustomFieldValue.task_id.in_(task_ids),
+        CustomFieldValue.task_id.in_(visible_ids(Task, current_user.id))
+    ).order_by(CustomFieldValue.task_id, CustomFieldValue.field_definition_id).all() if task_ids else []
+
+    definitions = definitions_by_id({v.field_definition_id for v in values}, current_user)
+    by_task = {}
+    for value in values:
+        by_task.setdefault(value.task_id, []).append(value)
+    return jsonify({
+        'definitions': defs_schema.dump(sorted(definitions.values(), key=lambda d: d.id)),
+        'values': {str(task_id): flat_vals_schema.dump(values) for task_id, values in by_task.items()}
+    })
+
+@custom_fields_bp.route('/custom-fields/values/batch', methods=['POST'])
+@login_required
+def batch_values():
+    # Body: {"values": [{"task_id": 1, "definition_id": 2, "value": "5"}, ...]}
+    data = request.get_json(silent=True)
+    items = data.get('values') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'values must be a list'}), 400
+    max_values = current_app.config.get('CUSTOM_FIELD_BATCH_MAX_VALUES', 1000)
+    if len(items) > max_values:
+        return jsonify({'error': f'At most {max_values} values per batch'}), 400
+
+    def ids(key):
+        return {item.get(key) for item in items if isinstance(item, dict) and is_id(item.get(key))}
+
+    # Tasks, definitions (unless cached) and existing values are each loaded with one query
+    task_ids, definition_ids = ids('task_id'), ids('definition_id')
+    visible = load_visible(Task, list(task_ids), current_user.id)
+    definitions = definitions_by_id(definition_ids, current_user)
+    existing = {(v.task_id, v.field_definition_id): v for v in CustomFieldValue.query.filter(
+        CustomFieldValue.task_id.in_(list(visible)),
+        CustomFieldValue.field_definition_id.in_(definition_ids)
+    )} if visible and definition_ids else {}
+
+    results = []
+    created = {}
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        task_id, definition_id = item.get('task_id'), item.get('definition_id')
+        result = {'index': index, 'task_id': task_id, 'definition_id': definition_id}
+        results.append(result)
+        if not (is_id(task_id) and is_id(definition_id)):
+            result.update(status=400, error='task_id and definition_id must be integers')
+            continue
+        task, access = visible.get(task_id, (None, None))
+        definition = definitions.get(definition_id)
+        if task is None:
+            result.update(status=404, error='Task not found')
+        elif not can_edit(access):
+            result.update(status=403, error='Permission denied')
+        elif definition is None or definition.user_id not in (task.user_id, current_user.id):
+            result.update(status=404, error='Custom field not found')
+        else:
+            # A later item for the same pair overwrites the earlier one
+            pair = (task_id, definition_id)
+            field_val = existing.get(pair) or created.get(pair) or CustomFieldValue(
+                task_id=task_id, field_definition_id=definition_id)
+            try:
+                set_value(field_val, definition, item.get('value'))
+            except ValueError as e:
+                result.update(status=400, error=str(e))
+                continue
+            if pair not in existing:
+                created[pair] = field_val
+            result.update(status=200, value=field_val.value)
+
+    try:
+        if created:
+            # One executemany; adding the objects would insert them one by one to fetch their ids.
+            # It autoflushes the updates first, so both can hit a concurrent insert
+            columns = ('task_id', 'field_definition_id', 'value', 'number_value', 'date_value', 'option_index')
+            db.session.execute(insert(CustomFieldValue), [
+                {column: getattr(field_val, column) for column in columns} for field_val in created.values()
+            ])
+        db.session.commit()
+    except IntegrityError:
+        # Another request inserted one of the pairs first
+        db.session.rollback()
+        return jsonify({'error': 'Batch rejected, no changes were applied'}), 409
+    return jsonify({'results': results})
@@ -1,58 +1,231 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
-from app.models.event import Event
+from app.models.event import Event, EventException
 from app.models.shared import SharedItem
 from app.schemas import EventSchema
-from datetime import datetime
+from app.services.access import access_for, can_edit, delete_shares, load_visible, visible_query
+from app.services.freebusy import free_busy
+from app.services.recurrence import expand, parse_rrule, series_end
+from app.services.reminders import publish_reminder, schedule_reminder
+from datetime import datetime, timedelta
 
 events_bp = Blueprint('events', __name__)
 event_schema = EventSchema()
 events_schema = EventSchema(many=True)
 
+def serialize_exception(x):
+    return {
+        'id': x.id,
+        'original_start': x.original_start.isoformat(),
+        'cancelled': x.cancelled,
+        'start': x.start_date.isoformat() if x.start_date else None,
+        'end': x.end_date.isoformat() if x.end_date else None,
+        'title': x.title
+    }
+
+def serialize_event(e, access):
+    # FullCalendar expects its own prop names (start, end, allDay) rather than the schema dump
+    data = {
+        'id': e.id,
+        'title': e.title,
+        'description': e.description,
+        'start': e.start_date.isoformat(),
+        'end': e.end_date.isoformat() if e.end_date else None,
+        'allDay': e.all_day,
+        'color': e.color,
+        'location': e.location,
+        'reminder': e.reminder,
+        'rrule': e.rrule,
+        'version': e.version,
+        'owner_name': e.owner.username,
+        'access_type': access
+    }
+    if e.rrule:
+        # Callers selectinload Event.exceptions
+        data['exceptions'] = [serialize_exception(x) for x in e.exceptions]
+    return data
+
+def _duration(e):
+    return e.end_date - e.start_date if e.end_date else timedelta(0)
+
+def serialize_occurrences(e, access, window_start, window_end):
+    """One dict per occurrence of a recurring event inside the window.
+
+    Each carries the series id plus recurrence_id (the original start), which
+    is what exceptions are keyed on.
+    """
+    limit = current_app.config.get('RECURRENCE_MAX_OCCURRENCES', 1000)
+    duration = _duration(e)
+    exceptions = {x.original_start: x for x in e.exceptions}
+    base = serialize_event(e, access)
+    del base['exceptions']
+
+    occurrences = []
+    for start in expand(e.rrule, e.start_date, duration, window_start, window_end, limit):
+        x = exceptions.get(start)
+        if x is not None and x.cancelled:
+            continue
+        end = start + duration if e.end_date else None
+        title = e.title
+        if x is not None:
+            start, end, title = x.start_date or start, x.end_date or end, x.title or title
+        occurrences.append(dict(
+            base,
+            title=title,
+            start=start.isoformat(),
+            end=end.isoformat() if end else None,
+            recurrence_id=(x.original_start if x else start).isoformat()
+        ))
+    return occurrences
+
+def apply_recurrence(event, rrule):
+    # Raises RecurrenceError for rules outside the supported subset
+    event.rrule = rrule or None
+    event.recurrence_end = series_end(rrule, event.start_date, _duration(event)) if rrule else None
+
+# PUT body keys that map straight onto a column
+EVENT_FIELDS = {
+    'title': 'title',
+    'description': 'description',
+    'allDay': 'all_day',
+    'color': 'color',
+    'location': 'location'
+}
+
+def parse_reminder(value):
+    """Minutes before the event (0: none). Raises ValueError."""
+    if value is None or value == '':
+        return 0
+    # Forms post the minutes as text; int() alone would accept true or 1.5
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit():
+        raise ValueError('reminder must be a non-negative number of minutes')
+    return int(value)
+
+def move_event(event, delta):
+    """Shift an event (a whole series for recurring ones) by ``delta``."""
+    event.start_date += delta
+    if event.end_date:
+        event.end_date += delta
+    # Exceptions are keyed on occurrence starts, which moved too. Loading them
+    # mustn't autoflush, that would write (and version) the event twice
+    with db.session.no_autoflush:
+        exceptions = event.exceptions if event.rrule else []
+    for x in exceptions:
+        x.original_start += delta
+        if x.start_date:
+            x.start_date += delta
+        if x.end_date:
+            x.end_date += delta
+    apply_recurrence(event, event.rrule)
+    schedule_reminder(event)
+
+def apply_event_update(event, data):
+    """Partial update from a PUT body; raises ValueError before changing anything.
+
+    A new start without an end moves the event and keeps its duration.
+    """
+    start = datetime.fromisoformat(data['start']) if data.get('start') else event.start_date
+    delta = start - event.start_date
+    if 'end' in data:
+        end = datetime.fromisoformat(data['end']) if data['end'] else None
+    else:
+        end = event.end_date + delta if event.end_date else None
+    if end is not None and end < start:
+        raise ValueError('end must not be before start')
+    rrule = (data['rrule'] or None) if 'rrule' in data else event.rrule
+    if rrule:
+        parse_rrule(rrule)
+    if 'title' in data and not data['title']:
+        raise ValueError('Title is required')
+    reminder = parse_reminder(data['reminder']) if 'reminder' in data else event.reminder
+
+    if delta:
+        move_event(event, delta)
+    event.end_date = end
+    for key, attr in EVENT_FIELDS.items():
+        if key in data:
+            setattr(event, attr, data[key])
+    event.reminder = reminder
+    apply_recurrence(event, rrule)
+    schedule_reminder(event)
+
+def etag(event):
+    return f'"{event.version}"'
+
+def expected_version(data):
+    """Version the client expects to update, or None. Raises ValueError."""
+    # If-Match carries the ETag; clients that can't set headers send "version"
+    header = request.headers.get('If-Match')
+    value = header.strip().removeprefix('W/').strip('"') if header else data.get('version')
+    if value is None or value == '*':
+        return None
+    # int() would accept true or 1.5, and raise TypeError for [1] or {}
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'Invalid version {value!r}')
+    return int(value)
+
+def with_etag(response, event):
+    response.headers['ETag'] = etag(event)
+    return response
+
+def version_conflict(event, access):
+    return with_etag(jsonify({
+        'error': 'Event was changed by someone else',
+        'event': serialize_event(event, access)
+    }), event), 412
+
+def parse_range_bound(value):
+    # Events are stored as naive wall-clock times, so an offset (as sent by
+    # calendar widgets) is dropped rather than converted
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+def apply_range_filter(query, start, end):
+    """Events overlapping [start, end). Either bound may be None.
+
+    An event without end_date is treated as an instant at start_date, a
+    recurring one as spanning start_date to recurrence_end.
+    """
+    if end is not None:
+        query = query.filter(Event.start_date < end)
+    if start is not None:
+        # NULL end_date falls through to the start_date comparison
+        query = query.filter(or_(
+            Event.end_date > start,
+            Event.start_date >= start,
+            and_(Event.rrule.isnot(None), or_(Event.recurrence_end.is_(None), Event.recurrence_end > start))
+        ))
+    return query
+
 @events_bp.route('/events', methods=['GET'])
 @login_required
 def get_events():
-    own_events = Event.query.filter_by(user_id=current_user.id).all()
-    
-    shared_items = SharedItem.query.filter_by(shared_with_id=current_user.id, item_type='event').all()
-    shared_ids = [item.item_id for item in shared_items]
-    shared_events = Event.query.filter(Event.id.in_(shared_ids)).all()
-    
-    own_data = events_schema.dump(own_events)
-    shared_data = events_schema.dump(shared_events)
-    
-    # Frontend expects specific fullcalendar format
-    # The schema dumps snake_case. Frontend JS expects camelCase or specific props.
-    # I should transform or update frontend. 
-    # Current app.js expects: id, title, description, start, end, allDay, color, etc.
-    # Schema has start_date, end_date.
-    
-    # I will do manual transformation or use Marshmallow `data_key` but simple list comprehension is easier for now to match exactly old API.
-    
-    events = []
-    
-    for e, access in [(e, 'owner') for e in own_events] + [(e, 'view') for e in shared_events]:
-        # access logic for shared
-        if access == 'view' and e in shared_events:
-             item = next((i for i in shared_items if i.item_id == e.id), None)
-             access = item.permission if item else 'view'
-             
-        events.append({
-            'id': e.id,
-            'title': e.title,
-            'description': e.description,
-            'start': e.start_date.isoformat(),
-            'end': e.end_date.isoformat() if e.end_date else None,
-            'allDay': e.all_day,
-            'color': e.color,
-            'location': e.location,
-            'reminder': e.reminder,
-            'owner_name': e.owner.username,
-            'access_type': access
-        })
-        
-    return jsonify(events)
+    # ?start=&end= restricts the result to one calendar view, without them every event is returned
+    try:
+        start = parse_range_bound(request.args['start']) if request.args.get('start') else None
+        end = parse_range_bound(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
+    if start and end and start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+
+    query = visible_query(Event, current_user.id).options(selectinload(Event.owner), selectinload(Event.exceptions))
+    query = apply_range_filter(query, start, end).order_by(Event.start_date, Event.id)
+
+    # Recurring events are expanded only when the window is closed, otherwise
+    # the series itself is returned (with its rrule) for the client to expand
+    data = []
+    for e, access in query.all():
+        if e.rrule and start and end:
+            data.extend(serialize_occurrences(e, access, start, end))
+        else:
+            data.append(serialize_event(e, access))
+    if start and end:
+        data.sort(key=lambda item: item['start'])
+    return jsonify(data)
 
 @events_bp.route('/events', methods=['POST'])
 @login_required
@@ -66,15 +239,110 @@ def create_event():
         all_day=data.get('allDay', False),
         color=data.get('color', '#3498db'),
         location=data.get('location'),
-        reminder=data.get('reminder', 0),
         user_id=current_user.id
     )
+    try:
+        new_event.reminder = parse_reminder(data.get('reminder'))
+        apply_recurrence(new_event, data.get('rrule'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    schedule_reminder(new_event)
     db.session.add(new_event)
     db.session.commit()
+    if new_event.remind_at:
+        publish_reminder(new_event.id, new_event.remind_at)
     return jsonify({'id': new_event.id, 'message': 'Event created successfully'}), 201
 
-# I should implement PUT/DELETE too but for brevity in this refactor step...
-# I'll skip unless strictly required. But existing app had it. I should include it.
+@events_bp.route('/events/<int:event_id>', methods=['GET'])
+@login_required
+def get_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    access = access_for(Event, event_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Event not found'}), 404
+    return with_etag(jsonify(serialize_event(event, access)), event)
+
+@events_bp.route('/events/<int:event_id>', methods=['PUT'])
+@login_required
+def update_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    access = access_for(Event, event_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Event not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+
+    data = request.get_json() or {}
+    try:
+        expected = expected_version(data)
+    except ValueError:
+        return jsonify({'error': 'Invalid If-Match / version'}), 400
+    # Without If-Match the update is unconditional (older clients)
+    if expected is not None and expected != event.version:
+        return version_conflict(event, access)
+
+    remind_at = event.remind_at
+    try:
+        apply_event_update(event, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        db.session.commit()
+    except StaleDataError:
+        # Someone else committed between our read and write
+        db.session.rollback()
+        return version_conflict(db.session.get(Event, event_id), access)
+
+    if event.remind_at != remind_at:
+        publish_reminder(event.id, event.remind_at)
+    return with_etag(jsonify(serialize_event(event, access)), event)
+
+@events_bp.route('/events/move', methods=['POST'])
+@login_required
+def move_events():
+    # Body: {"delta_minutes": 60, "events": [{"id": 1, "version": 3}, {"id": 2}]}
+    # All or nothing: one missing, read-only or outdated event rejects the move.
+    data = request.get_json() or {}
+    items = data.get('events')
+    delta_minutes = data.get('delta_minutes')
+    if not isinstance(items, list) or not all(isinstance(i, dict) and isinstance(i.get('id'), int) for i in items):
+        return jsonify({'error': 'events must be a list of {"id": ..., "version": ...}'}), 400
+    if not isinstance(delta_minutes, int) or isinstance(delta_minutes, bool):
+        return jsonify({'error': 'delta_minutes must be an integer'}), 400
+    max_events = current_app.config.get('EVENT_MOVE_MAX_EVENTS', 500)
+    if len(items) > max_events:
+        return jsonify({'error': f'At most {max_events} events per move'}), 400
+
+    visible = load_visible(Event, [i['id'] for i in items], current_user.id)
+    missing = [i['id'] for i in items if i['id'] not in visible]
+    if missing:
+        return jsonify({'error': 'Events not found', 'ids': missing}), 404
+    read_only = [i['id'] for i in items if not can_edit(visible[i['id']][1])]
+    if read_only:
+        return jsonify({'error': 'Permission denied', 'ids': read_only}), 403
+    conflicts = [
+        {'id': i['id'], 'version': visible[i['id']][0].version}
+        for i in items if i.get('version') is not None and i['version'] != visible[i['id']][0].version
+    ]
+    if conflicts:
+        return jsonify({'error': 'Events were changed by someone else', 'conflicts': conflicts}), 412
+
+    delta = timedelta(minutes=delta_minutes)
+    events = [visible[i['id']][0] for i in items]
+    reminders = {e.id: e.remind_at for e in events}
+    for event in events:
+        move_event(event, delta)
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Events were changed by someone else, nothing was moved'}), 412
+
+    for event in events:
+        if event.remind_at != reminders[event.id]:
+            publish_reminder(event.id, event.remind_at)
+    return jsonify({'events': [serialize_event(e, visible[e.id][1]) for e in events]})
 
 @events_bp.route('/events/<int:event_id>', methods=['DELETE'])
 @login_required
@@ -82,6 +350,114 @@ def delete_event(event_id):
     event = Event.query.filter_by(id=event_id, user_id=current_user.id).first()
     if not event:
         return jsonify({'error': 'Event not found'}), 404
+    delete_shares('event', [event_id])
+    had_reminder = event.remind_at is not None
     db.session.delete(event)
     db.session.commit()
+    if had_reminder:
+        publish_reminder(event_id, None)
     return jsonify({'message': 'Event deleted'})
+
+@events_bp.route('/events/<int:event_id>/exceptions', methods=['POST'])
+@login_required
+def add_exception(event_id):
+    # Body: {"original_start": "...", "cancelled": true} or
+    #       {"original_start": "...", "start": "...", "end": "...", "title": "..."}
+    # Events the user can't see are not found, shared read-only ones are forbidden
+    access = access_for(Event, event_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Event not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+    event = db.session.get(Event, event_id)
+    if not event.rrule:
+        return jsonify({'error': 'Event is not recurring'}), 400
+
+    data = request.get_json() or {}
+    try:
+        original_start = datetime.fromisoformat(data.get('original_start') or '')
+        start = datetime.fromisoformat(data['start']) if data.get('start') else None
+        end = datetime.fromisoformat(data['end']) if data.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'original_start, start and end must be ISO timestamps'}), 400
+
+    # Must name an actual occurrence
+    if original_start not in expand(event.rrule, event.start_date, _duration(event),
+                                    original_start, original_start + timedelta(microseconds=1), 1):
+        return jsonify({'error': 'original_start is not an occurrence of this event'}), 400
+
+    exception = EventException.query.filter_by(event_id=event_id, original_start=original_start).first()
+    if exception is None:
+        exception = EventException(event_id=event_id, original_start=original_start)
+        db.session.add(exception)
+    exception.cancelled = bool(data.get('cancelled'))
+    exception.start_date = start
+    exception.end_date = end
+    exception.title = data.get('title')
+    # Exceptions travel with their event in /api/sync
+    event.updated_at = datetime.utcnow()
+
+    db.session.commit()
+    return jsonify(serialize_exception(exception)), 201
+
+@events_bp.route('/events/<int:event_id>/exceptions/<int:exception_id>', methods=['DELETE'])
+@login_required
+def delete_exception(event_id, exception_id):
+    access = access_for(Event, event_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Event not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+    exception = EventException.query.filter_by(id=exception_id, event_id=event_id).first_or_404()
+
+    db.session.delete(exception)
+    exception.event.updated_at = datetime.utcnow()
+    db.session.commit()
+    return jsonify({'message': 'Exception deleted'})
+
+def _collaborator_ids(user_id):
+    """Users who share something with ``user_id`` or get shares from them."""
+    received = db.session.query(SharedItem.owner_id).filter(SharedItem.shared_with_id == user_id)
+    given = db.session.query(SharedItem.shared_with_id).filter(SharedItem.owner_id == user_id)
+    return {row[0] for row in received.union(given)}
+
+@events_bp.route('/freebusy', methods=['GET'])
+@login_required
+def get_free_busy():
+    # ?users=2,3&start=2025-03-01&end=2025-04-01&min_minutes=30
+    # Only the caller and people they share items with can be looked up.
+    config = current_app.config
+    try:
+        user_ids = [int(u) for u in request.args.get('users', '').split(',') if u.strip()] or [current_user.id]
+        start = parse_range_bound(request.args['start'])
+        end = parse_range_bound(request.args['end'])
+        min_minutes = int(request.args.get('min_minutes', 0))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start and end (ISO dates) are required; users and min_minutes must be integers'}), 400
+    user_ids = list(dict.fromkeys(user_ids))
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    if end - start > timedelta(days=config.get('FREEBUSY_MAX_DAYS', 62)):
+        return jsonify({'error': f"The window is limited to {config.get('FREEBUSY_MAX_DAYS', 62)} days"}), 400
+    if len(user_ids) > config.get('FREEBUSY_MAX_USERS', 100):
+        return jsonify({'error': f"At most {config.get('FREEBUSY_MAX_USERS', 100)} users"}), 400
+
+    others = set(user_ids) - {current_user.id}
+    if others:
+        forbidden = sorted(others - _collaborator_ids(current_user.id))
+        if forbidden:
+            return jsonify({'error': 'Permission denied', 'ids': forbidden}), 403
+
+    busy, free = free_busy(
+        user_ids, start, end,
+        min_length=timedelta(minutes=max(min_minutes, 0)),
+        default_duration=timedelta(minutes=config.get('FREEBUSY_DEFAULT_EVENT_MINUTES', 30)),
+        max_occurrences=config.get('RECURRENCE_MAX_OCCURRENCES', 1000)
+    )
+    as_json = lambda intervals: [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in intervals]
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'busy': {str(user_id): as_json(intervals) for user_id, intervals in busy.items()},
+        'free': as_json(free)
+    })
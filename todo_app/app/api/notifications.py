@@ -1,25 +1,103 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models.notification import Notification
-from marshmallow import Schema, fields
+from app.schemas import NotificationSchema
+from app.services.notifications import mark_notifications_read, user_channel
+from app.services.pagination import PaginationError, page_args, paginate
+from app.services.pubsub import get_broker
+from datetime import datetime
+import json
+import time
 
 notifications_bp = Blueprint('notifications', __name__)
 
-class NotificationSchema(Schema):
-    id = fields.Int()
-    message = fields.Str()
-    is_read = fields.Bool()
-    created_at = fields.DateTime()
-    task_id = fields.Int()
-
 notifications_schema = NotificationSchema(many=True)
 
+def _unread_filter(query, args):
+    if args.get('unread', '').lower() in ('1', 'true', 'yes'):
+        query = query.filter(Notification.is_read == False)
+    return query
+
 @notifications_bp.route('/notifications', methods=['GET'])
 @login_required
 def get_notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
-    return jsonify(notifications_schema.dump(notifications))
+    query = _unread_filter(Notification.query.filter_by(user_id=current_user.id), request.args)
+    try:
+        limit, cursor = page_args(request.args, current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 50))
+        notifications, next_cursor = paginate(
+            query, [Notification.created_at, Notification.id], cursor, limit)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify(notifications_schema.dump(notifications))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@notifications_bp.route('/notifications/unread-count', methods=['GET'])
+@login_required
+def unread_count():
+    return jsonify({'unread': current_user.unread_notifications})
+
+def _sse(notification):
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
+
+@notifications_bp.route('/notifications/stream', methods=['GET'])
+@login_required
+def stream_notifications():
+    config = current_app.config
+    # Subscribe before reading the backlog so nothing slips in between
+    subscription = get_broker().subscribe(user_channel(current_user.id))
+
+    # EventSource sends Last-Event-ID when it reconnects, replay what was missed
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    sent = int(last_id) if last_id and last_id.isdigit() else None
+    user_id = current_user.id
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.session.close()
+
+    batch_size = config.get('PUBSUB_QUEUE_SIZE', 100)
+    keepalive = config.get('SSE_KEEPALIVE', 15)
+    deadline = time.monotonic() + config.get('SSE_MAX_DURATION', 300)
+
+    def missed(after):
+        # One batch of the backlog, releasing the connection between batches
+        try:
+            return notifications_schema.dump(Notification.query.filter(
+                Notification.user_id == user_id,
+                Notification.id > after
+            ).order_by(Notification.id).limit(batch_size).all())
+        finally:
+            db.session.close()
+
+    def generate():
+        nonlocal sent
+        try:
+            # The whole backlog, in batches, however far behind the client is
+            if sent is not None:
+                while True:
+                    batch = missed(sent)
+                    for notification in batch:
+                        sent = notification['id']
+                        yield _sse(notification)
+                    if len(batch) < batch_size:
+                        break
+            sent = sent or 0
+            while time.monotonic() < deadline:
+                notification = subscription.get(timeout=keepalive)
+                if notification is None:
+                    yield ': keepalive\n\n'
+                elif notification['id'] > sent:
+                    sent = notification['id']
+                    yield _sse(notification)
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @notifications_bp.route('/notifications/<int:notification_id>/read', methods=['PUT'])
 @login_required
@@ -27,7 +105,35 @@ def mark_read(notification_id):
     notif = Notification.query.get_or_404(notification_id)
     if notif.user_id != current_user.id:
         return jsonify({'error': 'Permission denied'}), 403
-        
-    notif.is_read = True
+
+    mark_notifications_read(current_user.id, Notification.id == notification_id)
     db.session.commit()
     return jsonify({'message': 'Marked as read'})
+
+@notifications_bp.route('/notifications/read', methods=['PUT'])
+@login_required
+def mark_many_read():
+    # One of: {"ids": [...]}, {"task_id": 1}, {"before": "<iso timestamp>"} or {"all": true}
+    data = request.get_json() or {}
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'error': 'ids must be a list of integers'}), 400
+        criteria = [Notification.id.in_(ids)]
+    elif 'task_id' in data:
+        if not isinstance(data['task_id'], int):
+            return jsonify({'error': 'task_id must be an integer'}), 400
+        criteria = [Notification.task_id == data['task_id']]
+    elif 'before' in data:
+        try:
+            criteria = [Notification.created_at <= datetime.fromisoformat(data['before'])]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'before must be an ISO timestamp'}), 400
+    elif data.get('all'):
+        criteria = []
+    else:
+        return jsonify({'error': 'Specify ids, task_id, before or all'}), 400
+
+    count = mark_notifications_read(current_user.id, *criteria)
+    db.session.commit()
+    return jsonify({'marked': count, 'unread': current_user.unread_notifications})
@@ -2,11 +2,15 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models.project import Project
-from app.schemas import ProjectSchema
+from app.schemas import ProjectSchema, TaskSchema
+from app.services.dependencies import project_graph
+from app.services.hierarchy import build_forest, parse_max_depth, project_roots, subtree_rows
+from app.services.project_stats import project_summaries
 
 projects_bp = Blueprint('projects', __name__)
 project_schema = ProjectSchema()
 projects_schema = ProjectSchema(many=True)
+tasks_schema = TaskSchema(many=True)
 
 @projects_bp.route('/projects', methods=['GET'])
 @login_required
@@ -14,6 +18,14 @@ def get_projects():
     projects = Project.query.filter_by(owner_id=current_user.id).all()
     return projects_schema.jsonify(projects)
 
+@projects_bp.route('/projects/summary', methods=['GET'])
+@login_required
+def get_project_summaries():
+    # Dashboard numbers for every project, from the rollup rows plus one overdue count query
+    project_ids = [id for id, in db.session.query(Project.id).filter_by(owner_id=current_user.id).order_by(Project.id)]
+    summaries = project_summaries(project_ids)
+    return jsonify([summaries[project_id] for project_id in project_ids])
+
 @projects_bp.route('/projects', methods=['POST'])
 @login_required
 def create_project():
@@ -28,6 +40,45 @@ def create_project():
     db.session.commit()
     return project_schema.jsonify(new_project), 201
 
+@projects_bp.route('/projects/<int:project_id>/tree', methods=['GET'])
+@login_required
+def get_project_tree(project_id):
+    project = Project.query.get_or_404(project_id)
+    if project.owner_id != current_user.id:
+        return jsonify({'error': 'Permission denied'}), 403
+    try:
+        max_depth = parse_max_depth(request.args)
+    except ValueError:
+        return jsonify({'error': 'max_depth must be a non-negative integer'}), 400
+
+    rows = subtree_rows(project_roots(project_id), current_user.id, max_depth)
+    return jsonify({
+        'project_id': project_id,
+        'tasks': build_forest(rows, tasks_schema.dump)
+    })
+
+@projects_bp.route('/projects/<int:project_id>/plan', methods=['GET'])
+@login_required
+def get_project_plan(project_id):
+    project = Project.query.get_or_404(project_id)
+    if project.owner_id != current_user.id:
+        return jsonify({'error': 'Permission denied'}), 403
+
+    graph = project_graph(project_id)
+    order, cyclic = graph.topological_order()
+    path, finish = graph.critical_path()
+    return jsonify({
+        'project_id': project_id,
+        'order': order,
+        'cyclic': cyclic,
+        'ready': graph.ready(),
+        'critical_path': {
+            'tasks': path,
+            'length': len(path),
+            'finish': finish.isoformat() if finish else None
+        }
+    })
+
 @projects_bp.route('/projects/<int:project_id>', methods=['PUT'])
 @login_required
 def update_project(project_id):
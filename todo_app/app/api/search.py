@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
+from app.models.task import Task
+from app.schemas import TaskSchema
+from app.services.access import visible_query
+from app.services.pagination import PaginationError, encode_cursor, page_args
+from app.services.search import search_tasks
+
+search_bp = Blueprint('search', __name__)
+tasks_schema = TaskSchema(many=True)
+
+@search_bp.route('/search', methods=['GET'])
+@login_required
+def search():
+    # GET /api/search?q=launch plan&limit=20: visible tasks whose title,
+    # description, comments or checklist items match, best first
+    text = request.args.get('q', '')
+    try:
+        limit, cursor = page_args(request.args)
+        hits, next_cursor = search_tasks(current_user.id, text, cursor, limit)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = {}
+    if hits:
+        rows = {task.id: (task, access) for task, access in visible_query(Task, current_user.id).filter(
+            Task.id.in_([task_id for task_id, _ in hits])
+        ).options(selectinload(Task.owner))}
+    # A task can be unshared between the two queries
+    hits = [(task_id, score) for task_id, score in hits if task_id in rows]
+
+    data = tasks_schema.dump([rows[task_id][0] for task_id, _ in hits])
+    for item, (task_id, score) in zip(data, hits):
+        item['access_type'] = rows[task_id][1]
+        item['score'] = score
+
+    response = jsonify(data)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = encode_cursor(next_cursor)
+    return response
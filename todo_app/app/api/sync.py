@@ -0,0 +1,57 @@
+from flask import Blueprint, current_app, request, jsonify
+from flask_login import login_required, current_user
+from app.api.checklists import checklists_schema
+from app.api.comments import comments_schema
+from app.api.events import serialize_event
+from app.schemas import TaskSchema
+from app.services.pagination import PaginationError, decode_cursor, encode_cursor
+from app.services.sync import changes_since
+from datetime import datetime, timedelta
+
+sync_bp = Blueprint('sync', __name__)
+tasks_schema = TaskSchema(many=True)
+
+@sync_bp.route('/sync', methods=['GET'])
+@login_required
+def sync():
+    # No cursor: full snapshot. Clients store the returned cursor, send it back
+    # next time, and apply 'deleted' before upserting the changed rows.
+    since = None
+    if request.args.get('cursor'):
+        try:
+            since, = decode_cursor(request.args['cursor'])
+        except (PaginationError, ValueError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if not isinstance(since, datetime):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # Taken before reading so nothing committed meanwhile falls between cursors
+    overlap = timedelta(seconds=current_app.config.get('SYNC_CURSOR_OVERLAP', 5))
+    next_cursor = encode_cursor([datetime.utcnow() - overlap])
+
+    changes = changes_since(current_user.id, since)
+
+    tasks = tasks_schema.dump([task for task, _ in changes['tasks']])
+    for item, (_, access) in zip(tasks, changes['tasks']):
+        item['access_type'] = access
+
+    return jsonify({
+        'cursor': next_cursor,
+        'tasks': tasks,
+        'events': [serialize_event(e, access) for e, access in changes['events']],
+        'comments': comments_schema.dump(changes['comments']),
+        'checklist_items': checklists_schema.dump(changes['checklist_items']),
+        'shares': [{
+            'id': s.id,
+            'item_type': s.item_type,
+            'item_id': s.item_id,
+            'owner_id': s.owner_id,
+            'shared_with_id': s.shared_with_id,
+            'permission': s.permission
+        } for s in changes['shares']],
+        'deleted': [{
+            'item_type': t.item_type,
+            'item_id': t.item_id,
+            'deleted_at': t.deleted_at.isoformat()
+        } for t in changes['deleted']],
+    })
@@ -1,67 +1,218 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models.task import Task
-from app.models.shared import SharedItem
 from app.schemas import TaskSchema
+from app.services.access import access_for, can_edit, delete_shares, load_visible, visible_ids, visible_query
+from app.services.custom_fields import apply_field_filters
+from app.services.dependencies import CycleError, add_dependency, remove_dependency
+from app.services.hierarchy import (
+    ancestor_ids, build_forest, descendant_count, parse_max_depth, set_parent, subtree_rows
+)
+from app.services.pagination import PaginationError, page_args, paginate
+from app.services.ranking import check_rank_length, neighbour_rank, rank_between, rank_last, rebalance_siblings
 from datetime import datetime
 
 tasks_bp = Blueprint('tasks', __name__)
 task_schema = TaskSchema()
 tasks_schema = TaskSchema(many=True)
 
+# Legacy frontend sends priority as text ('medium')
+PRIORITY_MAP = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+def parse_priority(priority):
+    if isinstance(priority, str):
+        return PRIORITY_MAP.get(priority.lower(), 2)
+    return priority
+
+def parse_deadline(value):
+    return datetime.fromisoformat(value) if value else None
+
+def parse_parent_id(value):
+    # The dashboard form posts the id as a string
+    return int(value) if value not in (None, '') else None
+
+def build_task(data, user_id):
+    task = Task(
+        title=data.get('title'),
+        description=data.get('description', ''),
+        status=data.get('status', 'pending'),
+        priority=parse_priority(data.get('priority')) or 2,
+        deadline=parse_deadline(data.get('deadline')),
+        user_id=user_id,
+        project_id=data.get('project_id')
+    )
+    set_parent(task, parse_parent_id(data.get('parent_id')), user_id)
+    task.order = rank_last(task.parent_id, user_id)
+    return task
+
+def apply_task_update(task, data, user_id):
+    # Parse and move first so a bad deadline or parent leaves the task untouched
+    deadline = parse_deadline(data.get('deadline')) if 'deadline' in data else task.deadline
+    if 'parent_id' in data:
+        parent_id = parse_parent_id(data['parent_id'])
+        if parent_id != task.parent_id:
+            set_parent(task, parent_id, user_id)
+            task.order = rank_last(parent_id, task.user_id, task.id)
+
+    if 'title' in data:
+        task.title = data['title']
+    if 'description' in data:
+        task.description = data['description']
+    if 'status' in data:
+        task.status = data['status']
+        if task.status == 'completed' and not task.completed_at:
+            task.completed_at = datetime.utcnow()
+    
+    if 'priority' in data:
+        task.priority = parse_priority(data.get('priority'))
+        
+    task.deadline = deadline
+
+def _id_filter(column, value):
+    # 'none' selects rows without a value, e.g. top-level tasks for parent_id
+    if value.lower() in ('none', 'null'):
+        return column.is_(None)
+    return column == int(value)
+
+def apply_task_filters(query, args):
+    if args.get('status'):
+        query = query.filter(Task.status.in_(args['status'].split(',')))
+    if args.get('priority'):
+        priorities = []
+        for p in args['priority'].split(','):
+            priorities.append(int(p) if p.isdigit() else parse_priority(p))
+        query = query.filter(Task.priority.in_(priorities))
+    try:
+        if args.get('project_id'):
+            query = query.filter(_id_filter(Task.project_id, args['project_id']))
+        if args.get('parent_id'):
+            query = query.filter(_id_filter(Task.parent_id, args['parent_id']))
+    except ValueError:
+        raise PaginationError('project_id and parent_id must be integers or "none"')
+    return query
+
 @tasks_bp.route('/tasks', methods=['GET'])
 @tasks_bp.route('/todos', methods=['GET']) # Backward compatibility alias
 @login_required
 def get_tasks():
-    # Own tasks
-    own_tasks = Task.query.filter_by(user_id=current_user.id).all()
-    
-    # Shared tasks
-    shared_items = SharedItem.query.filter_by(shared_with_id=current_user.id, item_type='todo').all() 
-    # Note: 'todo' legacy type, or 'task' new type. I should check both or standardize.
-    # I will standardize on 'task' for new, but keep 'todo' check if migration didn't update it.
-    
-    shared_task_ids = [item.item_id for item in shared_items]
-    shared_tasks = Task.query.filter(Task.id.in_(shared_task_ids)).all()
-    
-    # Serialize
-    own_data = tasks_schema.dump(own_tasks)
-    shared_data = tasks_schema.dump(shared_tasks)
-    
-    # Add access_type
-    for task in own_data:
-        task['access_type'] = 'owner'
-        
-    for task in shared_data:
-        # Find permission
-        item = next((i for i in shared_items if i.item_id == task['id']), None)
-        task['access_type'] = item.permission if item else 'view'
-        
-    return jsonify(own_data + shared_data)
+    # owner_name is part of every row, load all owners in one extra query
+    query = visible_query(Task, current_user.id).options(selectinload(Task.owner))
+
+    # Newest first, board order (?sort=order, usually with parent_id) or a
+    # custom field (?sort=field.<id>); id breaks ties so the order (and the
+    # cursor) is stable
+    try:
+        query = apply_task_filters(query, request.args)
+        query, field_sort = apply_field_filters(query, request.args, current_user)
+        limit, cursor = page_args(request.args)
+        if field_sort is not None:
+            column, descending = field_sort
+            rows, next_cursor = paginate(query, [column, Task.id], cursor, limit, descending=descending,
+                                         row_key=lambda row: [row[2], row[0].id])
+        elif request.args.get('sort') == 'order':
+            rows, next_cursor = paginate(query, [Task.order, Task.id], cursor, limit, descending=False,
+                                         row_key=lambda row: [row[0].order, row[0].id])
+        else:
+            rows, next_cursor = paginate(query, [Task.created_at, Task.id], cursor, limit,
+                                         row_key=lambda row: [row[0].created_at, row[0].id])
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    data = tasks_schema.dump([row[0] for row in rows])
+    for item, row in zip(data, rows):
+        item['access_type'] = row[1]
+
+    response = jsonify(data)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@tasks_bp.route('/tasks/<int:task_id>/subtree', methods=['GET'])
+@tasks_bp.route('/todos/<int:task_id>/subtree', methods=['GET'])
+@login_required
+def get_task_subtree(task_id):
+    if not access_for(Task, task_id, current_user.id):
+        return jsonify({'error': 'Task not found'}), 404
+    try:
+        max_depth = parse_max_depth(request.args)
+    except ValueError:
+        return jsonify({'error': 'max_depth must be a non-negative integer'}), 400
+
+    # Only the visible part of the subtree, nested under the visible subtasks
+    rows = subtree_rows(Task.id == task_id, current_user.id, max_depth)
+    return jsonify(build_forest(rows, tasks_schema.dump)[0])
+
+@tasks_bp.route('/tasks/<int:task_id>/ancestors', methods=['GET'])
+@tasks_bp.route('/todos/<int:task_id>/ancestors', methods=['GET'])
+@login_required
+def get_task_ancestors(task_id):
+    if not access_for(Task, task_id, current_user.id):
+        return jsonify({'error': 'Task not found'}), 404
+    task = db.session.get(Task, task_id)
+
+    # Breadcrumbs root first, skipping ancestors that aren't visible to the user
+    ids = ancestor_ids(task)
+    titles = dict(db.session.query(Task.id, Task.title).filter(
+        Task.id.in_(ids), Task.id.in_(visible_ids(Task, current_user.id))
+    ).all()) if ids else {}
+    return jsonify({
+        'task_id': task_id,
+        'ancestors': [{'id': id, 'title': titles[id]} for id in ids if id in titles],
+        'descendant_count': descendant_count(task)
+    })
+
+def load_dependency_pair(task_id, blocker_id):
+    """(blocker, blocked, error response). Editing the blocked task, seeing the blocker."""
+    visible = load_visible(Task, [task_id, blocker_id], current_user.id)
+    if task_id not in visible or blocker_id not in visible:
+        return None, None, (jsonify({'error': 'Task not found'}), 404)
+    if not can_edit(visible[task_id][1]):
+        return None, None, (jsonify({'error': 'Permission denied'}), 403)
+    return visible[blocker_id][0], visible[task_id][0], None
+
+@tasks_bp.route('/tasks/<int:task_id>/dependencies', methods=['POST'])
+@tasks_bp.route('/todos/<int:task_id>/dependencies', methods=['POST'])
+@login_required
+def create_dependency(task_id):
+    data = request.get_json(silent=True) or {}
+    blocker_id = data.get('blocker_id')
+    if not isinstance(blocker_id, int):
+        return jsonify({'error': 'blocker_id must be an integer'}), 400
+    blocker, blocked, error = load_dependency_pair(task_id, blocker_id)
+    if error:
+        return error
+
+    try:
+        created = add_dependency(blocker, blocked)
+    except CycleError as e:
+        return jsonify({'error': str(e)}), 409
+    db.session.commit()
+    return jsonify({'blocker_id': blocker_id, 'blocked_id': task_id}), 201 if created else 200
+
+@tasks_bp.route('/tasks/<int:task_id>/dependencies/<int:blocker_id>', methods=['DELETE'])
+@tasks_bp.route('/todos/<int:task_id>/dependencies/<int:blocker_id>', methods=['DELETE'])
+@login_required
+def delete_dependency(task_id, blocker_id):
+    blocker, blocked, error = load_dependency_pair(task_id, blocker_id)
+    if error:
+        return error
+    if not remove_dependency(blocker, blocked):
+        return jsonify({'error': 'Dependency not found'}), 404
+    db.session.commit()
+    return jsonify({'message': 'Dependency removed'})
 
 @tasks_bp.route('/tasks', methods=['POST'])
 @tasks_bp.route('/todos', methods=['POST'])
 @login_required
 def create_task():
     data = request.get_json()
-    
-    # Convert priority text to int if needed (legacy frontend sends 'medium')
-    priority_map = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
-    priority = data.get('priority')
-    if isinstance(priority, str):
-        priority = priority_map.get(priority.lower(), 2)
-    
-    new_task = Task(
-        title=data.get('title'),
-        description=data.get('description', ''),
-        status=data.get('status', 'pending'),
-        priority=priority or 2,
-        deadline=datetime.fromisoformat(data.get('deadline')) if data.get('deadline') else None,
-        user_id=current_user.id,
-        parent_id=data.get('parent_id'),
-        project_id=data.get('project_id')
-    )
+    try:
+        new_task = build_task(data, current_user.id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     db.session.add(new_task)
     db.session.commit()
@@ -72,44 +223,79 @@ def create_task():
 @tasks_bp.route('/todos/<int:task_id>', methods=['PUT'])
 @login_required
 def update_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    
-    # Check permissions
-    if task.user_id != current_user.id:
-        shared = SharedItem.query.filter_by(
-            item_type='todo', # or 'task'
-            item_id=task_id,
-            shared_with_id=current_user.id,
-            permission='edit'
-        ).first()
-        if not shared:
-            return jsonify({'error': 'Permission denied'}), 403
+    # Tasks the user can't see are not found, shared read-only ones are forbidden
+    access = access_for(Task, task_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Task not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+    task = db.session.get(Task, task_id)
 
     data = request.get_json()
-    
-    if 'title' in data:
-        task.title = data['title']
-    if 'description' in data:
-        task.description = data['description']
-    if 'status' in data:
-        task.status = data['status']
-        if task.status == 'completed' and not task.completed_at:
-            task.completed_at = datetime.utcnow()
-    
-    if 'priority' in data:
-        priority_map = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
-        priority = data.get('priority')
-        if isinstance(priority, str):
-            priority = priority_map.get(priority.lower(), 2)
-        task.priority = priority
-        
-    if 'deadline' in data:
-         task.deadline = datetime.fromisoformat(data.get('deadline')) if data.get('deadline') else None
-         
-    if 'parent_id' in data:
-        task.parent_id = data['parent_id']
+    try:
+        apply_task_update(task, data, current_user.id)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    db.session.commit()
+    return task_schema.jsonify(task)
+
+def load_sibling(task, sibling_id):
+    sibling = db.session.get(Task, sibling_id) if isinstance(sibling_id, int) else None
+    if sibling is None or sibling.id == task.id or sibling.parent_id != task.parent_id or (
+            task.parent_id is None and sibling.user_id != task.user_id):
+        raise ValueError('after_id and before_id must be siblings of the task')
+    return sibling
+
+@tasks_bp.route('/tasks/<int:task_id>/move', methods=['POST'])
+@tasks_bp.route('/todos/<int:task_id>/move', methods=['POST'])
+@login_required
+def move_task(task_id):
+    # Body: {"parent_id": 3, "after_id": 7, "before_id": 9}, all optional.
+    # Only the moved task's rank is written
+    access = access_for(Task, task_id, current_user.id)
+    if access is None:
+        return jsonify({'error': 'Task not found'}), 404
+    if not can_edit(access):
+        return jsonify({'error': 'Permission denied'}), 403
+    task = db.session.get(Task, task_id)
+
+    data = request.get_json(silent=True) or {}
+    try:
+        if 'parent_id' in data:
+            parent_id = parse_parent_id(data['parent_id'])
+            if parent_id != task.parent_id:
+                set_parent(task, parent_id, current_user.id)
+        after = load_sibling(task, data['after_id']) if data.get('after_id') is not None else None
+        before = load_sibling(task, data['before_id']) if data.get('before_id') is not None else None
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    def neighbours():
+        low = after.order if after else None
+        high = before.order if before else None
+        if after and not before:
+            high = neighbour_rank(task.parent_id, task.user_id, low, True, task.id)
+        elif before and not after:
+            low = neighbour_rank(task.parent_id, task.user_id, high, False, task.id)
+        elif not after:
+            low = neighbour_rank(task.parent_id, task.user_id, None, False, task.id)
+        return low, high
 
+    low, high = neighbours()
+    if low is not None and high is not None and low >= high:
+        if after and before and after.order > before.order:
+            db.session.rollback()
+            return jsonify({'error': 'after_id must come before before_id'}), 400
+        # Equal keys (e.g. tasks created in one batch): respread, then retry
+        rebalance_siblings(task.parent_id, task.user_id)
+        low, high = neighbours()
+
+    task.order = rank_between(low, high)
     db.session.commit()
+    check_rank_length(task)
     return task_schema.jsonify(task)
 
 @tasks_bp.route('/tasks/<int:task_id>', methods=['DELETE'])
@@ -121,9 +307,107 @@ def delete_task(task_id):
         return jsonify({'error': 'Task not found or permission denied'}), 404
         
     # Delete shared items
-    SharedItem.query.filter_by(item_type='todo', item_id=task_id).delete()
+    delete_shares('todo', [task_id])
     
     db.session.delete(task)
     db.session.commit()
     
     return jsonify({'message': 'Task deleted successfully'})
+
+@tasks_bp.route('/tasks/batch', methods=['POST'])
+@tasks_bp.route('/todos/batch', methods=['POST'])
+@login_required
+def batch_tasks():
+    # Body: {"operations": [{"op": "create", "data": {...}},
+    #                       {"op": "update", "id": 1, "data": {...}},
+    #                       {"op": "delete", "id": 2}]}
+    data = request.get_json()
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list):
+        return jsonify({'error': 'operations must be a list'}), 400
+    max_ops = current_app.config.get('TASK_BATCH_MAX_OPERATIONS', 500)
+    if len(operations) > max_ops:
+        return jsonify({'error': f'At most {max_ops} operations per batch'}), 400
+
+    # One permission pass for every task the batch touches
+    ids = {op.get('id') for op in operations if isinstance(op, dict) and isinstance(op.get('id'), int)}
+    visible = load_visible(Task, list(ids), current_user.id)
+
+    results = []
+    created = []
+    deleted = {}
+    last_ranks = {} # sibling group -> last key handed out in this batch
+
+    def rank_after_batch(task):
+        # rank_last can't see the batch's unflushed tasks, chain them instead
+        group = (task.parent_id, task.user_id if task.parent_id is None else None)
+        if group in last_ranks:
+            task.order = rank_between(last_ranks[group], None)
+        last_ranks[group] = task.order
+
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        result = {'index': index, 'op': kind}
+        results.append(result)
+        if kind not in ('create', 'update', 'delete'):
+            result.update(status=400, error='op must be create, update or delete')
+            continue
+        data = op.get('data') or {}
+        if not isinstance(data, dict):
+            result.update(status=400, error='data must be an object')
+            continue
+        try:
+            if kind == 'create':
+                if not data.get('title'):
+                    result.update(status=400, error='Title is required')
+                    continue
+                task = build_task(data, current_user.id)
+                rank_after_batch(task)
+                created.append((result, task))
+                result['status'] = 201
+                continue
+
+            task_id = op.get('id')
+            result['id'] = task_id
+            task, access = visible.get(task_id, (None, None))
+            if task is None or task_id in deleted:
+                result.update(status=404, error='Task not found')
+            elif kind == 'update':
+                if not can_edit(access):
+                    result.update(status=403, error='Permission denied')
+                    continue
+                parent_id = task.parent_id
+                apply_task_update(task, data, current_user.id)
+                if task.parent_id != parent_id:
+                    rank_after_batch(task)
+                result.update(status=200, task=task)
+            else:
+                if access != 'owner':
+                    result.update(status=403, error='Permission denied')
+                    continue
+                deleted[task_id] = task
+                result['status'] = 200
+        except (TypeError, ValueError) as e:
+            result.update(status=400, error=str(e))
+
+    if created:
+        db.session.add_all([task for _, task in created])
+    if deleted:
+        delete_shares('todo', list(deleted))
+        for task in deleted.values():
+            db.session.delete(task)
+
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Batch rejected, no changes were applied'}), 400
+
+    for result, task in created:
+        result.update(id=task.id, task=task)
+    for result in results:
+        if 'task' in result:
+            result['task'] = task_schema.dump(result['task'])
+
+    db.session.commit()
+    return jsonify({'results': results})
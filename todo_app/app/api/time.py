@@ -1,10 +1,15 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models.time import TimeEntry
 from app.models.task import Task
+from app.services.time_reports import (
+    ReportError, max_entry_hours, parse_group_by, parse_range, report_query, report_row
+)
 from marshmallow import Schema, fields
-from datetime import datetime
+from datetime import datetime, timedelta
 
 time_bp = Blueprint('time', __name__)
 
@@ -39,7 +44,7 @@ def start_timer(task_id):
     )
     db.session.add(entry)
     db.session.commit()
-    return time_schema.jsonify(entry), 201
+    return jsonify(time_schema.dump(entry)), 201
 
 @time_bp.route('/tasks/<int:task_id>/time/stop', methods=['POST'])
 @login_required
@@ -48,8 +53,65 @@ def stop_timer(task_id):
     if not entry:
         return jsonify({'error': 'No active timer for this task'}), 404
         
-    entry.end_time = datetime.utcnow()
+    # A timer left running is cut off at the longest entry time reports expect
+    entry.end_time = min(datetime.utcnow(), entry.start_time + timedelta(hours=max_entry_hours()))
     entry.duration = int((entry.end_time - entry.start_time).total_seconds())
     
     db.session.commit()
-    return time_schema.jsonify(entry)
+    return jsonify(time_schema.dump(entry))
+
+def _csv_cell(value):
+    # Spreadsheets run text starting with these as a formula (CSV injection)
+    if isinstance(value, str) and value.startswith(('=', '+', '-', '@', '\t', '\r')):
+        return "'" + value
+    return value
+
+@time_bp.route('/time/report', methods=['GET'])
+@login_required
+def time_report():
+    # ?start=2026-01-01&end=2026-03-31&tz=Europe/Berlin&group_by=project,day
+    # [&task_id=&project_id=&user_id=][&format=csv]
+    try:
+        report_range = parse_range(request.args)
+        group_by = parse_group_by(request.args)
+        filters = {}
+        for arg, name in (('task_id', 'task_id'), ('project_id', 'project_id'), ('user_id', 'member_id')):
+            if request.args.get(arg):
+                filters[name] = int(request.args[arg])
+    except ValueError as e:
+        message = str(e) if isinstance(e, ReportError) else 'task_id, project_id and user_id must be integers'
+        return jsonify({'error': message}), 400
+
+    # Running timers count up to the same instant in every row
+    now = datetime.utcnow()
+    query = report_query(current_user.id, report_range, group_by, now=now, **filters)
+
+    if request.args.get('format') == 'csv':
+        rows = db.session.execute(query.execution_options(yield_per=500))
+
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([*rows.keys(), 'hours'])
+            for row in rows:
+                data = report_row(row)
+                writer.writerow([*map(_csv_cell, data.values()), round(data['seconds'] / 3600, 2)])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        filename = f'time-report-{report_range.start.isoformat()}-{report_range.end.isoformat()}.csv'
+        return Response(stream_with_context(generate()), mimetype='text/csv', headers={
+            'Content-Disposition': f'attachment; filename={filename}'
+        })
+
+    rows = [report_row(row) for row in db.session.execute(query)]
+    return jsonify({
+        'start': report_range.start.isoformat(),
+        'end': report_range.end.isoformat(),
+        'tz': str(report_range.tz),
+        'group_by': group_by,
+        'generated_at': now.isoformat(),
+        'total_seconds': sum(row['seconds'] for row in rows),
+        'rows': rows
+    })
@@ -1,10 +1,12 @@
 from app.models.user import User
 from app.models.task import Task
-from app.models.event import Event
-from app.models.project import Project
+from app.models.event import Event, EventException
+from app.models.project import Project, ProjectStats
 from app.models.shared import SharedItem
 from app.models.comment import Comment
 from app.models.activity import ActivityLog
 from app.models.notification import Notification
 from app.models.custom_field import CustomFieldDefinition, CustomFieldValue
 from app.models.time import TimeEntry
+from app.models.tombstone import Tombstone
+from app.models.search import SearchPosting
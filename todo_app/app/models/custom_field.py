@@ -3,11 +3,14 @@ from datetime import datetime
 
 class CustomFieldDefinition(db.Model):
     __tablename__ = 'custom_field_definitions'
+    __table_args__ = (
+        db.Index('ix_custom_field_definitions_user_id', 'user_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     field_type = db.Column(db.String(20), nullable=False) # 'text', 'number', 'date', 'select'
-    options = db.Column(db.Text) # For 'select' type, comma-separated options
+    options = db.Column(db.Text) # For 'select' type, comma-separated options (see services.custom_fields)
     
     # Ownership (Global for now, or per user/project)
     # For simplicity in this iteration, let's make them per-user (so users can define their own fields)
@@ -20,6 +23,13 @@ class CustomFieldDefinition(db.Model):
 
 class CustomFieldValue(db.Model):
     __tablename__ = 'custom_field_values'
+    __table_args__ = (
+        db.Index('uq_custom_field_values_task_definition', 'task_id', 'field_definition_id', unique=True),
+        # One per typed column, for filtering and sorting tasks by a field
+        db.Index('ix_custom_field_values_definition_number', 'field_definition_id', 'number_value'),
+        db.Index('ix_custom_field_values_definition_date', 'field_definition_id', 'date_value'),
+        db.Index('ix_custom_field_values_definition_option', 'field_definition_id', 'option_index'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -27,10 +37,14 @@ class CustomFieldValue(db.Model):
     field_definition_id = db.Column(db.Integer, db.ForeignKey('custom_field_definitions.id'), nullable=False)
     
     value = db.Column(db.Text)
+    # Parsed copy of value, set by services.custom_fields.set_value for the definition's field_type
+    number_value = db.Column(db.Float)
+    date_value = db.Column(db.DateTime)
+    option_index = db.Column(db.Integer) # Position in the definition's options
     
     # Relationships
     definition = db.relationship('CustomFieldDefinition')
-    task = db.relationship('Task', backref=db.backref('custom_fields', lazy='dynamic'))
+    task = db.relationship('Task', backref=db.backref('custom_fields', lazy='dynamic', cascade='all, delete-orphan'))
 
     def __repr__(self):
         return f'<CustomFieldValue {self.value}>'
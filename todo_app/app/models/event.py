@@ -3,6 +3,18 @@ from datetime import datetime
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_user_id_updated_at', 'user_id', 'updated_at'),
+        # Calendar range queries: seek on start_date, check end_date from the index
+        db.Index('ix_events_user_id_start_date_end_date', 'user_id', 'start_date', 'end_date'),
+        # Free/busy: events ending after the window start (app/services/freebusy.py)
+        db.Index('ix_events_user_id_end_date_start_date', 'user_id', 'end_date', 'start_date'),
+        # Recurring series of a user, few per user and needed by every range lookup
+        db.Index('ix_events_user_id_recurring', 'user_id', 'start_date',
+                 sqlite_where=db.text('rrule IS NOT NULL'), postgresql_where=db.text('rrule IS NOT NULL')),
+        # Reminder scheduler loads the next window from here
+        db.Index('ix_events_remind_at', 'remind_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -13,9 +25,42 @@ class Event(db.Model):
     color = db.Column(db.String(7), default='#3498db')
     location = db.Column(db.String(200))
     reminder = db.Column(db.Integer, default=0) # Minutes before
+    remind_at = db.Column(db.DateTime) # Next reminder to send (app/services/reminders.py)
+    # Recurrence (app/services/recurrence.py), e.g. 'FREQ=WEEKLY;BYDAY=MO,WE'.
+    # recurrence_end is when the last occurrence ends, NULL if the series is open-ended
+    rrule = db.Column(db.String(255))
+    recurrence_end = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic locking: the ORM bumps it on every update and refuses to
+    # write over a newer version (served as the ETag by PUT /api/events/<id>)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    __mapper_args__ = {'version_id_col': version}
+
+    exceptions = db.relationship('EventException', backref='event', cascade='all, delete-orphan',
+                                 order_by='EventException.original_start')
+
     def __repr__(self):
         return f'<Event {self.title}>'
+
+class EventException(db.Model):
+    """One occurrence of a recurring event that was cancelled or changed."""
+    __tablename__ = 'event_exceptions'
+    __table_args__ = (
+        db.Index('uq_event_exceptions_event_original_start', 'event_id', 'original_start', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
+    original_start = db.Column(db.DateTime, nullable=False) # Which occurrence
+    cancelled = db.Column(db.Boolean, default=False, nullable=False)
+    # Overrides for a moved/edited occurrence, NULL keeps the series value
+    start_date = db.Column(db.DateTime)
+    end_date = db.Column(db.DateTime)
+    title = db.Column(db.String(200))
+
+    def __repr__(self):
+        return f'<EventException {self.event_id}@{self.original_start}>'
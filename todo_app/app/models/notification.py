@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_id_is_read', 'user_id', 'is_read'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.String(255), nullable=False)
@@ -13,6 +17,7 @@ class Notification(db.Model):
     
     # Optional links
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=True)
     
     user = db.relationship('User', backref=db.backref('notifications', lazy='dynamic'))
 
@@ -3,6 +3,9 @@ from datetime import datetime
 
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_owner_id', 'owner_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -13,6 +16,22 @@ class Project(db.Model):
 
     # Relationships
     tasks = db.relationship('Task', backref='project', lazy='dynamic')
+    stats = db.relationship('ProjectStats', uselist=False, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Project {self.title}>'
+
+# Rollup of a project's tasks, kept current on flush by services.project_stats
+class ProjectStats(db.Model):
+    __tablename__ = 'project_stats'
+
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    in_progress_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_count = db.Column(db.Integer, nullable=False, default=0)
+    tracked_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ProjectStats {self.project_id}>'
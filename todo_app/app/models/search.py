@@ -0,0 +1,20 @@
+from app import db
+
+class SearchPosting(db.Model):
+    """One term of one indexed document, for the search index used when FTS5 isn't available.
+
+    ``doc_id`` packs the source row as ``source_id * 3 + kind`` (see services.search).
+    """
+    __tablename__ = 'search_postings'
+    __table_args__ = (
+        # Removing a document's postings on update/delete
+        db.Index('ix_search_postings_doc_id', 'doc_id'),
+    )
+
+    term = db.Column(db.String(64), primary_key=True)
+    doc_id = db.Column(db.BigInteger, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    weight = db.Column(db.Float, nullable=False) # Term frequency, title terms count triple
+
+    def __repr__(self):
+        return f'<SearchPosting {self.term}:{self.doc_id}>'
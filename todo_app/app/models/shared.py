@@ -3,6 +3,14 @@ from datetime import datetime
 
 class SharedItem(db.Model):
     __tablename__ = 'shared_items'
+    __table_args__ = (
+        # "What is shared with me" (access.visible_query)
+        db.Index('ix_shared_items_shared_with_type_item', 'shared_with_id', 'item_type', 'item_id'),
+        # One share per item and user; also serves lookups by (item_type, item_id)
+        db.Index('uq_shared_items_item_user', 'item_type', 'item_id', 'shared_with_id', unique=True),
+        db.Index('ix_shared_items_shared_with_updated_at', 'shared_with_id', 'updated_at'),
+        db.Index('ix_shared_items_owner_updated_at', 'owner_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     item_type = db.Column(db.String(20), nullable=False) # 'todo', 'task', 'event', 'project'
@@ -11,6 +19,7 @@ class SharedItem(db.Model):
     shared_with_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     permission = db.Column(db.String(20), default='view') # 'view', 'edit'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     owner = db.relationship('User', foreign_keys=[owner_id], backref='shared_owned_items')
@@ -4,11 +4,24 @@ from datetime import datetime
 # Association table for dependencies
 task_dependencies = db.Table('task_dependencies',
     db.Column('blocker_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True),
-    db.Column('blocked_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True)
+    db.Column('blocked_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True),
+    # The primary key covers lookups by blocker_id, this one covers blocked_by
+    db.Index('ix_task_dependencies_blocked_id', 'blocked_id')
 )
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_user_id_created_at', 'user_id', 'created_at'),
+        # Sibling listings by rank; also covers lookups by parent_id
+        db.Index('ix_tasks_parent_id_order', 'parent_id', 'order'),
+        db.Index('ix_tasks_user_id_top_level_order', 'user_id', 'order',
+                 sqlite_where=db.text('parent_id IS NULL'), postgresql_where=db.text('parent_id IS NULL')),
+        db.Index('ix_tasks_path', 'path'),
+        # Project lookups, and overdue counts for the project summary
+        db.Index('ix_tasks_project_id_deadline', 'project_id', 'deadline'),
+        db.Index('ix_tasks_user_id_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -18,6 +31,7 @@ class Task(db.Model):
     deadline = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Ownership
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -25,7 +39,11 @@ class Task(db.Model):
     
     # Hierarchy
     parent_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
-    order = db.Column(db.Integer, default=0)
+    # Ancestor ids root first, e.g. '/1/5/' for a child of 5 (top level: '/').
+    # Kept in sync with parent_id by services.hierarchy.set_parent
+    path = db.Column(db.String(512), nullable=False, default='/', server_default='/')
+    # Fractional rank key among siblings, see services.ranking
+    order = db.Column(db.String(64), nullable=False, default='i', server_default='i')
 
     # Relationships
     subtasks = db.relationship('Task', 
@@ -49,12 +67,17 @@ class Task(db.Model):
 
 class ChecklistItem(db.Model):
     __tablename__ = 'checklist_items'
+    __table_args__ = (
+        db.Index('ix_checklist_items_task_id', 'task_id'),
+        db.Index('ix_checklist_items_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
     content = db.Column(db.String(200), nullable=False)
     is_completed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<ChecklistItem {self.content}>'
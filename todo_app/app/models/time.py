@@ -3,6 +3,13 @@ from datetime import datetime
 
 class TimeEntry(db.Model):
     __tablename__ = 'time_entries'
+    __table_args__ = (
+        # Running timer lookups filter on end_time IS NULL
+        db.Index('ix_time_entries_user_id_end_time', 'user_id', 'end_time'),
+        db.Index('ix_time_entries_task_id', 'task_id'),
+        # Date range scans for reports
+        db.Index('ix_time_entries_start_time', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
@@ -17,7 +24,7 @@ class TimeEntry(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
-    task = db.relationship('Task', backref=db.backref('time_entries', lazy='dynamic'))
+    task = db.relationship('Task', backref=db.backref('time_entries', lazy='dynamic', cascade='all, delete-orphan'))
     user = db.relationship('User', backref=db.backref('time_entries', lazy='dynamic'))
 
     def __repr__(self):
@@ -0,0 +1,29 @@
+from app import db
+from datetime import datetime
+
+class Tombstone(db.Model):
+    """Record of a deleted (or unshared) row, kept so /api/sync can report removals."""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_type = db.Column(db.String(20), nullable=False) # 'todo', 'event', 'comment', 'checklist_item', 'share'
+    item_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # One row per user who could see the item and has to drop it
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    def __repr__(self):
+        return f'<Tombstone {self.item_type}:{self.item_id} for {self.user_id}>'
+
+    @staticmethod
+    def for_share(share_id, item_type, item_id, owner_id, shared_with_id):
+        """Rows for a removed share: both sides lose the share, the recipient loses the item."""
+        return [
+            {'item_type': 'share', 'item_id': share_id, 'user_id': owner_id},
+            {'item_type': 'share', 'item_id': share_id, 'user_id': shared_with_id},
+            {'item_type': item_type, 'item_id': item_id, 'user_id': shared_with_id},
+        ]
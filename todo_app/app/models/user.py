@@ -15,6 +15,11 @@ class User(UserMixin, db.Model):
     avatar = db.Column(db.String(255), default='default_avatar.png')
     about_me = db.Column(db.Text)
     
+    # Maintained by app/services/notifications.py so the badge needs no COUNT(*)
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by app/services/custom_fields.py when the user's custom field definitions change
+    custom_fields_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -4,7 +4,7 @@ from app.models.event import Event
 from app.models.project import Project
 from app.models.user import User
 from app.models.shared import SharedItem
-from marshmallow import fields
+from marshmallow import Schema, fields
 
 class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -17,7 +17,10 @@ class TaskSchema(ma.SQLAlchemyAutoSchema):
         model = Task
         load_instance = True
         include_fk = True
+        # Internal: rewritten for whole subtrees on moves without bumping updated_at
+        exclude = ('path',)
     
+    # Listing endpoints selectinload Task.owner so this doesn't lazy load per row
     owner_name = fields.Method("get_owner_name")
     
     def get_owner_name(self, obj):
@@ -54,3 +57,11 @@ class SharedItemSchema(ma.SQLAlchemyAutoSchema):
         
     def get_email(self, obj):
         return obj.shared_with.email
+
+class NotificationSchema(Schema):
+    id = fields.Int()
+    message = fields.Str()
+    is_read = fields.Bool()
+    created_at = fields.DateTime()
+    task_id = fields.Int()
+    event_id = fields.Int()
@@ -0,0 +1 @@
+# Business logic shared between blueprints (see DETAILED_PLAN.md, "services/").
@@ -0,0 +1,88 @@
+from sqlalchemy import func, insert, literal, or_, select
+from app import db
+from app.models.shared import SharedItem
+from app.models.tombstone import Tombstone
+
+# SharedItem.item_type used for each shareable model. Tasks are still stored
+# under the legacy 'todo' type (see sharing.share_item).
+ITEM_TYPES = {
+    'Task': 'todo',
+    'Event': 'event',
+}
+
+def _owner_column(model):
+    return model.owner_id if hasattr(model, 'owner_id') else model.user_id
+
+def visible_query(model, user_id):
+    """Query of ``(item, access_type)`` for everything ``user_id`` can see.
+
+    access_type is 'owner' for own rows, otherwise the SharedItem permission.
+    Both halves are resolved in SQL (UNION ALL against shared_items), so
+    callers can keep filtering, ordering and paginating on ``model`` columns.
+    """
+    owner = _owner_column(model)
+    own = db.session.query(model, literal('owner').label('access_type')).filter(owner == user_id)
+    shared = db.session.query(model, func.coalesce(SharedItem.permission, 'view').label('access_type')).join(
+        SharedItem, SharedItem.item_id == model.id
+    ).filter(
+        SharedItem.item_type == ITEM_TYPES[model.__name__],
+        SharedItem.shared_with_id == user_id,
+        owner != user_id
+    )
+    return own.union_all(shared)
+
+def access_for(model, item_id, user_id):
+    """access_type of a single item for ``user_id``, or None if not visible."""
+    row = visible_query(model, user_id).filter(model.id == item_id).first()
+    return row[1] if row else None
+
+def visible_ids(model, user_id):
+    """SELECT of the ids visible to ``user_id``, for ``column.in_(...)`` filters."""
+    own = select(model.id).where(_owner_column(model) == user_id)
+    shared = select(SharedItem.item_id).where(
+        SharedItem.item_type == ITEM_TYPES[model.__name__],
+        SharedItem.shared_with_id == user_id
+    )
+    return own.union(shared)
+
+def visible_clause(model, id_column, user_id):
+    """WHERE clause: ``id_column`` holds the id of a ``model`` row visible to ``user_id``.
+
+    Two correlated EXISTS lookups instead of ``visible_ids``, for queries
+    that should be driven by another index rather than by the visible ids.
+    """
+    own = select(model.id).where(model.id == id_column, _owner_column(model) == user_id).exists()
+    shared = select(SharedItem.id).where(
+        SharedItem.item_type == ITEM_TYPES[model.__name__],
+        SharedItem.item_id == id_column,
+        SharedItem.shared_with_id == user_id
+    ).exists()
+    return or_(own, shared)
+
+def load_visible(model, item_ids, user_id):
+    """{item_id: (item, access_type)} for the visible subset of ``item_ids``."""
+    if not item_ids:
+        return {}
+    rows = visible_query(model, user_id).filter(model.id.in_(item_ids)).all()
+    return {item.id: (item, access) for item, access in rows}
+
+def access_map(model, item_ids, user_id):
+    """{item_id: access_type} for the visible subset of ``item_ids``."""
+    return {item_id: access for item_id, (_, access) in load_visible(model, item_ids, user_id).items()}
+
+def can_edit(access_type):
+    return access_type in ('owner', 'edit')
+
+def delete_shares(item_type, item_ids):
+    """Bulk-delete the shares of the given items, leaving tombstones for /api/sync."""
+    if not item_ids:
+        return
+    shares = db.session.query(
+        SharedItem.id, SharedItem.item_type, SharedItem.item_id, SharedItem.owner_id, SharedItem.shared_with_id
+    ).filter(SharedItem.item_type == item_type, SharedItem.item_id.in_(item_ids)).all()
+    if not shares:
+        return
+
+    rows = [row for share in shares for row in Tombstone.for_share(*share)]
+    db.session.execute(insert(Tombstone), rows)
+    SharedItem.query.filter(SharedItem.id.in_([share.id for share in shares])).delete(synchronize_session=False)
@@ -0,0 +1,291 @@
+"""Typed custom field values.
+
+``CustomFieldValue.value`` keeps the text the client sent; ``set_value``
+also parses it into the typed column for the definition's field_type
+(number_value, date_value, or option_index for 'select'), so tasks can be
+filtered, sorted and aggregated by a field in SQL on the
+(field_definition_id, typed column) indexes.
+
+Task list filters are query string arguments named after the field:
+``field.<id>=v`` (equal), ``field.<id>.gte=v`` / ``.lte`` / ``.gt`` / ``.lt``
+and ``field.<id>.set=true|false``. ``sort=field.<id>`` (or
+``-field.<id>`` for descending) orders by the field and leaves out tasks
+without a value for it.
+
+Definitions are read through a process-local cache of each user's
+definitions (``user_definitions`` / ``definitions_by_id``), stored as
+``FieldDefinition`` snapshots with their options already parsed. Entries
+are checked against ``User.custom_fields_version``, which
+``bump_version`` increments whenever a user's definitions change, so every
+process sees the change on its next read.
+"""
+import math
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, func
+from sqlalchemy.orm import aliased
+from app import db
+from app.models.custom_field import CustomFieldDefinition, CustomFieldValue
+from app.models.task import Task
+from app.models.user import User
+from app.services.pagination import PaginationError
+
+FIELD_TYPES = ('text', 'number', 'date', 'select')
+TYPED_COLUMNS = {'text': 'value', 'number': 'number_value', 'date': 'date_value', 'select': 'option_index'}
+OPERATORS = {
+    'eq': lambda column, value: column == value,
+    'gte': lambda column, value: column >= value,
+    'lte': lambda column, value: column <= value,
+    'gt': lambda column, value: column > value,
+    'lt': lambda column, value: column < value,
+}
+
+def parse_options(options):
+    if not options:
+        return []
+    if isinstance(options, str):
+        options = options.split(',')
+    return [str(option).strip() for option in options if str(option).strip()]
+
+def parse_typed(definition, raw):
+    """The typed form of ``raw`` for ``definition``. Raises ValueError."""
+    if definition.field_type == 'number':
+        if isinstance(raw, bool):
+            raise ValueError
+        number = float(raw)
+        # 'inf' and 'nan' parse, but can't be compared, summed or stored everywhere
+        if not math.isfinite(number):
+            raise ValueError
+        return number
+    if definition.field_type == 'date':
+        return datetime.fromisoformat(str(raw))
+    if definition.field_type == 'select':
+        return definition.option_list.index(str(raw).strip())
+    return str(raw)
+
+def set_value(field_value, definition, raw):
+    """Store ``raw`` (None or '' clears it). Raises ValueError, leaving the row unchanged, if it doesn't fit."""
+    empty = raw is None or raw == ''
+    try:
+        typed = None if empty else parse_typed(definition, raw)
+    except (ValueError, TypeError):
+        if definition.field_type == 'select':
+            raise ValueError(f'{raw!r} is not an option of {definition.name!r}')
+        raise ValueError(f'{raw!r} is not a valid {definition.field_type} for {definition.name!r}')
+    field_value.value = None if empty else str(raw)
+    field_value.number_value = field_value.date_value = field_value.option_index = None
+    if definition.field_type != 'text':
+        setattr(field_value, TYPED_COLUMNS[definition.field_type], typed)
+
+def typed_column(entity, definition):
+    return getattr(entity, TYPED_COLUMNS[definition.field_type])
+
+
+# Definition cache
+
+# Immutable copy of a CustomFieldDefinition, safe to share between requests
+FieldDefinition = namedtuple('FieldDefinition', 'id name field_type options user_id option_list')
+
+class DefinitionCache:
+    """user_id -> (custom_fields_version, [FieldDefinition]), least recently used evicted first."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.owners = {} # definition id -> user_id, for the cached users
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, user_id, version, definitions):
+        with self.lock:
+            self.entries[user_id] = (version, definitions)
+            self.entries.move_to_end(user_id)
+            self.owners.update((d.id, user_id) for d in definitions)
+            while len(self.entries) > self.max_size:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                for d in evicted:
+                    self.owners.pop(d.id, None)
+
+    def owner_of(self, definition_ids):
+        """({owner ids}, [ids not in the cache])."""
+        with self.lock:
+            known = {d: self.owners[d] for d in definition_ids if d in self.owners}
+        return set(known.values()), [d for d in definition_ids if d not in known]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'users': len(self.entries),
+                'max_users': self.max_size
+            }
+
+def _cache():
+    # One per app (and so per process), like the search backend flag
+    cache = current_app.extensions.get('custom_field_definitions')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'custom_field_definitions', DefinitionCache(current_app.config.get('CUSTOM_FIELD_CACHE_SIZE', 1024)))
+    return cache
+
+def _snapshot(definition):
+    return FieldDefinition(definition.id, definition.name, definition.field_type, definition.options,
+                           definition.user_id, tuple(parse_options(definition.options)))
+
+def _load_definitions(versions):
+    """{user_id: [FieldDefinition]} for ``versions`` ({user_id: version}), from the cache or one query."""
+    cache = _cache()
+    found = {}
+    for user_id, version in versions.items():
+        cached = cache.get(user_id, version)
+        if cached is not None:
+            found[user_id] = cached
+    missing = [user_id for user_id in versions if user_id not in found]
+    if missing:
+        rows = CustomFieldDefinition.query.filter(CustomFieldDefinition.user_id.in_(missing)).order_by(
+            CustomFieldDefinition.id).all()
+        for user_id in missing:
+            found[user_id] = tuple(_snapshot(d) for d in rows if d.user_id == user_id)
+            cache.put(user_id, versions[user_id], found[user_id])
+    return found
+
+def user_definitions(user):
+    """``user``'s definitions, oldest first. No query on a cache hit (the version comes with the user)."""
+    return _load_definitions({user.id: user.custom_fields_version})[user.id]
+
+def definitions_by_id(definition_ids, user):
+    """{id: FieldDefinition} for the existing ids, whoever owns them.
+
+    ``user`` is the current user: their version is already loaded, other
+    owners' versions are read with one query.
+    """
+    definition_ids = set(definition_ids)
+    if not definition_ids:
+        return {}
+    owners, unknown = _cache().owner_of(definition_ids)
+    if unknown:
+        owners.update(user_id for (user_id,) in db.session.query(CustomFieldDefinition.user_id).filter(
+            CustomFieldDefinition.id.in_(unknown)).distinct())
+
+    versions = {user.id: user.custom_fields_version} if user.id in owners else {}
+    others = owners - set(versions)
+    if others:
+        versions.update(db.session.query(User.id, User.custom_fields_version).filter(User.id.in_(others)).all())
+    return {d.id: d for definitions in _load_definitions(versions).values() for d in definitions if d.id in definition_ids}
+
+def bump_version(user_id):
+    """Invalidate ``user_id``'s cached definitions in every process; the caller commits."""
+    db.session.query(User).filter(User.id == user_id).update(
+        {User.custom_fields_version: User.custom_fields_version + 1}, synchronize_session=False)
+
+def cache_stats():
+    return _cache().stats()
+
+
+# Task list filters and sorting
+
+def _field_args(args):
+    """[(definition_id, operator, raw value)] from ``field.<id>[.<op>]`` arguments."""
+    parsed = []
+    for key, raw in args.items(multi=True):
+        parts = key.split('.')
+        if parts[0] != 'field':
+            continue
+        if len(parts) not in (2, 3) or not parts[1].isdigit() or (len(parts) == 3 and parts[2] not in (*OPERATORS, 'set')):
+            raise PaginationError(f'Invalid custom field filter {key!r}')
+        parsed.append((int(parts[1]), parts[2] if len(parts) == 3 else 'eq', raw))
+    return parsed
+
+def _sort_arg(args):
+    sort = args.get('sort', '')
+    descending = sort.startswith('-')
+    parts = sort.lstrip('-').split('.')
+    if parts[0] != 'field':
+        return None, False
+    if len(parts) != 2 or not parts[1].isdigit():
+        raise PaginationError(f'Invalid sort {sort!r}')
+    return int(parts[1]), descending
+
+def _definitions(ids, user):
+    definitions = definitions_by_id(ids, user)
+    missing = set(ids) - set(definitions)
+    if missing:
+        raise PaginationError(f'Unknown custom field {min(missing)}')
+    return definitions
+
+def apply_field_filters(query, args, user):
+    """Apply ``field.*`` filters and a ``sort=field.<id>``.
+
+    Returns ``(query, sort)`` where sort is None or ``(typed column, descending)``;
+    the column is added to the query's rows so a cursor can be built from it.
+    Raises PaginationError for bad arguments.
+    """
+    filters = _field_args(args)
+    sort_id, descending = _sort_arg(args)
+    definitions = _definitions({f[0] for f in filters} | ({sort_id} if sort_id is not None else set()), user)
+
+    for definition_id, operator, raw in filters:
+        values = aliased(CustomFieldValue)
+        on = and_(values.task_id == Task.id, values.field_definition_id == definition_id)
+        definition = definitions[definition_id]
+        if operator == 'set':
+            if raw not in ('true', 'false'):
+                raise PaginationError(f'field.{definition_id}.set must be true or false')
+            exists = db.session.query(values.id).filter(on, values.value.isnot(None)).exists()
+            query = query.filter(exists if raw == 'true' else ~exists)
+            continue
+        try:
+            typed = parse_typed(definition, raw)
+        except (ValueError, TypeError):
+            raise PaginationError(f'{raw!r} is not a valid {definition.field_type} for field {definition_id}')
+        query = query.join(values, on).filter(OPERATORS[operator](typed_column(values, definition), typed))
+
+    if sort_id is None:
+        return query, None
+    values = aliased(CustomFieldValue)
+    column = typed_column(values, definitions[sort_id])
+    query = query.join(values, and_(
+        values.task_id == Task.id, values.field_definition_id == sort_id
+    )).filter(column.isnot(None)).add_columns(column)
+    return query, (column, descending)
+
+
+def field_stats(definition, task_ids):
+    """Aggregates of one field over the tasks in ``task_ids`` (a SELECT of ids), in SQL."""
+    query = db.session.query(CustomFieldValue).filter(
+        CustomFieldValue.field_definition_id == definition.id,
+        CustomFieldValue.value.isnot(None),
+        CustomFieldValue.task_id.in_(task_ids)
+    )
+    column = typed_column(CustomFieldValue, definition)
+    stats = {'definition_id': definition.id, 'field_type': definition.field_type}
+    if definition.field_type == 'number':
+        count, total, low, high = query.with_entities(
+            func.count(column), func.sum(column), func.min(column), func.max(column)).one()
+        stats.update(count=count, sum=total or 0, min=low, max=high, avg=total / count if count else None)
+    elif definition.field_type == 'date':
+        count, low, high = query.with_entities(func.count(column), func.min(column), func.max(column)).one()
+        stats.update(count=count, min=low.isoformat() if low else None, max=high.isoformat() if high else None)
+    elif definition.field_type == 'select':
+        counts = dict(query.with_entities(column, func.count()).group_by(column).all())
+        stats.update(count=sum(counts.values()), options=[
+            {'option': option, 'count': counts.get(i, 0)} for i, option in enumerate(definition.option_list)
+        ])
+    else:
+        stats.update(count=query.with_entities(func.count(CustomFieldValue.id)).scalar())
+    return stats
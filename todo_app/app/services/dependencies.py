@@ -0,0 +1,217 @@
+"""Task dependency graphs (task_dependencies: blocker -> blocked).
+
+A project's graph is its tasks plus every task they share an edge with, so
+blockers from other projects still count. ``project_graph`` loads the edges
+and nodes with two queries and caches the graph per project (one
+``GraphCache`` per app); each read re-validates the cache with a cheap
+count/max(updated_at) stamp over the graph's tasks. Task edits bump updated_at through onupdate, and
+``add_dependency``/``remove_dependency`` touch both ends, so any change that
+matters to the graph changes the stamp.
+
+Edges are checked for cycles on insert with a recursive CTE over the whole
+table, since a cycle can run through other projects.
+"""
+import heapq
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, literal, or_, select
+from app import db
+from app.models.task import Task, task_dependencies
+
+DONE_STATUSES = ('completed', 'archived')
+
+class CycleError(ValueError):
+    pass
+
+class DependencyGraph:
+    def __init__(self, project_id, nodes, edges):
+        # nodes: {task_id: (project_id, status, deadline)}
+        self.project_id = project_id
+        self.nodes = nodes
+        self.own = {task_id for task_id, node in nodes.items() if node[0] == project_id}
+        self.external_ids = sorted(set(nodes) - self.own)
+        self.blockers = defaultdict(set)
+        self.dependents = defaultdict(set)
+        for blocker, blocked in edges:
+            # Edges to tasks deleted in bulk (no ORM cascade) are ignored
+            if blocker in nodes and blocked in nodes:
+                self.blockers[blocked].add(blocker)
+                self.dependents[blocker].add(blocked)
+        self._sorted = None
+
+    def is_done(self, task_id):
+        return self.nodes[task_id][1] in DONE_STATUSES
+
+    def _sort(self):
+        # Kahn's algorithm, smallest id first so the order is stable
+        if self._sorted is None:
+            remaining = {task_id: len(self.blockers[task_id]) for task_id in self.nodes}
+            heap = [task_id for task_id, count in remaining.items() if count == 0]
+            heapq.heapify(heap)
+            order = []
+            while heap:
+                task_id = heapq.heappop(heap)
+                order.append(task_id)
+                for dependent in self.dependents[task_id]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        heapq.heappush(heap, dependent)
+            # Cycles can only come from rows written before edges were checked
+            self._sorted = order, sorted(set(self.nodes) - set(order))
+        return self._sorted
+
+    def topological_order(self):
+        """(project task ids, blockers first; project task ids stuck in a cycle)."""
+        order, cyclic = self._sort()
+        return [t for t in order if t in self.own], [t for t in cyclic if t in self.own]
+
+    def ready(self):
+        """Unfinished project tasks whose blockers are all finished."""
+        return sorted(
+            task_id for task_id in self.own
+            if not self.is_done(task_id) and all(self.is_done(b) for b in self.blockers[task_id])
+        )
+
+    def critical_path(self):
+        """(task ids, projected finish) of the chain that finishes last.
+
+        A task can't finish before its deadline or before its unfinished
+        blockers do, so its projected finish is the latest of those. The
+        critical path is the chain behind the latest projected finish, the
+        longest one on ties. Finished tasks and cycles are skipped.
+        """
+        best = {} # task_id -> (finish, chain length, previous task)
+        def key(task_id):
+            finish, length, _ = best[task_id]
+            return (finish or datetime.min, length, -task_id)
+
+        for task_id in self._sort()[0]:
+            if self.is_done(task_id):
+                continue
+            finish, length, previous = self.nodes[task_id][2], 1, None
+            pending = [b for b in self.blockers[task_id] if b in best]
+            if pending:
+                previous = max(pending, key=key)
+                length = best[previous][1] + 1
+                finish = max(filter(None, (finish, best[previous][0])), default=None)
+            best[task_id] = (finish, length, previous)
+
+        ends = [task_id for task_id in best if task_id in self.own]
+        if not ends:
+            return [], None
+        end = max(ends, key=key)
+        path = []
+        task_id = end
+        while task_id is not None:
+            path.append(task_id)
+            task_id = best[task_id][2]
+        return path[::-1], best[end][0]
+
+
+class GraphCache:
+    """project_id -> (stamp, graph), least recently used evicted first."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, project_id):
+        with self.lock:
+            return self.entries.get(project_id)
+
+    def touch(self, project_id):
+        with self.lock:
+            if project_id in self.entries:
+                self.entries.move_to_end(project_id)
+
+    def put(self, project_id, stamp, graph):
+        with self.lock:
+            self.entries[project_id] = (stamp, graph)
+            self.entries.move_to_end(project_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+def _cache():
+    # One per app, so apps (and tests) with different databases don't share graphs
+    cache = current_app.extensions.get('dependency_graphs')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'dependency_graphs', GraphCache(current_app.config.get('DEPENDENCY_GRAPH_CACHE_SIZE', 256)))
+    return cache
+
+def _stamp(project_id, external_ids):
+    condition = Task.project_id == project_id
+    if external_ids:
+        condition = or_(condition, Task.id.in_(external_ids))
+    return tuple(db.session.query(func.count(Task.id), func.max(Task.updated_at)).filter(condition).one())
+
+def _load(project_id):
+    in_project = select(Task.id).where(Task.project_id == project_id)
+    edges = db.session.query(task_dependencies.c.blocker_id, task_dependencies.c.blocked_id).filter(or_(
+        task_dependencies.c.blocker_id.in_(in_project),
+        task_dependencies.c.blocked_id.in_(in_project)
+    )).all()
+    linked = {task_id for edge in edges for task_id in edge}
+    condition = Task.project_id == project_id
+    if linked:
+        condition = or_(condition, Task.id.in_(linked))
+    rows = db.session.query(Task.id, Task.project_id, Task.status, Task.deadline, Task.updated_at).filter(condition).all()
+
+    nodes = {task_id: (p_id, status, deadline) for task_id, p_id, status, deadline, _ in rows}
+    graph = DependencyGraph(project_id, nodes, [tuple(edge) for edge in edges])
+    # Same shape as _stamp(), from the rows already loaded
+    stamp = (len(rows), max((row[4] for row in rows if row[4] is not None), default=None))
+    return stamp, graph
+
+def project_graph(project_id):
+    cache = _cache()
+    cached = cache.get(project_id)
+    if cached is not None and _stamp(project_id, cached[1].external_ids) == cached[0]:
+        cache.touch(project_id)
+        return cached[1]
+
+    stamp, graph = _load(project_id)
+    cache.put(project_id, stamp, graph)
+    return graph
+
+def creates_cycle(blocker_id, blocked_id):
+    """True if blocker_id already (transitively) depends on blocked_id."""
+    if blocker_id == blocked_id:
+        return True
+    # Everything downstream of blocked_id; UNION (not ALL) stops on old cycles
+    reach = select(literal(blocked_id).label('id')).cte('downstream', recursive=True)
+    reach = reach.union(
+        select(task_dependencies.c.blocked_id).join(reach, task_dependencies.c.blocker_id == reach.c.id)
+    )
+    return db.session.execute(select(select(reach.c.id).where(reach.c.id == blocker_id).exists())).scalar()
+
+def _touch(*tasks):
+    # Changes the cache stamp of every graph containing these tasks
+    now = datetime.utcnow()
+    for task in tasks:
+        task.updated_at = now
+
+def add_dependency(blocker, blocked):
+    """Make ``blocker`` block ``blocked``. Raises CycleError; the caller commits."""
+    if blocker.id == blocked.id:
+        raise CycleError('A task cannot block itself')
+    if creates_cycle(blocker.id, blocked.id):
+        raise CycleError(f'Task {blocked.id} already blocks task {blocker.id}')
+    exists = db.session.query(task_dependencies).filter_by(blocker_id=blocker.id, blocked_id=blocked.id).first()
+    if exists is None:
+        db.session.execute(task_dependencies.insert().values(blocker_id=blocker.id, blocked_id=blocked.id))
+        _touch(blocker, blocked)
+    return exists is None
+
+def remove_dependency(blocker, blocked):
+    """Returns False if there was no such edge; the caller commits."""
+    deleted = db.session.execute(task_dependencies.delete().where(
+        task_dependencies.c.blocker_id == blocker.id,
+        task_dependencies.c.blocked_id == blocked.id
+    )).rowcount
+    if deleted:
+        _touch(blocker, blocked)
+    return bool(deleted)
@@ -0,0 +1,80 @@
+"""Background dispatch queue for work that shouldn't hold up the request.
+
+Jobs run on worker threads inside an app context, after the request that
+queued them has committed. The queue is in-process: jobs still queued when
+the process exits are lost, so only queue work that is safe to drop (e.g.
+notification fan-out). With ``DISPATCH_SYNC`` jobs run inline, which keeps
+tests deterministic.
+"""
+import logging
+import queue
+import threading
+from flask import current_app
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config.get('DISPATCH_QUEUE_SIZE', 10000))
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        if self.app.config.get('DISPATCH_SYNC'):
+            self._run(func, args, kwargs)
+            return
+        self._ensure_workers()
+        try:
+            self.queue.put_nowait((func, args, kwargs))
+        except queue.Full:
+            logger.error('Dispatch queue full, dropping %s', func.__name__)
+
+    def _ensure_workers(self):
+        # Started lazily so each gunicorn worker gets its own threads after fork
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.app.config.get('DISPATCH_WORKERS', 1)):
+                thread = threading.Thread(target=self._work, name=f'dispatch-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            func, args, kwargs = self.queue.get()
+            try:
+                self._run(func, args, kwargs)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, func, args, kwargs):
+        with self.app.app_context():
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Dispatched job %s failed', func.__name__)
+            finally:
+                db.session.remove()
+
+
+_init_lock = threading.Lock()
+
+def get_dispatcher(app=None):
+    app = app or current_app._get_current_object()
+    dispatcher = app.extensions.get('dispatch')
+    if dispatcher is None:
+        with _init_lock:
+            dispatcher = app.extensions.get('dispatch')
+            if dispatcher is None:
+                dispatcher = app.extensions['dispatch'] = Dispatcher(app)
+    return dispatcher
+
+def dispatch(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in the background. Pass ids, not ORM objects."""
+    get_dispatcher().submit(func, *args, **kwargs)
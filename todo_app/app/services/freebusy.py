@@ -0,0 +1,130 @@
+"""Free/busy across several users' calendars.
+
+A user is busy during their own events and the events shared with them.
+Candidate events come from one UNION ALL query. Own events are split into
+three disjoint branches so each one is bounded by an index instead of
+scanning the users' whole history: timed events by end_date, events without
+an end by start_date, and recurring series through a partial index. Shared
+events go through shared_items.
+
+Recurring events are expanded inside the window, then each user's intervals
+are merged with a sort-and-sweep and the free slots are the gaps left in the
+merge of everyone's busy time.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_, or_, select, union_all
+from app import db
+from app.models.event import Event, EventException
+from app.models.shared import SharedItem
+from app.services.recurrence import expand
+
+def _branches(start, end, padding):
+    """Disjoint conditions that together select the events overlapping [start, end).
+
+    ``padding`` covers events without an end, which count as default-length.
+    """
+    one_off = Event.rrule.is_(None)
+    return [
+        and_(one_off, Event.end_date > start, Event.start_date < end),
+        and_(one_off, Event.end_date.is_(None), Event.start_date > start - padding, Event.start_date < end),
+        and_(Event.rrule.isnot(None), Event.start_date < end,
+             or_(Event.recurrence_end.is_(None), Event.recurrence_end > start)),
+    ]
+
+def _candidate_events(user_ids, start, end, padding):
+    """Rows of (user_id, id, start_date, end_date, all_day, rrule) overlapping the window."""
+    columns = (Event.id, Event.start_date, Event.end_date, Event.all_day, Event.rrule)
+    branches = _branches(start, end, padding)
+    own = [
+        select(Event.user_id.label('user_id'), *columns).where(Event.user_id.in_(user_ids), branch)
+        for branch in branches
+    ]
+    shared = select(SharedItem.shared_with_id.label('user_id'), *columns).join(
+        Event, Event.id == SharedItem.item_id
+    ).where(
+        SharedItem.item_type == 'event',
+        SharedItem.shared_with_id.in_(user_ids),
+        Event.user_id != SharedItem.shared_with_id,
+        or_(*branches)
+    )
+    return db.session.execute(union_all(*own, shared)).all()
+
+def _event_end(start, end, all_day, default_duration):
+    if end is not None and end > start:
+        return end
+    if all_day:
+        return datetime.combine(start.date() + timedelta(days=1), time())
+    return start + default_duration
+
+def merge_intervals(intervals):
+    """Sweep sorted (start, end) pairs into disjoint ones; touching intervals merge."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+def free_slots(busy, start, end, min_length=timedelta(0)):
+    """Gaps of at least ``min_length`` in the disjoint, sorted ``busy`` intervals."""
+    slots = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start - cursor >= max(min_length, timedelta.resolution):
+            slots.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if end - cursor >= max(min_length, timedelta.resolution):
+        slots.append((cursor, end))
+    return slots
+
+def busy_intervals(user_ids, start, end, default_duration=timedelta(minutes=30), max_occurrences=1000):
+    """{user_id: merged busy intervals clipped to [start, end)}."""
+    # Plain tuples: thousands of rows, and named Row access adds up
+    rows = [tuple(row) for row in _candidate_events(user_ids, start, end, default_duration)]
+
+    # Exceptions for all recurring events in one query
+    recurring = {event_id for _, event_id, _, _, _, rrule in rows if rrule}
+    exceptions = defaultdict(dict)
+    if recurring:
+        for event_id, original_start, cancelled, moved_start, moved_end in db.session.execute(select(
+                EventException.event_id, EventException.original_start, EventException.cancelled,
+                EventException.start_date, EventException.end_date
+        ).where(EventException.event_id.in_(recurring))):
+            exceptions[event_id][original_start] = (cancelled, moved_start, moved_end)
+
+    intervals = defaultdict(list)
+    expanded = {}
+    for user_id, event_id, event_start, event_end, all_day, rrule in rows:
+        if not rrule:
+            occurrences = [(event_start, _event_end(event_start, event_end, all_day, default_duration))]
+        elif event_id in expanded:
+            occurrences = expanded[event_id]
+        else:
+            duration = _event_end(event_start, event_end, all_day, default_duration) - event_start
+            overrides = exceptions.get(event_id, {})
+            occurrences = []
+            for s in expand(rrule, event_start, duration, start, end, max_occurrences):
+                override = overrides.get(s)
+                if override is None:
+                    occurrences.append((s, s + duration))
+                elif not override[0]:
+                    moved = override[1] or s
+                    occurrences.append((moved, override[2] or moved + duration))
+            expanded[event_id] = occurrences
+
+        for s, e in occurrences:
+            if s < end and e > start:
+                intervals[user_id].append((max(s, start), min(e, end)))
+
+    return {user_id: merge_intervals(sorted(intervals[user_id])) for user_id in user_ids}
+
+def free_busy(user_ids, start, end, min_length=timedelta(0), **kwargs):
+    """Per-user busy intervals and the slots when everyone is free."""
+    busy = busy_intervals(user_ids, start, end, **kwargs)
+    # The per-user lists are already sorted, so a k-way merge keeps the sweep linear
+    combined = merge_intervals(heapq.merge(*busy.values()))
+    return busy, free_slots(combined, start, end, min_length)
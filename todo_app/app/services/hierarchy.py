@@ -0,0 +1,149 @@
+"""Task trees (parent_id hierarchy).
+
+``Task.subtasks`` is a dynamic relationship, so walking it costs a query per
+node; ``subtree_rows`` loads a whole subtree or project forest with one
+recursive CTE and ``build_forest`` nests it in one pass.
+
+``Task.path`` materializes the ancestors of every task ('/1/5/' for a child
+of 5), so ancestry checks, breadcrumbs and subtree counts are lookups on the
+path index. Only ``set_parent`` may change parent_id: it rejects cycles and
+rewrites the paths of a moved subtree with one UPDATE. Depth and path
+length are both bounded, so ids of any size fit the path column.
+"""
+from flask import current_app
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models.task import Task
+from app.services.access import access_for, can_edit, visible_clause
+
+def _depth_limit(max_depth):
+    # Always bounded, so a parent_id cycle in old data can't recurse forever
+    hard_limit = current_app.config.get('TASK_TREE_MAX_DEPTH', 50)
+    return hard_limit if max_depth is None else min(max_depth, hard_limit)
+
+def subtree_rows(roots, user_id, max_depth=None):
+    """``[(task, depth)]`` for the roots matched by ``roots`` and their descendants.
+
+    ``roots`` is a WHERE clause on Task (e.g. ``Task.id == 5``). Roots have
+    depth 0; descendants deeper than ``max_depth`` are left out, and so are
+    tasks ``user_id`` can't see: sharing a task doesn't share its subtasks.
+    """
+    limit = _depth_limit(max_depth)
+    tree = select(Task.id, literal(0).label('depth')).where(roots).cte('task_tree', recursive=True)
+    tree = tree.union_all(
+        select(Task.id, (tree.c.depth + 1).label('depth')).join(
+            tree, Task.parent_id == tree.c.id
+        ).where(tree.c.depth < limit)
+    )
+    return db.session.query(Task, tree.c.depth).join(tree, Task.id == tree.c.id).filter(
+        visible_clause(Task, Task.id, user_id)
+    ).options(
+        selectinload(Task.owner)
+    ).order_by(tree.c.depth, Task.order, Task.id).all()
+
+def build_forest(rows, dump):
+    """Nest ``[(task, depth)]`` rows (parents before children) in O(n).
+
+    ``dump`` serializes a list of tasks (e.g. ``tasks_schema.dump``). Returns
+    the root nodes, each with ``depth`` and a nested ``subtasks`` list. Rows
+    whose parent isn't in ``rows`` (e.g. below a hidden task) become roots.
+    """
+    nodes = {}
+    forest = []
+    for (task, depth), node in zip(rows, dump([task for task, _ in rows])):
+        if task.id in nodes:
+            continue # Reached twice through a parent_id cycle
+        node['depth'] = depth
+        node['subtasks'] = []
+        nodes[task.id] = node
+        parent = nodes.get(task.parent_id) if depth else None
+        (parent['subtasks'] if parent is not None else forest).append(node)
+    return forest
+
+def parse_max_depth(args):
+    """``?max_depth=`` as a non-negative int, None when absent. Raises ValueError."""
+    value = args.get('max_depth')
+    if value in (None, ''):
+        return None
+    depth = int(value)
+    if depth < 0:
+        raise ValueError('max_depth must be >= 0')
+    return depth
+
+def project_roots(project_id):
+    """Tasks of the project whose parent is outside it (or missing)."""
+    in_project = select(Task.id).where(Task.project_id == project_id)
+    return and_(Task.project_id == project_id,
+                or_(Task.parent_id.is_(None), Task.parent_id.notin_(in_project)))
+
+
+class HierarchyError(ValueError):
+    pass
+
+def descendants_prefix(task):
+    return f'{task.path}{task.id}/'
+
+def descendants_filter(prefix):
+    """Tasks whose path starts with ``prefix``, as an index range ('0' sorts right after '/')."""
+    return and_(Task.path >= prefix, Task.path < prefix[:-1] + '0')
+
+def ancestor_ids(task):
+    return [int(part) for part in task.path.strip('/').split('/') if part]
+
+def is_ancestor(ancestor, task):
+    return task.path.startswith(descendants_prefix(ancestor))
+
+def descendant_count(task):
+    return db.session.query(func.count(Task.id)).filter(descendants_filter(descendants_prefix(task))).scalar()
+
+def _depth(path):
+    return path.count('/') - 1
+
+def set_parent(task, parent_id, user_id):
+    """Move ``task`` (and its subtree) under ``parent_id``, or to the top level for None.
+
+    ``user_id`` must be able to edit the new parent. Raises HierarchyError for
+    a missing or read-only parent, a move under its own subtree, or one that
+    would nest deeper than TASK_TREE_MAX_DEPTH or overflow Task.path.
+    """
+    parent = None
+    if parent_id is not None:
+        access = access_for(Task, parent_id, user_id)
+        if access is None:
+            raise HierarchyError('Parent task not found')
+        if not can_edit(access):
+            raise HierarchyError('Permission denied on the parent task')
+        parent = db.session.get(Task, parent_id)
+        if task.id is not None and (parent.id == task.id or is_ancestor(task, parent)):
+            raise HierarchyError('A task cannot be moved under itself or its subtasks')
+    path = descendants_prefix(parent) if parent is not None else '/'
+
+    # Levels below the task and the longest path among them, from its descendants
+    deepest = longest = 0
+    if task.id is not None and path != task.path:
+        old_prefix = descendants_prefix(task)
+        slashes = func.length(Task.path) - func.length(func.replace(Task.path, '/', ''))
+        deepest_slashes, longest_path = db.session.query(
+            func.max(slashes), func.max(func.length(Task.path))
+        ).filter(descendants_filter(old_prefix)).one()
+        if deepest_slashes:
+            deepest = deepest_slashes - old_prefix.count('/') + 1
+            longest = longest_path - len(old_prefix) + len(f'{task.id}/')
+    max_depth = current_app.config.get('TASK_TREE_MAX_DEPTH', 50)
+    if _depth(path) + deepest > max_depth:
+        raise HierarchyError(f'Tasks can be nested at most {max_depth} levels deep')
+    if len(path) + longest > Task.path.type.length:
+        raise HierarchyError('Tasks are nested too deeply to be moved there')
+
+    if task.id is not None and path != task.path:
+        # One UPDATE for the whole subtree: swap the old prefix for the new one.
+        # updated_at is kept, path isn't part of the serialized task
+        old_prefix = descendants_prefix(task)
+        new_prefix = f'{path}{task.id}/'
+        db.session.query(Task).filter(descendants_filter(old_prefix)).update({
+            Task.path: literal(new_prefix) + func.substr(Task.path, len(old_prefix) + 1),
+            Task.updated_at: Task.updated_at
+        }, synchronize_session='fetch')
+    task.parent_id = parent.id if parent is not None else None
+    task.path = path
@@ -0,0 +1,84 @@
+import re
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app import db
+from app.models.user import User
+from app.services.notifications import insert_notifications
+
+MENTION_RE = re.compile(r'@(\w+)')
+
+class UsernameCache:
+    """username -> id, least recently used evicted first.
+
+    Renaming a user evicts the old name (see ``_evict_renamed``); misses
+    aren't cached because the user may register (or be renamed to it) later.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, usernames):
+        found = {}
+        with self.lock:
+            for name in usernames:
+                if name in self.entries:
+                    self.entries.move_to_end(name)
+                    found[name] = self.entries[name]
+        return found
+
+    def put_many(self, rows):
+        with self.lock:
+            self.entries.update(rows)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, username):
+        with self.lock:
+            self.entries.pop(username, None)
+
+def _cache():
+    # One per app, so apps (and tests) with different databases don't share ids
+    cache = current_app.extensions.get('username_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'username_cache', UsernameCache(current_app.config.get('USERNAME_CACHE_SIZE', 10000)))
+    return cache
+
+@event.listens_for(User.username, 'set')
+def _evict_renamed(user, value, oldvalue, initiator):
+    # Evicting on assignment rather than commit only costs a miss if it rolls back
+    if isinstance(oldvalue, str) and oldvalue != value and has_app_context():
+        cache = current_app.extensions.get('username_cache')
+        if cache is not None:
+            cache.discard(oldvalue)
+
+def resolve_usernames(usernames):
+    """{username: user_id} for the usernames that exist, with one IN query for cache misses."""
+    cache = _cache()
+    found = cache.get_many(usernames)
+    missing = [name for name in usernames if name not in found]
+    if missing:
+        rows = db.session.query(User.username, User.id).filter(User.username.in_(missing)).all()
+        found.update(rows)
+        cache.put_many(rows)
+    return found
+
+def extract_mentions(content):
+    limit = current_app.config.get('MAX_MENTIONS_PER_COMMENT', 100)
+    return list(dict.fromkeys(MENTION_RE.findall(content)))[:limit]
+
+def notify_mentions(author_id, author_name, task_id, task_title, usernames):
+    """Create one notification per mentioned user (dispatched after the comment commits)."""
+    user_ids = set(resolve_usernames(usernames).values()) - {author_id}
+    if not user_ids:
+        return
+    insert_notifications([{
+        'message': f"{author_name} mentioned you in a comment on task '{task_title}'",
+        'user_id': user_id,
+        'task_id': task_id
+    } for user_id in sorted(user_ids)])
+    db.session.commit()
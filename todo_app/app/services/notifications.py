@@ -0,0 +1,91 @@
+"""Notification bookkeeping shared by every producer.
+
+Producers keep adding ``Notification`` rows to the session as before. On
+flush the new rows bump the owner's ``users.unread_notifications`` counter,
+and once the transaction commits they are published to the owner's pub/sub
+channel for open SSE streams.
+"""
+from collections import Counter
+from sqlalchemy import bindparam, case, event, insert, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.notification import Notification
+from app.models.user import User
+from app.schemas import NotificationSchema
+from app.services.pubsub import get_broker
+
+notification_schema = NotificationSchema()
+
+def user_channel(user_id):
+    return f'notifications:{user_id}'
+
+def publish(notifications):
+    """Publish ``(user_id, payload)`` pairs, payload as dumped by NotificationSchema."""
+    broker = get_broker()
+    for user_id, payload in notifications:
+        broker.publish(user_channel(user_id), payload)
+
+def adjust_unread(connection, deltas):
+    """Add ``deltas`` ({user_id: n}) to the unread counters, never going below zero."""
+    deltas = {user_id: n for user_id, n in deltas.items() if n}
+    if not deltas:
+        return
+    users = User.__table__
+    new_value = users.c.unread_notifications + bindparam('delta')
+    connection.execute(
+        update(users).where(users.c.id == bindparam('uid')).values(
+            unread_notifications=case((new_value < 0, 0), else_=new_value)),
+        [{'uid': user_id, 'delta': n} for user_id, n in deltas.items()]
+    )
+
+def mark_notifications_read(user_id, *criteria):
+    """Mark the user's unread notifications matching ``criteria`` read in one UPDATE.
+
+    Returns how many were marked; the caller commits.
+    """
+    count = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.is_read == False,
+        *criteria
+    ).update({Notification.is_read: True}, synchronize_session=False)
+    adjust_unread(db.session.connection(), {user_id: -count})
+    return count
+
+def _track_new(session, new):
+    adjust_unread(session.connection(), Counter(n.user_id for n in new if not n.is_read))
+    pending = session.info.setdefault('new_notifications', [])
+    pending.extend((n.user_id, notification_schema.dump(n)) for n in new)
+
+def insert_notifications(rows):
+    """Insert notification rows (dicts of column values) as one multi-row INSERT.
+
+    Counters and publishing are handled as for notifications added to the session.
+    """
+    if not rows:
+        return []
+    if not db.engine.dialect.insert_returning:
+        # The flush hook below takes care of these
+        notifications = [Notification(**row) for row in rows]
+        db.session.add_all(notifications)
+        db.session.flush()
+        return notifications
+
+    notifications = db.session.execute(insert(Notification).returning(Notification), rows).scalars().all()
+    _track_new(db.session, notifications)
+    return notifications
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_notifications(session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, Notification)]
+    if new:
+        _track_new(session, new)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_new_notifications(session):
+    pending = session.info.pop('new_notifications', None)
+    if pending:
+        publish(pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_new_notifications(session):
+    session.info.pop('new_notifications', None)
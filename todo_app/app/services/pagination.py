@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, or_
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    payload = [{'$dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list):
+            raise ValueError
+        return [datetime.fromisoformat(v['$dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        raise PaginationError('Invalid cursor')
+
+
+def page_args(args, default_limit=None):
+    """Read ``limit`` and ``cursor`` from a request's query string.
+
+    Without ``limit`` the page size is ``default_limit``, which is None (the
+    full list) where existing clients still expect everything.
+    """
+    limit = args.get('limit')
+    if limit is None:
+        limit = default_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError('limit must be an integer')
+        if limit < 1:
+            raise PaginationError('limit must be positive')
+        limit = min(limit, current_app.config.get('API_MAX_PAGE_SIZE', 500))
+
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def paginate(query, keys, cursor=None, limit=None, descending=True, row_key=None):
+    """Keyset pagination over ``keys`` (the last key must be unique, e.g. the id).
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    if cursor is not None:
+        if len(cursor) != len(keys):
+            raise PaginationError('Invalid cursor')
+        # Lexicographic "after the cursor": (k0 < v0) OR (k0 = v0 AND k1 < v1) ...
+        clauses = []
+        for i, key in enumerate(keys):
+            step = key < cursor[i] if descending else key > cursor[i]
+            clauses.append(and_(*[keys[j] == cursor[j] for j in range(i)], step))
+        query = query.filter(or_(*clauses))
+
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if row_key is None:
+        row_key = lambda row: [getattr(row, k.key) for k in keys]
+    return rows, encode_cursor(row_key(rows[-1]))
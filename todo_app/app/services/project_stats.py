@@ -0,0 +1,197 @@
+"""Project dashboard numbers without loading the projects' tasks.
+
+``ProjectStats`` rows keep task counts by status and the tracked time of
+each project. A ``before_flush`` hook turns pending Task/TimeEntry changes
+(new, deleted, status or project moves, stopped timers) into per-project
+deltas and applies them in the same transaction with one UPDATE per
+project, so every write path (create/update/delete, batches, sync) keeps
+them current. The same hook gives each new project its (empty) row, and
+migration a3e1c7f02b6d built the rows of older projects. Reads never write:
+a row that is still missing is computed with GROUP BY queries instead.
+
+Overdue counts depend on the clock, so they're always counted in SQL.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.project import Project, ProjectStats
+from app.models.task import Task
+from app.models.time import TimeEntry
+
+STATUS_COLUMNS = {
+    'pending': 'pending_count',
+    'in_progress': 'in_progress_count',
+    'completed': 'completed_count',
+    'archived': 'archived_count',
+}
+COUNT_COLUMNS = ('task_count',) + tuple(STATUS_COLUMNS.values())
+DONE_STATUSES = ('completed', 'archived')
+
+def _old(state, attr):
+    """Value of ``attr`` as last loaded from the database."""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+def _add_task(deltas, project_id, status, sign):
+    if project_id is None:
+        return
+    counts = deltas[project_id]
+    counts['task_count'] += sign
+    column = STATUS_COLUMNS.get(status or 'pending')
+    if column:
+        counts[column] += sign
+
+def _tracked_by_task(connection, task_ids):
+    if not task_ids:
+        return {}
+    return dict(connection.execute(
+        select(TimeEntry.task_id, func.sum(TimeEntry.duration)).where(
+            TimeEntry.task_id.in_(task_ids)).group_by(TimeEntry.task_id)
+    ).all())
+
+def collect_deltas(session):
+    """{project_id: {column: delta}} for the pending changes in ``session``."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    moved_time = [] # (task_id, old project, new project); None: not in a project
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            _add_task(deltas, obj.project_id, obj.status, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            project_id = _old(state, 'project_id')
+            _add_task(deltas, project_id, _old(state, 'status'), -1)
+            moved_time.append((obj.id, project_id, None))
+    for obj in session.dirty:
+        if not isinstance(obj, Task) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not (state.attrs.project_id.history.has_changes() or state.attrs.status.history.has_changes()):
+            continue
+        old_project, new_project = _old(state, 'project_id'), obj.project_id
+        _add_task(deltas, old_project, _old(state, 'status'), -1)
+        _add_task(deltas, new_project, obj.status, 1)
+        if old_project != new_project:
+            moved_time.append((obj.id, old_project, new_project))
+
+    # Time entries: durations added, changed (timer stopped) or removed
+    entry_deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, TimeEntry) and obj.duration:
+            entry_deltas[obj.task_id] += obj.duration
+    for obj in session.dirty:
+        if isinstance(obj, TimeEntry) and obj not in session.deleted:
+            state = inspect(obj)
+            if state.attrs.duration.history.has_changes():
+                entry_deltas[obj.task_id] += (obj.duration or 0) - (_old(state, 'duration') or 0)
+    for obj in session.deleted:
+        if isinstance(obj, TimeEntry):
+            entry_deltas[obj.task_id] -= _old(inspect(obj), 'duration') or 0
+
+    connection = session.connection()
+    if moved_time:
+        tracked = _tracked_by_task(connection, [task_id for task_id, _, _ in moved_time if task_id])
+        for task_id, old_project, new_project in moved_time:
+            seconds = tracked.get(task_id) or 0
+            if old_project is not None:
+                deltas[old_project]['tracked_seconds'] -= seconds
+            if new_project is not None:
+                deltas[new_project]['tracked_seconds'] += seconds
+
+    # A deleted task's time already left its project with the task
+    deleted_tasks = {obj.id for obj in session.deleted if isinstance(obj, Task)}
+    entry_deltas = {task_id: n for task_id, n in entry_deltas.items()
+                    if n and task_id and task_id not in deleted_tasks}
+    if entry_deltas:
+        # Current project of each task, pending moves included
+        projects = dict(connection.execute(
+            select(Task.id, Task.project_id).where(Task.id.in_(entry_deltas))).all())
+        for obj in session.identity_map.values():
+            if isinstance(obj, Task) and obj.id in entry_deltas:
+                projects[obj.id] = obj.project_id
+        for task_id, seconds in entry_deltas.items():
+            if projects.get(task_id) is not None:
+                deltas[projects[task_id]]['tracked_seconds'] += seconds
+    return deltas
+
+def apply_deltas(connection, deltas):
+    """One executemany UPDATE for all projects."""
+    columns = COUNT_COLUMNS + ('tracked_seconds',)
+    rows = [
+        {'pid': project_id, **{f'd_{c}': counts.get(c, 0) for c in columns}}
+        for project_id, counts in deltas.items() if any(counts.values())
+    ]
+    if not rows:
+        return
+    stats = ProjectStats.__table__
+    connection.execute(
+        update(stats).where(stats.c.project_id == bindparam('pid')).values(
+            {c: stats.c[c] + bindparam(f'd_{c}') for c in columns}),
+        rows
+    )
+
+@event.listens_for(Session, 'before_flush')
+def _update_project_stats(session, flush_context, instances):
+    # A new project can't have tasks yet, so its row starts at zero
+    for obj in list(session.new):
+        if isinstance(obj, Project) and obj.stats is None:
+            obj.stats = ProjectStats()
+    if not any(isinstance(obj, (Task, TimeEntry)) for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+    apply_deltas(session.connection(), collect_deltas(session))
+
+def compute_stats(project_ids):
+    """Stats of ``project_ids`` from tasks and time entries, as unsaved ProjectStats."""
+    if not project_ids:
+        return {}
+    counts = {project_id: dict.fromkeys(COUNT_COLUMNS, 0) for project_id in project_ids}
+    for project_id, status, n in db.session.query(Task.project_id, Task.status, func.count(Task.id)).filter(
+            Task.project_id.in_(project_ids)).group_by(Task.project_id, Task.status):
+        counts[project_id]['task_count'] += n
+        column = STATUS_COLUMNS.get(status or 'pending')
+        if column:
+            counts[project_id][column] += n
+    tracked = dict(db.session.query(Task.project_id, func.sum(TimeEntry.duration)).join(
+        TimeEntry, TimeEntry.task_id == Task.id
+    ).filter(Task.project_id.in_(project_ids)).group_by(Task.project_id).all())
+
+    return {project_id: ProjectStats(project_id=project_id, tracked_seconds=tracked.get(project_id) or 0,
+                                     **counts[project_id])
+            for project_id in project_ids}
+
+def overdue_counts(project_ids, now):
+    return dict(db.session.query(Task.project_id, func.count(Task.id)).filter(
+        Task.project_id.in_(project_ids),
+        Task.deadline < now,
+        Task.status.notin_(DONE_STATUSES)
+    ).group_by(Task.project_id).all())
+
+def project_summaries(project_ids, now=None):
+    """{project_id: summary dict}, read-only."""
+    if not project_ids:
+        return {}
+    stats = {row.project_id: row for row in ProjectStats.query.filter(ProjectStats.project_id.in_(project_ids))}
+    missing = [project_id for project_id in project_ids if project_id not in stats]
+    if missing:
+        # Not stored: concurrent readers would race to insert it, and deltas
+        # flushed after these counts were read would be lost
+        stats.update(compute_stats(missing))
+    overdue = overdue_counts(project_ids, now or datetime.utcnow())
+
+    summaries = {}
+    for project_id in project_ids:
+        row = stats[project_id]
+        summaries[project_id] = {
+            'project_id': project_id,
+            'task_count': row.task_count,
+            'status_counts': {status: getattr(row, column) for status, column in STATUS_COLUMNS.items()},
+            'overdue_count': overdue.get(project_id, 0),
+            'tracked_seconds': row.tracked_seconds,
+            'completion_ratio': round(row.completed_count / row.task_count, 4) if row.task_count else 0.0
+        }
+    return summaries
@@ -0,0 +1,104 @@
+"""In-process publish/subscribe with a pluggable backend.
+
+The broker class is read from ``PUBSUB_BACKEND`` (dotted path). The default
+``InMemoryBroker`` only reaches subscribers in the same process, which is
+enough for a single worker and for local development; a shared backend
+(e.g. Redis pub/sub) only needs to implement ``publish`` and ``subscribe``
+and set ``shared = True``.
+"""
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from importlib import import_module
+from flask import current_app
+
+
+class Subscription(ABC):
+    @abstractmethod
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within ``timeout`` seconds."""
+
+    @abstractmethod
+    def close(self):
+        pass
+
+
+class Broker(ABC):
+    # Whether messages reach subscribers in other processes
+    shared = False
+
+    def __init__(self, app):
+        self.app = app
+
+    @abstractmethod
+    def publish(self, channel, message):
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel):
+        """A new ``Subscription`` to ``channel``."""
+
+
+class _QueueSubscription(Subscription):
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InMemoryBroker(Broker):
+    def __init__(self, app):
+        super().__init__(app)
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._maxsize = app.config.get('PUBSUB_QUEUE_SIZE', 100)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                # Slow consumer; it catches up from the database on reconnect
+                pass
+
+    def subscribe(self, channel):
+        subscription = _QueueSubscription(self, channel, self._maxsize)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+_init_lock = threading.Lock()
+
+def get_broker(app=None):
+    app = app or current_app._get_current_object()
+    broker = app.extensions.get('pubsub')
+    if broker is None:
+        with _init_lock:
+            broker = app.extensions.get('pubsub')
+            if broker is None:
+                module, _, name = app.config.get(
+                    'PUBSUB_BACKEND', 'app.services.pubsub.InMemoryBroker').rpartition('.')
+                broker = getattr(import_module(module), name)(app)
+                app.extensions['pubsub'] = broker
+    return broker
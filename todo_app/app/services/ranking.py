@@ -0,0 +1,110 @@
+"""Fractional rank keys for ``Task.order``.
+
+A key is a base-36 fraction written without the leading '0.' ('i' is 0.5)
+and never ends in '0', so there is always room for another key between two
+neighbours. Moving a task between siblings writes only that task's key.
+Keys grow by about one character every five inserts at the same spot;
+once one is longer than TASK_RANK_REBALANCE_LENGTH the siblings are respread
+in the background.
+
+Siblings are the tasks sharing a parent; for top-level tasks (no parent)
+they are the owner's top-level tasks.
+"""
+from flask import current_app
+from sqlalchemy import bindparam, update
+from app import db
+from app.models.task import Task
+from app.services.dispatch import dispatch
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+MIDDLE = DIGITS[BASE // 2]
+
+def rank_between(before, after):
+    """A key sorting strictly between ``before`` and ``after`` (None: open end)."""
+    # Appending or prepending steps one digit instead of halving the gap, so
+    # keys at the ends of a list grow one character per ~35 moves, not ~5
+    if before and after is None:
+        for i, char in enumerate(before):
+            if char != DIGITS[-1]:
+                return before[:i] + DIGITS[DIGITS.index(char) + 1]
+    if after and before is None:
+        for i, char in enumerate(after):
+            if DIGITS.index(char) > 1:
+                return after[:i] + DIGITS[DIGITS.index(char) - 1]
+    before = before or ''
+    if after is not None:
+        # Keep the common prefix (``before`` padded with '0') and recurse
+        n = 0
+        while n < len(after) and (before[n] if n < len(before) else '0') == after[n]:
+            n += 1
+        if n:
+            return after[:n] + rank_between(before[n:], after[n:])
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high + 1) // 2]
+    # Adjacent first digits
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[low] + rank_between(before[1:], None)
+
+def spread_ranks(count):
+    """``count`` increasing keys, evenly spaced and as short as possible."""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    keys = []
+    for i in range(1, count + 1):
+        value = i * BASE ** width // (count + 1)
+        digits = ''
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits = DIGITS[digit] + digits
+        keys.append(digits.rstrip('0'))
+    return keys
+
+def sibling_filter(parent_id, user_id):
+    if parent_id is None:
+        return (Task.parent_id.is_(None), Task.user_id == user_id)
+    return (Task.parent_id == parent_id,)
+
+def neighbour_rank(parent_id, user_id, rank, after, exclude_id=None):
+    """Rank of the sibling right after (or before) ``rank``; the last/first one for rank None."""
+    query = db.session.query(Task.order).filter(*sibling_filter(parent_id, user_id))
+    if exclude_id is not None:
+        query = query.filter(Task.id != exclude_id)
+    if after:
+        if rank is not None:
+            query = query.filter(Task.order > rank)
+        query = query.order_by(Task.order.asc())
+    else:
+        if rank is not None:
+            query = query.filter(Task.order < rank)
+        query = query.order_by(Task.order.desc())
+    return query.limit(1).scalar()
+
+def rank_last(parent_id, user_id, exclude_id=None):
+    return rank_between(neighbour_rank(parent_id, user_id, None, False, exclude_id), None)
+
+def rebalance_siblings(parent_id, user_id):
+    """Respread the keys of one sibling group, keeping their order. The caller commits."""
+    rows = db.session.query(Task.id, Task.order).filter(
+        *sibling_filter(parent_id, user_id)
+    ).order_by(Task.order, Task.id).all()
+    keys = spread_ranks(len(rows))
+    changed = [{'tid': task_id, 'rank': key} for (task_id, rank), key in zip(rows, keys) if rank != key]
+    if changed:
+        # updated_at is bumped: keys are serialized, so synced clients need the new ones
+        tasks = Task.__table__
+        db.session.execute(
+            update(tasks).where(tasks.c.id == bindparam('tid')).values(order=bindparam('rank')), changed)
+
+def rebalance_job(parent_id, user_id):
+    # Dispatched, so it owns its transaction
+    rebalance_siblings(parent_id, user_id)
+    db.session.commit()
+
+def check_rank_length(task):
+    if len(task.order) > current_app.config.get('TASK_RANK_REBALANCE_LENGTH', 24):
+        dispatch(rebalance_job, task.parent_id, task.user_id)
@@ -0,0 +1,158 @@
+"""Recurring events: a small RRULE subset and bounded, cached expansion.
+
+Supported: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY with INTERVAL, COUNT or UNTIL,
+and BYDAY (plain weekdays, WEEKLY only). MONTHLY/YEARLY repeat on the day of
+DTSTART and skip months/years without that day, as RFC 5545 does.
+"""
+import calendar
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+Rule = namedtuple('Rule', 'freq interval count until byday')
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+def _parse_until(value):
+    # 20250131, 20250131T090000 or 20250131T090000Z (the Z is ignored, times are naive)
+    for fmt in ('%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            until = datetime.strptime(value.rstrip('Z'), fmt)
+        except ValueError:
+            continue
+        # A date-only UNTIL includes occurrences on that day
+        return until + timedelta(days=1) - timedelta(microseconds=1) if fmt == '%Y%m%d' else until
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise RecurrenceError(f'Invalid UNTIL: {value}')
+
+
+@lru_cache(maxsize=1024)
+def parse_rrule(rrule):
+    """Parse 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10' (an optional 'RRULE:' prefix is allowed)."""
+    if rrule.upper().startswith('RRULE:'):
+        rrule = rrule[6:]
+    parts = {}
+    for part in filter(None, rrule.upper().split(';')):
+        key, sep, value = part.partition('=')
+        if not sep or not value:
+            raise RecurrenceError(f'Invalid rule part: {part}')
+        parts[key] = value
+
+    freq = parts.pop('FREQ', None)
+    if freq not in FREQUENCIES:
+        raise RecurrenceError('FREQ must be one of ' + ', '.join(FREQUENCIES))
+    try:
+        interval = int(parts.pop('INTERVAL', 1))
+        count = int(parts.pop('COUNT')) if 'COUNT' in parts else None
+    except ValueError:
+        raise RecurrenceError('INTERVAL and COUNT must be integers')
+    if interval < 1 or (count is not None and count < 1):
+        raise RecurrenceError('INTERVAL and COUNT must be positive')
+    until = _parse_until(parts.pop('UNTIL')) if 'UNTIL' in parts else None
+    if count is not None and until is not None:
+        raise RecurrenceError('COUNT and UNTIL cannot be combined')
+
+    byday = None
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise RecurrenceError('BYDAY is only supported with FREQ=WEEKLY')
+        days = parts.pop('BYDAY').split(',')
+        if not all(day in WEEKDAYS for day in days):
+            raise RecurrenceError('BYDAY must list weekdays (MO, TU, ...)')
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+
+    if parts:
+        raise RecurrenceError('Unsupported rule parts: ' + ', '.join(sorted(parts)))
+    return Rule(freq, interval, count, until, byday)
+
+
+def _add_months(dtstart, months):
+    # None when the target month doesn't have dtstart's day (e.g. the 31st)
+    year, month = divmod(dtstart.month - 1 + months, 12)
+    year += dtstart.year
+    if year > 9999 or dtstart.day > calendar.monthrange(year, month + 1)[1]:
+        return None
+    return dtstart.replace(year=year, month=month + 1)
+
+
+def _iter_starts(rule, dtstart, after=None):
+    """Occurrence starts in order as (index, start), beginning near ``after``.
+
+    DAILY and WEEKLY jump straight to ``after`` so distant windows cost
+    nothing extra; MONTHLY/YEARLY walk from dtstart (at most 12 steps a year).
+    """
+    if rule.freq in ('DAILY', 'WEEKLY') and not rule.byday:
+        step = timedelta(days=rule.interval * (7 if rule.freq == 'WEEKLY' else 1))
+        k = max(0, (after - dtstart) // step) if after else 0
+        while True:
+            yield k, dtstart + step * k
+            k += 1
+
+    elif rule.freq == 'WEEKLY':
+        week_start = datetime.combine(dtstart.date() - timedelta(days=dtstart.weekday()), dtstart.time())
+        step = timedelta(weeks=rule.interval)
+        first_week = [week_start + timedelta(days=d) for d in rule.byday if week_start + timedelta(days=d) >= dtstart]
+        p = max(0, (after - week_start) // step) if after else 0
+        while True:
+            # Occurrences before period p: the (partial) first week, then full weeks
+            k = 0 if p == 0 else len(first_week) + (p - 1) * len(rule.byday)
+            starts = first_week if p == 0 else [week_start + step * p + timedelta(days=d) for d in rule.byday]
+            for start in starts:
+                yield k, start
+                k += 1
+            p += 1
+
+    else:
+        months = rule.interval * (12 if rule.freq == 'YEARLY' else 1)
+        k = 0
+        for n in range(0, 12 * (9999 - dtstart.year) + 1, months):
+            start = _add_months(dtstart, n)
+            if start is not None:
+                yield k, start
+                k += 1
+
+
+@lru_cache(maxsize=4096)
+def expand(rrule, dtstart, duration, window_start, window_end, limit):
+    """Starts of the occurrences overlapping [window_start, window_end).
+
+    Pure function of its arguments, so results are cached per
+    (event definition, window); editing an event changes the key.
+    At most ``limit`` occurrences are returned.
+    """
+    rule = parse_rrule(rrule)
+    starts = []
+    for k, start in _iter_starts(rule, dtstart, after=window_start - duration):
+        if start >= window_end or (rule.count is not None and k >= rule.count):
+            break
+        if rule.until is not None and start > rule.until:
+            break
+        if start + duration > window_start or start >= window_start:
+            starts.append(start)
+            if len(starts) >= limit:
+                break
+    return tuple(starts)
+
+
+def series_end(rrule, dtstart, duration):
+    """When the last occurrence ends, or None for an open-ended series.
+
+    Stored on the event so range queries can skip finished series.
+    """
+    rule = parse_rrule(rrule)
+    if rule.until is not None:
+        # Upper bound, the last occurrence may start earlier
+        return max(rule.until, dtstart) + duration
+    if rule.count is None:
+        return None
+    for k, start in _iter_starts(rule, dtstart):
+        if k == rule.count - 1:
+            return start + duration
@@ -0,0 +1,214 @@
+"""Event reminders, fired ``Event.reminder`` minutes before each occurrence.
+
+Every event stores its next reminder instant in the indexed ``remind_at``
+column (NULL when nothing is pending). ``ReminderScheduler`` runs in its own
+process (reminder_worker.py): it loads the reminders due within the next
+REMINDER_WINDOW seconds with one range query on that index, keeps them in a
+heap, and fires whatever is due in bulk. Firing advances ``remind_at`` to the
+next occurrence of recurring events.
+
+create_event/delete_event publish on REMINDER_CHANNEL so a running scheduler
+picks changes up without waiting for its next reload. That needs a broker
+whose messages cross processes (``Broker.shared``, e.g. Redis): the default
+InMemoryBroker only reaches subscribers in the web process itself, never
+reminder_worker.py. Without one the scheduler reloads from the
+database every REMINDER_POLL_INTERVAL instead of every REMINDER_WINDOW, so
+reminders added in the meantime are at most one poll interval late.
+
+Event times are naive and compared against ``datetime.utcnow()`` like the
+rest of the server's timestamps. Each reminder is claimed with an UPDATE
+guarded on its remind_at and only sent if that UPDATE matched, so an edit
+made while it fires (or a second scheduler) can't cause a duplicate.
+"""
+import heapq
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models.event import Event
+from app.models.shared import SharedItem
+from app.services.notifications import insert_notifications
+from app.services.pubsub import get_broker
+from app.services.recurrence import expand
+
+logger = logging.getLogger(__name__)
+
+REMINDER_CHANNEL = 'reminders'
+
+def next_remind_at(event, after):
+    """Reminder instant for the first occurrence starting after ``after``, or None."""
+    if not event.reminder or event.reminder <= 0:
+        return None
+    if event.rrule:
+        starts = expand(event.rrule, event.start_date, timedelta(0),
+                        after + timedelta(microseconds=1), datetime.max, 1)
+        start = starts[0] if starts else None
+    else:
+        start = event.start_date if event.start_date > after else None
+    # An event created inside its reminder lead time is reminded right away
+    return start - timedelta(minutes=event.reminder) if start else None
+
+def schedule_reminder(event, now=None):
+    event.remind_at = next_remind_at(event, now or datetime.utcnow())
+
+def publish_reminder(event_id, remind_at):
+    """Tell a running scheduler about a new or changed (None: removed) reminder.
+
+    Only reaches reminder_worker.py through a shared broker, see the module docstring.
+    """
+    get_broker().publish(REMINDER_CHANNEL, {
+        'event_id': event_id,
+        'remind_at': remind_at.isoformat() if remind_at else None
+    })
+
+def _message(event, start):
+    return f"Reminder: '{event.title}' starts at {start.strftime('%Y-%m-%d %H:%M')}"
+
+def fire_reminders(event_ids, now):
+    """Send the reminders of ``event_ids`` that are due at ``now`` and advance them.
+
+    Returns ``{event_id: next remind_at or None}`` for the events that fired.
+    The caller commits.
+    """
+    events = Event.query.options(selectinload(Event.exceptions)).filter(
+        Event.id.in_(event_ids),
+        Event.remind_at <= now
+    ).all()
+    if not events:
+        return {}
+
+    # Owner plus everyone the event is shared with
+    audience = defaultdict(set)
+    for event in events:
+        audience[event.id].add(event.user_id)
+    for item_id, user_id in db.session.query(SharedItem.item_id, SharedItem.shared_with_id).filter(
+            SharedItem.item_type == 'event', SharedItem.item_id.in_([e.id for e in events])):
+        audience[item_id].add(user_id)
+
+    # One guarded UPDATE per event: its rowcount says whether we claimed it or
+    # it was edited (or fired elsewhere) since it was read. updated_at is kept
+    # so firing a reminder doesn't resend the event in /api/sync
+    events_table = Event.__table__
+    claim = update(events_table).where(
+        events_table.c.id == bindparam('eid'),
+        events_table.c.remind_at == bindparam('due')
+    ).values(remind_at=bindparam('next_at'), updated_at=events_table.c.updated_at)
+    connection = db.session.connection()
+
+    rows = []
+    advanced = {}
+    for event in events:
+        start = event.remind_at + timedelta(minutes=event.reminder or 0)
+        next_at = next_remind_at(event, start)
+        if connection.execute(claim, {'eid': event.id, 'due': event.remind_at, 'next_at': next_at}).rowcount != 1:
+            continue
+        advanced[event.id] = next_at
+        cancelled = {x.original_start for x in event.exceptions if x.cancelled}
+        if start not in cancelled:
+            rows.extend({
+                'message': _message(event, start),
+                'user_id': user_id,
+                'event_id': event.id
+            } for user_id in sorted(audience[event.id]))
+
+    insert_notifications(rows)
+    return advanced
+
+
+class ReminderScheduler:
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.window = timedelta(seconds=config.get('REMINDER_WINDOW', 300))
+        self.batch_size = config.get('REMINDER_BATCH_SIZE', 1000)
+        self.poll_interval = config.get('REMINDER_POLL_INTERVAL', 30)
+        self.heap = []
+        self.scheduled = {} # event_id -> remind_at; heap entries that disagree are stale
+        self.horizon = None # Every reminder before this is in the heap
+        self.reload_interval = self.window # Shortened by run() when changes can't reach us
+
+    def load(self, now):
+        """Replace the heap with the reminders due before now + window."""
+        rows = db.session.query(Event.remind_at, Event.id).filter(
+            Event.remind_at.isnot(None),
+            Event.remind_at < now + self.window
+        ).order_by(Event.remind_at).limit(self.batch_size).all()
+
+        self.horizon = now + min(self.window, self.reload_interval)
+        if len(rows) == self.batch_size:
+            # Truncated: reload once the last loaded reminder is due
+            self.horizon = min(self.horizon, rows[-1].remind_at)
+        self.heap = [tuple(row) for row in rows]
+        heapq.heapify(self.heap)
+        self.scheduled = {event_id: remind_at for remind_at, event_id in rows}
+
+    def reschedule(self, event_id, remind_at):
+        self.scheduled.pop(event_id, None)
+        # Reminders past the horizon are picked up by the next load
+        if remind_at is not None and self.horizon is not None and remind_at < self.horizon:
+            self.scheduled[event_id] = remind_at
+            heapq.heappush(self.heap, (remind_at, event_id))
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            remind_at, event_id = heapq.heappop(self.heap)
+            if self.scheduled.get(event_id) == remind_at:
+                del self.scheduled[event_id]
+                due.append(event_id)
+        return due
+
+    def tick(self, now):
+        """Fire everything due at ``now``. Needs an app context."""
+        if self.horizon is None or now >= self.horizon:
+            self.load(now)
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        advanced = fire_reminders(due, now)
+        db.session.commit()
+        for event_id, remind_at in advanced.items():
+            self.reschedule(event_id, remind_at)
+        return len(advanced)
+
+    def seconds_until_next(self, now):
+        candidates = [self.poll_interval]
+        if self.heap:
+            candidates.append((self.heap[0][0] - now).total_seconds())
+        if self.horizon is not None:
+            candidates.append((self.horizon - now).total_seconds())
+        return max(0, min(candidates))
+
+    def run(self):
+        broker = get_broker(self.app)
+        if not broker.shared:
+            # publish_reminder never reaches this process, poll the database instead
+            logger.warning('%s is not shared between processes, reloading reminders every %ds',
+                           type(broker).__name__, self.poll_interval)
+            self.reload_interval = timedelta(seconds=self.poll_interval)
+        subscription = broker.subscribe(REMINDER_CHANNEL)
+        logger.info('Reminder scheduler started')
+        try:
+            while True:
+                with self.app.app_context():
+                    try:
+                        fired = self.tick(datetime.utcnow())
+                        if fired:
+                            logger.info('Fired %d reminders', fired)
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception('Reminder tick failed')
+                        time.sleep(self.poll_interval)
+                    finally:
+                        db.session.remove()
+
+                message = subscription.get(timeout=self.seconds_until_next(datetime.utcnow()))
+                while message is not None:
+                    remind_at = message['remind_at']
+                    self.reschedule(message['event_id'], datetime.fromisoformat(remind_at) if remind_at else None)
+                    message = subscription.get(timeout=0)
+        finally:
+            subscription.close()
@@ -0,0 +1,247 @@
+"""Full-text search over tasks, their comments and checklist items.
+
+Every task, task comment and checklist item is one document, keyed by
+``doc_id = source_id * 3 + kind`` and tagged with the task it belongs to.
+Results are tasks, ranked by their best matching document and restricted
+to the tasks the user can see.
+
+On SQLite with FTS5 the documents live in the ``search_fts`` virtual table
+(created next to the regular tables) and are ranked with bm25. Elsewhere
+they are tokenized in Python into ``search_postings`` (an inverted index
+table) and ranked by term frequency weighted against how common a term is.
+Either way the index is written from mapper events in the same transaction
+as the row, so every write path, ORM cascades included, keeps it current.
+Query words match as prefixes and all of them must appear in one document.
+
+``flask search-reindex`` rebuilds the index from scratch.
+"""
+import math
+import re
+import unicodedata
+from collections import defaultdict
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import (
+    Integer, String, and_, column, event, func, inspect, literal, literal_column, select, table, union_all
+)
+from app import db
+from app.models.comment import Comment
+from app.models.search import SearchPosting
+from app.models.task import ChecklistItem, Task
+from app.services.access import visible_ids
+from app.services.pagination import PaginationError
+
+WORD_RE = re.compile(r'\w+')
+KINDS = {'task': 0, 'comment': 1, 'checklist': 2}
+TITLE_WEIGHT = 3.0
+MAX_QUERY_TERMS = 10
+
+search_fts = table('search_fts', column('rowid', Integer), column('title', String),
+                   column('body', String), column('task_id', Integer))
+
+def tokenize(text):
+    # Same folding as FTS5's unicode61 tokenizer: lowercase, accents stripped
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [word.lower() for word in WORD_RE.findall(text)]
+
+def query_terms(text):
+    # Longest words are the most selective ones to keep
+    terms = list(dict.fromkeys(term[:64] for term in tokenize(text)))
+    return sorted(terms, key=len, reverse=True)[:MAX_QUERY_TERMS]
+
+def doc_id(kind, source_id):
+    return source_id * len(KINDS) + KINDS[kind]
+
+def _document(target):
+    """(doc_id, task_id, title, body); task_id is None when there's nothing to index."""
+    if isinstance(target, Task):
+        return doc_id('task', target.id), target.id, target.title, target.description
+    kind = 'comment' if isinstance(target, Comment) else 'checklist'
+    return doc_id(kind, target.id), target.task_id, '', target.content
+
+
+# Backends
+
+def _has_fts(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'").first() is not None
+
+def use_fts(connection):
+    # Decided once per database: the table only appears through create_all or a migration
+    cache = current_app.extensions.setdefault('search_backend', {})
+    key = str(connection.engine.url)
+    if key not in cache:
+        cache[key] = _has_fts(connection)
+    return cache[key]
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_fts(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    compile_options = {row[0] for row in connection.exec_driver_sql('PRAGMA compile_options')}
+    if 'ENABLE_FTS5' in compile_options:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+            "title, body, task_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')")
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_fts(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_fts')
+
+def _postings(doc, task_id, title, body):
+    weights = defaultdict(float)
+    for term in tokenize(title):
+        weights[term[:64]] += TITLE_WEIGHT
+    for term in tokenize(body):
+        weights[term[:64]] += 1
+    return [{'term': term, 'doc_id': doc, 'task_id': task_id, 'weight': weight} for term, weight in weights.items()]
+
+def remove_documents(connection, doc_ids):
+    if not doc_ids:
+        return
+    if use_fts(connection):
+        connection.execute(search_fts.delete().where(search_fts.c.rowid.in_(doc_ids)))
+    else:
+        connection.execute(SearchPosting.__table__.delete().where(SearchPosting.doc_id.in_(doc_ids)))
+
+def write_documents(connection, documents):
+    """(Re)index ``[(doc_id, task_id, title, body)]``."""
+    remove_documents(connection, [doc[0] for doc in documents])
+    documents = [doc for doc in documents if doc[1] is not None]
+    if not documents:
+        return
+    if use_fts(connection):
+        connection.execute(search_fts.insert(), [
+            {'rowid': doc, 'title': title or '', 'body': body or '', 'task_id': task_id}
+            for doc, task_id, title, body in documents
+        ])
+    else:
+        rows = [row for doc in documents for row in _postings(*doc)]
+        if rows:
+            connection.execute(SearchPosting.__table__.insert(), rows)
+
+
+# Index maintenance
+
+INDEXED_ATTRIBUTES = {Task: ('title', 'description'), Comment: ('content', 'task_id'),
+                      ChecklistItem: ('content', 'task_id')}
+
+def _indexed(mapper, connection, target):
+    write_documents(connection, [_document(target)])
+
+def _updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in INDEXED_ATTRIBUTES[type(target)]):
+        write_documents(connection, [_document(target)])
+
+def _deleted(mapper, connection, target):
+    remove_documents(connection, [_document(target)[0]])
+
+for model in INDEXED_ATTRIBUTES:
+    event.listen(model, 'after_insert', _indexed)
+    event.listen(model, 'after_update', _updated)
+    event.listen(model, 'after_delete', _deleted)
+
+def rebuild_index(batch_size=1000):
+    """Reindex every task, task comment and checklist item."""
+    connection = db.session.connection()
+    if use_fts(connection):
+        connection.execute(search_fts.delete())
+    else:
+        connection.execute(SearchPosting.__table__.delete())
+    sources = [
+        Task.query.order_by(Task.id),
+        Comment.query.filter(Comment.task_id.isnot(None)).order_by(Comment.id),
+        ChecklistItem.query.order_by(ChecklistItem.id),
+    ]
+    count = 0
+    for query in sources:
+        for batch_start in range(0, query.count(), batch_size):
+            documents = [_document(row) for row in query.offset(batch_start).limit(batch_size)]
+            write_documents(connection, documents)
+            count += len(documents)
+    db.session.commit()
+    return count
+
+@click.command('search-reindex')
+@with_appcontext
+def reindex_command():
+    """Rebuild the full-text search index."""
+    click.echo(f'Indexed {rebuild_index()} documents')
+
+
+# Queries
+
+def _fts_search(terms, visible, cursor, limit):
+    # Quoted prefix queries, implicitly ANDed; bm25 weights title over body
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # bm25 is only allowed in a plain FTS query, so documents are scored in a
+    # materialized CTE (a subquery would be flattened into the GROUP BY)
+    rank = func.bm25(literal_column('search_fts'), TITLE_WEIGHT, 1.0, 0.0).label('rank')
+    matched = select(search_fts.c.task_id, rank).where(
+        literal_column('search_fts').op('MATCH')(match),
+        search_fts.c.task_id.in_(visible)
+    ).cte('matched').prefix_with('MATERIALIZED')
+    ranked = select(matched.c.task_id, (-func.min(matched.c.rank)).label('score')).group_by(matched.c.task_id).subquery()
+
+    query = select(ranked.c.task_id, ranked.c.score)
+    if cursor is not None:
+        query = query.where((ranked.c.score < cursor[0]) | and_(ranked.c.score == cursor[0], ranked.c.task_id < cursor[1]))
+    query = query.order_by(ranked.c.score.desc(), ranked.c.task_id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return [tuple(row) for row in db.session.execute(query)]
+
+def _postings_search(terms, visible, cursor, limit):
+    # One range scan per word on the (term, doc_id) primary key
+    conditions = [and_(SearchPosting.term >= term, SearchPosting.term < term + '\uffff',
+                       SearchPosting.task_id.in_(visible)) for term in terms]
+
+    # Frequent words count for less, like idf without needing the corpus size
+    counts = db.session.execute(select(*[
+        select(func.count(SearchPosting.doc_id.distinct())).where(condition).scalar_subquery()
+        for condition in conditions
+    ])).one()
+    factors = [1 / math.log(2 + count) for count in counts]
+
+    # Weight of each (document, word) pair, one branch per word since a
+    # posting can match several prefixes
+    matched = union_all(*[
+        select(SearchPosting.doc_id, SearchPosting.task_id, literal(i).label('word'),
+               (SearchPosting.weight * factors[i]).label('score')).where(condition)
+        for i, condition in enumerate(conditions)
+    ]).subquery('matched')
+    # Documents containing every word, then each task's best document
+    docs = select(matched.c.task_id, func.sum(matched.c.score).label('score')).group_by(
+        matched.c.doc_id, matched.c.task_id
+    ).having(func.count(matched.c.word.distinct()) == len(terms)).subquery('docs')
+    ranked = select(docs.c.task_id, func.round(func.max(docs.c.score), 6).label('score')).group_by(
+        docs.c.task_id).subquery('ranked')
+
+    query = select(ranked.c.task_id, ranked.c.score)
+    if cursor is not None:
+        query = query.where((ranked.c.score < cursor[0]) | and_(ranked.c.score == cursor[0], ranked.c.task_id < cursor[1]))
+    query = query.order_by(ranked.c.score.desc(), ranked.c.task_id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return [tuple(row) for row in db.session.execute(query)]
+
+def search_tasks(user_id, text, cursor=None, limit=None):
+    """``([(task_id, score)], next cursor values)``, best match first."""
+    terms = query_terms(text)
+    if not terms:
+        return [], None
+    if cursor is not None and (len(cursor) != 2 or not all(isinstance(v, (int, float)) for v in cursor)):
+        raise PaginationError('Invalid cursor')
+
+    search = _fts_search if use_fts(db.session.connection()) else _postings_search
+    rows = search(terms, visible_ids(Task, user_id), cursor, limit)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, [rows[-1][1], rows[-1][0]]
@@ -0,0 +1,120 @@
+"""Change tracking behind /api/sync.
+
+Rows carry ``updated_at``; deletions leave ``Tombstone`` rows for every user
+who could see the deleted item, written from mapper events so ORM cascades
+(subtasks, checklist items) are covered too. Bulk deletes of shares go
+through ``access.delete_shares`` instead.
+"""
+from sqlalchemy import event, insert, or_, select
+from sqlalchemy.orm import Session, object_session, selectinload
+from app.models.comment import Comment
+from app.models.event import Event
+from app.models.shared import SharedItem
+from app.models.task import ChecklistItem, Task
+from app.models.tombstone import Tombstone
+from app.services.access import ITEM_TYPES, visible_ids, visible_query
+
+def _audience(target, connection, item_type, item_id, owner_id=None):
+    # Cached per flush: cascades delete many children of the same task
+    cache = object_session(target).info.setdefault('tombstone_audience', {})
+    key = (item_type, item_id)
+    if key not in cache:
+        model = Task if item_type == ITEM_TYPES['Task'] else Event
+        query = select(SharedItem.shared_with_id).where(
+            SharedItem.item_type == item_type, SharedItem.item_id == item_id)
+        if owner_id is None:
+            query = query.union(select(model.user_id).where(model.id == item_id))
+        cache[key] = set(connection.execute(query).scalars())
+        if owner_id is not None:
+            cache[key].add(owner_id)
+    return cache[key]
+
+def _record(connection, item_type, item_id, user_ids):
+    if user_ids:
+        connection.execute(insert(Tombstone), [
+            {'item_type': item_type, 'item_id': item_id, 'user_id': user_id} for user_id in user_ids
+        ])
+
+@event.listens_for(Session, 'after_flush')
+def _clear_audience_cache(session, flush_context):
+    session.info.pop('tombstone_audience', None)
+
+@event.listens_for(Task, 'after_delete')
+def _task_deleted(mapper, connection, target):
+    audience = _audience(target, connection, 'todo', target.id, target.user_id)
+    _record(connection, 'todo', target.id, audience)
+
+@event.listens_for(Event, 'after_delete')
+def _event_deleted(mapper, connection, target):
+    audience = _audience(target, connection, 'event', target.id, target.user_id)
+    _record(connection, 'event', target.id, audience)
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, target):
+    if target.task_id:
+        audience = _audience(target, connection, 'todo', target.task_id)
+    elif target.event_id:
+        audience = _audience(target, connection, 'event', target.event_id)
+    else:
+        audience = {target.user_id}
+    _record(connection, 'comment', target.id, audience)
+
+@event.listens_for(ChecklistItem, 'after_delete')
+def _checklist_item_deleted(mapper, connection, target):
+    _record(connection, 'checklist_item', target.id, _audience(target, connection, 'todo', target.task_id))
+
+@event.listens_for(SharedItem, 'after_delete')
+def _share_deleted(mapper, connection, target):
+    connection.execute(insert(Tombstone), Tombstone.for_share(
+        target.id, target.item_type, target.item_id, target.owner_id, target.shared_with_id))
+
+def changes_since(user_id, since=None):
+    """Everything visible to ``user_id`` that changed after ``since``.
+
+    With ``since=None`` this is a full snapshot (and no tombstones).
+    """
+    task_ids = visible_ids(Task, user_id)
+    event_ids = visible_ids(Event, user_id)
+
+    tasks = visible_query(Task, user_id).options(selectinload(Task.owner))
+    events = visible_query(Event, user_id).options(selectinload(Event.owner), selectinload(Event.exceptions))
+    comments = Comment.query.options(selectinload(Comment.user)).filter(
+        or_(Comment.task_id.in_(task_ids), Comment.event_id.in_(event_ids)))
+    checklist_items = ChecklistItem.query.filter(ChecklistItem.task_id.in_(task_ids))
+    shares = SharedItem.query.filter(or_(SharedItem.owner_id == user_id, SharedItem.shared_with_id == user_id))
+    deleted = []
+
+    if since is not None:
+        # Items shared with us since the cursor are new to us even if they didn't change
+        def new_shares(item_type):
+            return select(SharedItem.item_id).where(
+                SharedItem.item_type == item_type,
+                SharedItem.shared_with_id == user_id,
+                SharedItem.updated_at > since
+            )
+
+        tasks = tasks.filter(or_(Task.updated_at > since, Task.id.in_(new_shares('todo'))))
+        events = events.filter(or_(Event.updated_at > since, Event.id.in_(new_shares('event'))))
+        comments = comments.filter(or_(
+            Comment.updated_at > since,
+            Comment.task_id.in_(new_shares('todo')),
+            Comment.event_id.in_(new_shares('event'))
+        ))
+        checklist_items = checklist_items.filter(or_(
+            ChecklistItem.updated_at > since,
+            ChecklistItem.task_id.in_(new_shares('todo'))
+        ))
+        shares = shares.filter(SharedItem.updated_at > since)
+        deleted = Tombstone.query.filter(
+            Tombstone.user_id == user_id,
+            Tombstone.deleted_at > since
+        ).order_by(Tombstone.deleted_at).all()
+
+    return {
+        'tasks': tasks.all(),
+        'events': events.all(),
+        'comments': comments.all(),
+        'checklist_items': checklist_items.all(),
+        'shares': shares.all(),
+        'deleted': deleted,
+    }
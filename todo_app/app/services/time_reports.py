@@ -0,0 +1,244 @@
+"""Tracked time reports, aggregated in SQL.
+
+A report sums the time entries on the tasks a user can see over a range of
+calendar days in one timezone. The days are passed to the query as a
+derived table of UTC intervals (computed here, so DST changes give 23 or 25
+hour days), and every entry is clipped to each day it overlaps. An entry
+running past midnight is split between the days, and running timers count
+up to now.
+
+Entries last at most TIME_ENTRY_MAX_HOURS (stop_timer clamps them, and a
+running timer counts up to now or that cap), so the entries overlapping a
+range are found with one seek on the start_time index, from the range start
+minus that length. Only those are then clipped to the days. Entries stopped
+before the cap existed can be longer; ``flask time-clamp-entries`` cuts them
+to it (the migration adding the cap ran it once), or they would fall out of
+reports. Run it again after lowering TIME_ENTRY_MAX_HOURS.
+
+The SQL helpers below are compiled for SQLite, MySQL and PostgreSQL only,
+so ``check_dialect`` refuses any other database when the app is created.
+
+Rows can be grouped by any of task, project, user and day.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import DateTime, Float, String, case, func, literal, or_, select, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from app import db
+from app.models.project import Project
+from app.models.task import Task
+from app.models.time import TimeEntry
+from app.models.user import User
+from app.services.access import visible_clause
+
+GROUPS = ('task', 'project', 'user', 'day')
+DIALECTS = ('mysql', 'postgresql', 'sqlite')
+
+ReportRange = namedtuple('ReportRange', 'start end tz')
+
+
+class ReportError(ValueError):
+    pass
+
+
+def check_dialect(app):
+    """Raise RuntimeError at startup if reports can't be compiled for the app's database."""
+    name = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if name not in DIALECTS:
+        raise RuntimeError(f"Time reports support {', '.join(DIALECTS)} databases, not {name}")
+
+
+class seconds_between(FunctionElement):
+    """``end - start`` in seconds, for naive UTC DateTime columns."""
+    type = Float()
+    inherit_cache = True
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    raise CompileError(f'seconds_between is not implemented for {compiler.dialect.name}')
+
+@compiles(seconds_between, 'mysql')
+def _seconds_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f'TIMESTAMPDIFF(MICROSECOND, {compiler.process(start, **kw)}, {compiler.process(end, **kw)}) / 1000000.0'
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f'(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)})) * 86400.0'
+
+@compiles(seconds_between, 'postgresql')
+def _seconds_between_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f'EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)}))'
+
+
+class add_hours(FunctionElement):
+    """``value + hours`` for a naive UTC DateTime column and a literal number of hours."""
+    type = DateTime()
+    inherit_cache = True
+
+    def __init__(self, value, hours):
+        self.hours = int(hours)
+        super().__init__(value)
+
+@compiles(add_hours)
+def _add_hours_default(element, compiler, **kw):
+    raise CompileError(f'add_hours is not implemented for {compiler.dialect.name}')
+
+@compiles(add_hours, 'mysql')
+def _add_hours_mysql(element, compiler, **kw):
+    value, = list(element.clauses)
+    return f'DATE_ADD({compiler.process(value, **kw)}, INTERVAL {element.hours} HOUR)'
+
+@compiles(add_hours, 'sqlite')
+def _add_hours_sqlite(element, compiler, **kw):
+    # Same text format as the stored values, so they still compare as strings
+    value, = list(element.clauses)
+    return f"strftime('%Y-%m-%d %H:%M:%f000', {compiler.process(value, **kw)}, '+{element.hours} hours')"
+
+@compiles(add_hours, 'postgresql')
+def _add_hours_postgresql(element, compiler, **kw):
+    value, = list(element.clauses)
+    return f"({compiler.process(value, **kw)} + INTERVAL '{element.hours} hours')"
+
+
+def max_entry_hours():
+    return current_app.config.get('TIME_ENTRY_MAX_HOURS', 168)
+
+def clamp_entries():
+    """Cut stopped entries longer than max_entry_hours to it. Returns how many were cut."""
+    longest = timedelta(hours=max_entry_hours())
+    # Duration is set on stop, so this only misses rows written without one
+    candidates = TimeEntry.query.filter(TimeEntry.end_time.isnot(None), or_(
+        TimeEntry.duration.is_(None), TimeEntry.duration > longest.total_seconds()))
+    count = 0
+    for entry in candidates:
+        if entry.end_time - entry.start_time > longest:
+            entry.end_time = entry.start_time + longest
+            entry.duration = int(longest.total_seconds())
+            count += 1
+    # Project tracked time follows through the flush listeners
+    db.session.commit()
+    return count
+
+@click.command('time-clamp-entries')
+@with_appcontext
+def clamp_entries_command():
+    """Cut time entries longer than TIME_ENTRY_MAX_HOURS to it."""
+    click.echo(f'Clamped {clamp_entries()} time entries')
+
+def parse_range(args):
+    """``?start=&end=`` (inclusive local dates) and ``?tz=``. Raises ReportError."""
+    try:
+        tz = ZoneInfo(args.get('tz') or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ReportError(f"Unknown timezone {args.get('tz')!r}")
+    try:
+        start = datetime.strptime(args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(args['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        raise ReportError('start and end are required, as YYYY-MM-DD')
+    if end < start:
+        raise ReportError('end must not be before start')
+    max_days = current_app.config.get('TIME_REPORT_MAX_DAYS', 366)
+    if (end - start).days >= max_days:
+        raise ReportError(f'Reports cover at most {max_days} days')
+    return ReportRange(start, end, tz)
+
+def parse_group_by(args):
+    groups = [g for g in (args.get('group_by') or 'task').split(',') if g]
+    unknown = [g for g in groups if g not in GROUPS]
+    if unknown or not groups:
+        raise ReportError(f"group_by takes a comma-separated list of {', '.join(GROUPS)}")
+    return list(dict.fromkeys(groups))
+
+def _utc(day, tz):
+    # Local midnight of ``day`` as a naive UTC datetime, like the stored times
+    return datetime.combine(day, time(), tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+def day_intervals(report_range, per_day):
+    """[(label, utc start, utc end)]: one per local day, or one for the whole range."""
+    start, end, tz = report_range
+    if not per_day:
+        return [(None, _utc(start, tz), _utc(end + timedelta(days=1), tz))]
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return [(day.isoformat(), _utc(day, tz), _utc(day + timedelta(days=1), tz)) for day in days]
+
+def _days_table(intervals):
+    rows = [select(literal(label, String()).label('day'), literal(starts, DateTime()).label('starts'),
+                   literal(ends, DateTime()).label('ends')) for label, starts, ends in intervals]
+    return (union_all(*rows) if len(rows) > 1 else rows[0]).subquery('days')
+
+def report_query(user_id, report_range, group_by, task_id=None, project_id=None, member_id=None, now=None):
+    """SELECT of one row per group: the group columns, ``seconds``, ``entries`` and ``running``."""
+    now = now or datetime.utcnow()
+    intervals = day_intervals(report_range, 'day' in group_by)
+    range_start, range_end = intervals[0][1], intervals[-1][2]
+    days = _days_table(intervals)
+
+    # The entries overlapping the range, found on the start_time index. A
+    # running timer ends now, or at the cap it will be clamped to when stopped
+    longest = max_entry_hours()
+    finished = case(
+        (TimeEntry.end_time.isnot(None), TimeEntry.end_time),
+        (TimeEntry.start_time < now - timedelta(hours=longest), add_hours(TimeEntry.start_time, longest)),
+        else_=literal(now, DateTime())
+    )
+    entries = select(
+        TimeEntry.id, TimeEntry.task_id, TimeEntry.user_id, TimeEntry.start_time, TimeEntry.end_time,
+        finished.label('finished')
+    ).where(
+        TimeEntry.start_time >= range_start - timedelta(hours=longest),
+        TimeEntry.start_time < range_end,
+        finished > range_start,
+        # Checked per entry: an IN list of the visible tasks would be read
+        # through ix_time_entries_task_id, with each task's whole history
+        visible_clause(Task, TimeEntry.task_id, user_id)
+    )
+    if task_id is not None:
+        entries = entries.where(TimeEntry.task_id == task_id)
+    if member_id is not None:
+        entries = entries.where(TimeEntry.user_id == member_id)
+    # Materialized, so the few matching entries are joined to the days rather
+    # than every day being looked up in time_entries
+    entries = entries.cte('entries').prefix_with('MATERIALIZED', dialect='sqlite').prefix_with(
+        'MATERIALIZED', dialect='postgresql')
+
+    # Each entry clipped to each day it overlaps
+    clipped_start = case((entries.c.start_time > days.c.starts, entries.c.start_time), else_=days.c.starts)
+    clipped_end = case((entries.c.finished < days.c.ends, entries.c.finished), else_=days.c.ends)
+    seconds = func.sum(seconds_between(clipped_start, clipped_end)).label('seconds')
+
+    # Group key first, then its display name
+    columns = {
+        'task': [entries.c.task_id, Task.title.label('task_title')],
+        'project': [Task.project_id, Project.title.label('project_title')],
+        'user': [entries.c.user_id, User.username],
+        'day': [days.c.day],
+    }
+    group_columns = [column for group in group_by for column in columns[group]]
+    query = select(*group_columns, seconds, func.count(entries.c.id).label('entries'),
+                   func.sum(case((entries.c.end_time.is_(None), 1), else_=0)).label('running')
+    ).select_from(entries).join(Task, Task.id == entries.c.task_id).join(
+        days, (entries.c.start_time < days.c.ends) & (entries.c.finished > days.c.starts)
+    )
+    if 'project' in group_by:
+        query = query.outerjoin(Project, Project.id == Task.project_id)
+    if 'user' in group_by:
+        query = query.join(User, User.id == entries.c.user_id)
+    if project_id is not None:
+        query = query.where(Task.project_id == project_id)
+    return query.group_by(*group_columns).order_by(*[columns[group][0] for group in group_by])
+
+def report_row(row):
+    data = dict(row._mapping)
+    data['seconds'] = int(round(data['seconds'] or 0))
+    return data
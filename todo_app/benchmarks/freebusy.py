@@ -0,0 +1,110 @@
+"""Free/busy for 50 users over a month (app/services/freebusy.py).
+
+Seeds a throwaway SQLite database with a calendar history per user (plus
+shared and recurring events), then times ``free_busy`` end to end:
+
+    python benchmarks/freebusy.py --users 1000 --events-per-user 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+HISTORY_START = datetime(2023, 1, 1)
+WINDOW = (datetime(2025, 3, 1), datetime(2025, 4, 1))
+
+
+def seed(conn, users, events_per_user):
+    rng = random.Random(42)
+    history_days = (WINDOW[1] - HISTORY_START).days + 60
+    cur = conn.cursor()
+    cur.executemany('INSERT INTO users (id, username, email) VALUES (?, ?, ?)',
+                    [(u, f'user{u}', f'user{u}@example.com') for u in range(1, users + 1)])
+
+    def events():
+        event_id = 0
+        for user_id in range(1, users + 1):
+            for i in range(events_per_user):
+                event_id += 1
+                start = HISTORY_START + timedelta(days=rng.randrange(history_days),
+                                                  minutes=rng.randrange(8 * 60, 18 * 60, 15))
+                if i % 50 == 0:
+                    # Weekly meeting, open-ended
+                    yield (event_id, start, start + timedelta(hours=1), 'FREQ=WEEKLY', None, user_id)
+                elif i % 10 == 0:
+                    yield (event_id, start, None, None, None, user_id)
+                else:
+                    end = start + timedelta(minutes=rng.choice([15, 30, 60, 90, 120]))
+                    yield (event_id, start, end, None, None, user_id)
+
+    cur.executemany(
+        "INSERT INTO events (id, title, start_date, end_date, all_day, rrule, recurrence_end, user_id, version) "
+        "VALUES (?, 'Event', ?, ?, 0, ?, ?, ?, 1)",
+        ((e[0], e[1].isoformat(' '), e[2].isoformat(' ') if e[2] else None, e[3], e[4], e[5]) for e in events()))
+
+    total_events = users * events_per_user
+    shares = {(rng.randint(1, total_events), rng.randint(1, users)) for _ in range(total_events // 10)}
+    cur.executemany(
+        "INSERT INTO shared_items (item_type, item_id, owner_id, shared_with_id, permission) "
+        "VALUES ('event', ?, 1, ?, 'view')", sorted(shares))
+    conn.commit()
+    return total_events, len(shares)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--events-per-user', type=int, default=1000)
+    parser.add_argument('--lookup-users', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+    from app.services.freebusy import free_busy
+    from app.services.recurrence import expand
+    app = create_app('development')
+
+    try:
+        with app.app_context():
+            db.create_all()
+            conn = db.engine.raw_connection()
+            start = time.perf_counter()
+            events, shares = seed(conn, args.users, args.events_per_user)
+            conn.execute('ANALYZE')
+            conn.close()
+            print(f'Seeded {args.users:,} users, {events:,} events, {shares:,} shares '
+                  f'in {time.perf_counter() - start:.1f}s\n')
+
+            rng = random.Random(7)
+            timings = []
+            for i in range(args.repeat):
+                user_ids = rng.sample(range(1, args.users + 1), args.lookup_users)
+                # Cold expansion cache, so every run pays for recurrence too
+                expand.cache_clear()
+                start = time.perf_counter()
+                busy, free = free_busy(user_ids, *WINDOW, min_length=timedelta(minutes=30))
+                timings.append((time.perf_counter() - start) * 1000)
+                db.session.remove()
+
+            intervals = sum(len(v) for v in busy.values())
+            print(f'{args.lookup_users} users, {WINDOW[0]:%Y-%m-%d} to {WINDOW[1]:%Y-%m-%d}: '
+                  f'{intervals} busy intervals, {len(free)} free slots')
+            print(f'median {statistics.median(timings):.1f} ms, '
+                  f'p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.1f} ms, max {max(timings):.1f} ms')
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Before/after query plans for the hot lookup indexes (migration 5d2f8a91c0e4).
+
+Seeds a throwaway SQLite database (~1M rows by default), then runs the query
+shapes used by app/api/* with and without the indexes declared on the models:
+
+    python benchmarks/index_query_plans.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Share of --rows per table, roughly matching production proportions
+TABLE_SHARES = {
+    'tasks': 0.40,
+    'notifications': 0.20,
+    'shared_items': 0.15,
+    'comments': 0.15,
+    'time_entries': 0.05,
+    'custom_field_values': 0.05,
+}
+
+
+def seed(conn, rows, users=1000):
+    rng = random.Random(42)
+    n = {table: int(rows * share) for table, share in TABLE_SHARES.items()}
+    base = datetime(2025, 1, 1)
+    ts = lambda i: (base + timedelta(seconds=i * 37)).isoformat(' ')
+
+    cur = conn.cursor()
+    cur.executemany('INSERT INTO users (id, username, email) VALUES (?, ?, ?)',
+                    [(u, f'user{u}', f'user{u}@example.com') for u in range(1, users + 1)])
+    projects = users * 5
+    cur.executemany('INSERT INTO projects (id, title, owner_id) VALUES (?, ?, ?)',
+                    [(p, f'Project {p}', rng.randint(1, users)) for p in range(1, projects + 1)])
+    cur.executemany(
+        'INSERT INTO tasks (id, title, status, priority, created_at, user_id, project_id, parent_id) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [(t, f'Task {t}', rng.choice(['pending', 'in_progress', 'completed']), rng.randint(1, 4), ts(t),
+          rng.randint(1, users), rng.randint(1, projects) if t % 3 else None,
+          rng.randint(1, t - 1) if t > 1 and t % 4 == 0 else None)
+         for t in range(1, n['tasks'] + 1)])
+
+    shares = {(rng.randint(1, n['tasks']), rng.randint(1, users)) for _ in range(n['shared_items'])}
+    cur.executemany(
+        'INSERT INTO shared_items (item_type, item_id, owner_id, shared_with_id, permission) VALUES (?, ?, ?, ?, ?)',
+        [('todo', task_id, 1, user_id, rng.choice(['view', 'edit'])) for task_id, user_id in shares])
+    cur.executemany('INSERT INTO notifications (message, is_read, created_at, user_id) VALUES (?, ?, ?, ?)',
+                    [('ping', i % 2, ts(i), rng.randint(1, users)) for i in range(n['notifications'])])
+    cur.executemany('INSERT INTO comments (content, created_at, user_id, task_id) VALUES (?, ?, ?, ?)',
+                    [('comment', ts(i), rng.randint(1, users), rng.randint(1, n['tasks']))
+                     for i in range(n['comments'])])
+    cur.executemany(
+        'INSERT INTO time_entries (task_id, user_id, start_time, end_time, duration) VALUES (?, ?, ?, ?, ?)',
+        [(rng.randint(1, n['tasks']), rng.randint(1, users), ts(i), ts(i + 10) if i % 50 else None, 370)
+         for i in range(n['time_entries'])])
+
+    definitions = users
+    cur.executemany('INSERT INTO custom_field_definitions (id, name, field_type, user_id) VALUES (?, ?, ?, ?)',
+                    [(d, f'Field {d}', 'number', d) for d in range(1, definitions + 1)])
+    values = {(rng.randint(1, n['tasks']), rng.randint(1, definitions)) for _ in range(n['custom_field_values'])}
+    cur.executemany('INSERT INTO custom_field_values (task_id, field_definition_id, value) VALUES (?, ?, ?)',
+                    [(task_id, def_id, '3') for task_id, def_id in values])
+    conn.commit()
+    return sum(n.values()) + users + projects + definitions
+
+
+def hot_queries():
+    from app import db
+    from app.models import Comment, CustomFieldValue, Notification, SharedItem, Task, TimeEntry
+    from app.services.access import visible_query
+
+    user_id, task_id = 17, 4242
+    return {
+        'tasks: visible page (own + shared)': visible_query(Task, user_id).order_by(
+            Task.created_at.desc(), Task.id.desc()).limit(50),
+        'tasks: subtasks of parent': Task.query.filter_by(parent_id=task_id),
+        'tasks: by project': Task.query.filter_by(project_id=123),
+        'shared_items: share lookup': SharedItem.query.filter_by(
+            item_type='todo', item_id=task_id, shared_with_id=user_id),
+        'notifications: user feed': Notification.query.filter_by(user_id=user_id).order_by(
+            Notification.created_at.desc()),
+        'comments: task thread': Comment.query.filter_by(task_id=task_id).order_by(Comment.created_at.desc()),
+        'time_entries: running timer': TimeEntry.query.filter_by(user_id=user_id, end_time=None),
+        'custom_field_values: upsert lookup': CustomFieldValue.query.filter_by(
+            task_id=task_id, field_definition_id=5),
+    }
+
+
+def measure(conn, queries, repeat):
+    from app import db
+    results = {}
+    for name, query in queries.items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = '; '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = (statistics.median(timings), plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+    app = create_app('development')
+
+    try:
+        with app.app_context():
+            db.create_all()
+            indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+            for index in indexes:
+                index.drop(db.engine)
+
+            conn = db.engine.raw_connection()
+            start = time.perf_counter()
+            total = seed(conn, args.rows)
+            print(f'Seeded {total:,} rows in {time.perf_counter() - start:.1f}s\n')
+
+            queries = hot_queries()
+            conn.execute('ANALYZE')
+            before = measure(conn, queries, args.repeat)
+
+            start = time.perf_counter()
+            for index in indexes:
+                index.create(db.engine)
+            conn.execute('ANALYZE')
+            print(f'Created {len(indexes)} indexes in {time.perf_counter() - start:.1f}s\n')
+            after = measure(conn, queries, args.repeat)
+            conn.close()
+
+        print('| query | before (ms) | after (ms) | plan before | plan after |')
+        print('|---|---:|---:|---|---|')
+        for name in queries:
+            (t0, p0), (t1, p1) = before[name], after[name]
+            print(f'| {name} | {t0:.2f} | {t1:.2f} | {p0} | {p1} |')
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
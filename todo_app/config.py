@@ -5,6 +5,44 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/uploads/avatars')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024 # 16MB max
+    API_MAX_PAGE_SIZE = 500 # Upper bound for ?limit= on paginated endpoints
+    NOTIFICATIONS_PAGE_SIZE = 50 # /api/notifications page size without ?limit=
+    TASK_BATCH_MAX_OPERATIONS = 500
+    CUSTOM_FIELD_BATCH_MAX_VALUES = 1000 # Per custom field batch write or bulk read
+    CUSTOM_FIELD_CACHE_SIZE = 1024 # Users whose custom field definitions are cached per process
+    TASK_TREE_MAX_DEPTH = 50 # Deepest level returned by subtree queries, also bounds parent_id cycles
+    TASK_RANK_REBALANCE_LENGTH = 24 # Longer Task.order keys trigger a background respread
+    DEPENDENCY_GRAPH_CACHE_SIZE = 256 # Project dependency graphs kept per process
+    EVENT_MOVE_MAX_EVENTS = 500 # Per POST /api/events/move
+    FREEBUSY_MAX_USERS = 100
+    FREEBUSY_MAX_DAYS = 62
+    FREEBUSY_DEFAULT_EVENT_MINUTES = 30 # Length assumed for timed events without an end
+    TIME_REPORT_MAX_DAYS = 366 # Longest range of GET /api/time/report
+    TIME_ENTRY_MAX_HOURS = 168 # Stopped timers are clamped to this length, reports rely on it (see flask time-clamp-entries)
+    RECURRENCE_MAX_OCCURRENCES = 1000 # Per recurring event and GET /api/events window
+    SYNC_CURSOR_OVERLAP = 5 # Seconds re-sent on every sync to cover in-flight transactions
+
+    # Notification streaming (Server-Sent Events)
+    PUBSUB_BACKEND = os.environ.get('PUBSUB_BACKEND') or 'app.services.pubsub.InMemoryBroker'
+    PUBSUB_QUEUE_SIZE = 100 # Messages buffered per open stream
+    SSE_KEEPALIVE = 15 # Seconds between keepalive comments
+    SSE_MAX_DURATION = 300 # Streams are closed after this long, EventSource reconnects
+
+    # Background dispatch (app/services/dispatch.py)
+    DISPATCH_SYNC = False # Run jobs inline instead of on worker threads
+    DISPATCH_WORKERS = 1
+    DISPATCH_QUEUE_SIZE = 10000
+
+    # Reminder scheduler (reminder_worker.py)
+    REMINDER_WINDOW = 300 # Seconds of upcoming reminders held in memory
+    REMINDER_BATCH_SIZE = 1000 # Max reminders loaded per window
+    REMINDER_POLL_INTERVAL = 30 # Longest sleep between checks
+
+    MAX_MENTIONS_PER_COMMENT = 100
+    USERNAME_CACHE_SIZE = 10000
+
+    # Process-wide cache counters (GET /api/custom-fields/cache), always on with DEBUG
+    CACHE_STATS_ENABLED = os.environ.get('CACHE_STATS_ENABLED') == '1'
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -17,6 +55,7 @@ class ProductionConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    DISPATCH_SYNC = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
 
 config = {
@@ -0,0 +1,24 @@
+"""Add time entry start_time index for reports
+
+Revision ID: 08d36de8515e
+Revises: 469946b92b20
+Create Date: 2026-10-17 22:44:00.610707
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '08d36de8515e'
+down_revision = '469946b92b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_time_entries_start_time', 'time_entries', ['start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_time_entries_start_time', table_name='time_entries')
@@ -0,0 +1,90 @@
+"""Store task order as fractional rank keys
+
+Revision ID: 0ea99f0eabc5
+Revises: 5a014ea62a26
+Create Date: 2026-10-17 22:26:48.147086
+
+"""
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ea99f0eabc5'
+down_revision = '5a014ea62a26'
+branch_labels = None
+depends_on = None
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+tasks = sa.table('tasks', sa.column('id', sa.Integer), sa.column('parent_id', sa.Integer),
+                 sa.column('user_id', sa.Integer), sa.column('order', sa.String))
+
+
+def spread_ranks(count):
+    # Same keys as app.services.ranking.spread_ranks
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    keys = []
+    for i in range(1, count + 1):
+        value = i * len(DIGITS) ** width // (count + 1)
+        digits = ''
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits = DIGITS[digit] + digits
+        keys.append(digits.rstrip('0'))
+    return keys
+
+
+def sibling_groups(rows, key):
+    # Top-level tasks are siblings per owner
+    groups = defaultdict(list)
+    for task_id, parent_id, user_id, order in rows:
+        groups[(parent_id, None if parent_id else user_id)].append((key(order), task_id))
+    return [[task_id for _, task_id in sorted(group)] for group in groups.values()]
+
+
+def write_orders(connection, orders):
+    if orders:
+        connection.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('tid')).values(order=sa.bindparam('rank')), orders)
+
+
+def upgrade():
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(tasks.c.id, tasks.c.parent_id, tasks.c.user_id, tasks.c.order)).all()
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_parent_id')
+        batch_op.alter_column('order', existing_type=sa.Integer(), type_=sa.String(length=64))
+
+    # Old integer order (ties by id) becomes evenly spread keys
+    orders = []
+    for group in sibling_groups(rows, lambda order: int(order or 0)):
+        orders.extend({'tid': task_id, 'rank': rank} for task_id, rank in zip(group, spread_ranks(len(group))))
+    write_orders(connection, orders)
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.alter_column('order', existing_type=sa.String(length=64), nullable=False, server_default='i')
+    op.create_index('ix_tasks_parent_id_order', 'tasks', ['parent_id', 'order'], unique=False)
+    op.create_index('ix_tasks_user_id_top_level_order', 'tasks', ['user_id', 'order'], unique=False,
+                    sqlite_where=sa.text('parent_id IS NULL'), postgresql_where=sa.text('parent_id IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_tasks_user_id_top_level_order', table_name='tasks')
+    op.drop_index('ix_tasks_parent_id_order', table_name='tasks')
+
+    # Back to positions among siblings
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(tasks.c.id, tasks.c.parent_id, tasks.c.user_id, tasks.c.order)).all()
+    write_orders(connection, [{'tid': task_id, 'rank': str(position)}
+                              for group in sibling_groups(rows, lambda order: order)
+                              for position, task_id in enumerate(group)])
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.alter_column('order', existing_type=sa.String(length=64), type_=sa.Integer(),
+                              nullable=True, server_default=None, postgresql_using='"order"::integer')
+        batch_op.create_index('ix_tasks_parent_id', ['parent_id'], unique=False)
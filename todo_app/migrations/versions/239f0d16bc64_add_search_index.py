@@ -0,0 +1,78 @@
+"""Add full-text search index
+
+Revision ID: 239f0d16bc64
+Revises: 5836097bcffc
+Create Date: 2026-10-17 22:33:11.402117
+
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '239f0d16bc64'
+down_revision = '5836097bcffc'
+branch_labels = None
+depends_on = None
+
+# Same documents as app.services.search: doc_id = source_id * 3 + kind
+SOURCES = [
+    'SELECT id * 3, id, title, description FROM tasks',
+    "SELECT id * 3 + 1, task_id, '', content FROM comments WHERE task_id IS NOT NULL",
+    "SELECT id * 3 + 2, task_id, '', content FROM checklist_items",
+]
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [word.lower()[:64] for word in re.findall(r'\w+', text)]
+
+
+def has_fts5(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return 'ENABLE_FTS5' in {row[0] for row in connection.exec_driver_sql('PRAGMA compile_options')}
+
+
+def upgrade():
+    op.create_table('search_postings',
+    sa.Column('term', sa.String(length=64), nullable=False),
+    sa.Column('doc_id', sa.BigInteger(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('term', 'doc_id')
+    )
+    op.create_index('ix_search_postings_doc_id', 'search_postings', ['doc_id'], unique=False)
+
+    connection = op.get_bind()
+    if has_fts5(connection):
+        op.execute("CREATE VIRTUAL TABLE search_fts USING fts5("
+                   "title, body, task_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')")
+        for source in SOURCES:
+            op.execute(f'INSERT INTO search_fts (rowid, task_id, title, body) {source}')
+        return
+
+    postings = sa.table('search_postings', sa.column('term', sa.String), sa.column('doc_id', sa.BigInteger),
+                        sa.column('task_id', sa.Integer), sa.column('weight', sa.Float))
+    for source in SOURCES:
+        rows = []
+        for doc_id, task_id, title, body in connection.exec_driver_sql(source):
+            weights = defaultdict(float)
+            for term in tokenize(title):
+                weights[term] += 3.0
+            for term in tokenize(body):
+                weights[term] += 1
+            rows.extend({'term': term, 'doc_id': doc_id, 'task_id': task_id, 'weight': weight}
+                        for term, weight in weights.items())
+        if rows:
+            connection.execute(postings.insert(), rows)
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS search_fts')
+    op.drop_index('ix_search_postings_doc_id', table_name='search_postings')
+    op.drop_table('search_postings')
@@ -0,0 +1,37 @@
+"""Add unread notification counter
+
+Revision ID: 2c7d0e5f3a18
+Revises: 8b41e6c2d7f9
+Create Date: 2026-10-17 14:05:27.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7d0e5f3a18'
+down_revision = '8b41e6c2d7f9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    # Rows from before is_read had a default count as unread; store that, so
+    # the is_read = false filters that keep the counter in step match them
+    op.execute('UPDATE notifications SET is_read = false WHERE is_read IS NULL')
+    op.execute(
+        'UPDATE users SET unread_notifications = '
+        '(SELECT COUNT(*) FROM notifications WHERE notifications.user_id = users.id '
+        'AND notifications.is_read = false)'
+    )
+    op.create_index('ix_notifications_user_id_is_read', 'notifications', ['user_id', 'is_read'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_user_id_is_read', table_name='notifications')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
@@ -0,0 +1,26 @@
+"""Add custom field definition version to users
+
+Revision ID: 469946b92b20
+Revises: f6c59414f7b1
+Create Date: 2026-10-17 22:41:19.731031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '469946b92b20'
+down_revision = 'f6c59414f7b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('custom_fields_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('custom_fields_version')
@@ -0,0 +1,40 @@
+"""Add project stats rollup
+
+Rows are filled in on first read of each project's summary.
+
+Revision ID: 5836097bcffc
+Revises: 0ea99f0eabc5
+Create Date: 2026-10-17 22:29:57.926288
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5836097bcffc'
+down_revision = '0ea99f0eabc5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.Column('pending_count', sa.Integer(), nullable=False),
+    sa.Column('in_progress_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('archived_count', sa.Integer(), nullable=False),
+    sa.Column('tracked_seconds', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    op.drop_index('ix_tasks_project_id', table_name='tasks')
+    op.create_index('ix_tasks_project_id_deadline', 'tasks', ['project_id', 'deadline'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_project_id_deadline', table_name='tasks')
+    op.create_index('ix_tasks_project_id', 'tasks', ['project_id'], unique=False)
+    op.drop_table('project_stats')
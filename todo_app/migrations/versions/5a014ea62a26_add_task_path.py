@@ -0,0 +1,58 @@
+"""Materialize task ancestor paths
+
+Revision ID: 5a014ea62a26
+Revises: 6905c4c94675
+Create Date: 2026-10-17 22:24:51.268276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a014ea62a26'
+down_revision = '6905c4c94675'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=512), server_default='/', nullable=False))
+    op.create_index('ix_tasks_path', 'tasks', ['path'], unique=False)
+
+    # Backfill from parent_id. parent_id was never validated, so a task on a
+    # cycle is detached to the top level
+    tasks = sa.table('tasks', sa.column('id', sa.Integer), sa.column('parent_id', sa.Integer),
+                     sa.column('path', sa.String))
+    connection = op.get_bind()
+    parents = dict(connection.execute(sa.select(tasks.c.id, tasks.c.parent_id)).all())
+    paths = {}
+    detached = set()
+    for task_id in parents:
+        # Walk up to a task with a known path (or the top), then fill in downwards
+        chain = []
+        node = task_id
+        while node in parents and node not in paths:
+            if node in chain:
+                detached.add(chain[-1])
+                parents[chain[-1]] = None
+                break
+            chain.append(node)
+            node = parents[node]
+        for node in reversed(chain):
+            parent = parents[node]
+            paths[node] = f'{paths[parent]}{parent}/' if parent in paths else '/'
+
+    rows = [{'tid': task_id, 'path': path} for task_id, path in paths.items() if path != '/']
+    if rows:
+        connection.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('tid')).values(path=sa.bindparam('path')), rows)
+    if detached:
+        connection.execute(tasks.update().where(tasks.c.id.in_(detached)).values(parent_id=None))
+
+
+def downgrade():
+    op.drop_index('ix_tasks_path', table_name='tasks')
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('path')
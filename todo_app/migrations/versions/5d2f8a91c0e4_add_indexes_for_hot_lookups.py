@@ -0,0 +1,61 @@
+"""Add indexes for hot lookup columns
+
+Revision ID: 5d2f8a91c0e4
+Revises: 0942d618c3ca
+Create Date: 2026-10-17 09:12:41.220315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f8a91c0e4'
+down_revision = '0942d618c3ca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicates left by racing share/upsert requests before making the
+    # pairs unique. The newest row is the one the API last wrote, keep it.
+    op.execute(
+        'DELETE FROM shared_items WHERE id NOT IN '
+        '(SELECT MAX(id) FROM shared_items GROUP BY item_type, item_id, shared_with_id)'
+    )
+    op.execute(
+        'DELETE FROM custom_field_values WHERE id NOT IN '
+        '(SELECT MAX(id) FROM custom_field_values GROUP BY task_id, field_definition_id)'
+    )
+
+    op.create_index('ix_tasks_user_id_created_at', 'tasks', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_tasks_parent_id', 'tasks', ['parent_id'], unique=False)
+    op.create_index('ix_tasks_project_id', 'tasks', ['project_id'], unique=False)
+    op.create_index('ix_checklist_items_task_id', 'checklist_items', ['task_id'], unique=False)
+    op.create_index('ix_task_dependencies_blocked_id', 'task_dependencies', ['blocked_id'], unique=False)
+    op.create_index('ix_shared_items_shared_with_type_item', 'shared_items', ['shared_with_id', 'item_type', 'item_id'], unique=False)
+    op.create_index('uq_shared_items_item_user', 'shared_items', ['item_type', 'item_id', 'shared_with_id'], unique=True)
+    op.create_index('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_comments_task_id_created_at', 'comments', ['task_id', 'created_at'], unique=False)
+    op.create_index('ix_time_entries_user_id_end_time', 'time_entries', ['user_id', 'end_time'], unique=False)
+    op.create_index('ix_time_entries_task_id', 'time_entries', ['task_id'], unique=False)
+    op.create_index('uq_custom_field_values_task_definition', 'custom_field_values', ['task_id', 'field_definition_id'], unique=True)
+    op.create_index('ix_custom_field_definitions_user_id', 'custom_field_definitions', ['user_id'], unique=False)
+    op.create_index('ix_projects_owner_id', 'projects', ['owner_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_projects_owner_id', table_name='projects')
+    op.drop_index('ix_custom_field_definitions_user_id', table_name='custom_field_definitions')
+    op.drop_index('uq_custom_field_values_task_definition', table_name='custom_field_values')
+    op.drop_index('ix_time_entries_task_id', table_name='time_entries')
+    op.drop_index('ix_time_entries_user_id_end_time', table_name='time_entries')
+    op.drop_index('ix_comments_task_id_created_at', table_name='comments')
+    op.drop_index('ix_notifications_user_id_created_at', table_name='notifications')
+    op.drop_index('uq_shared_items_item_user', table_name='shared_items')
+    op.drop_index('ix_shared_items_shared_with_type_item', table_name='shared_items')
+    op.drop_index('ix_task_dependencies_blocked_id', table_name='task_dependencies')
+    op.drop_index('ix_checklist_items_task_id', table_name='checklist_items')
+    op.drop_index('ix_tasks_project_id', table_name='tasks')
+    op.drop_index('ix_tasks_parent_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_created_at', table_name='tasks')
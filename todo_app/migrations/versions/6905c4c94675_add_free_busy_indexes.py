@@ -0,0 +1,27 @@
+"""Add event indexes for free/busy lookups
+
+Revision ID: 6905c4c94675
+Revises: cf6995e92435
+Create Date: 2026-10-17 22:19:04.739985
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6905c4c94675'
+down_revision = 'cf6995e92435'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_events_user_id_end_date_start_date', 'events', ['user_id', 'end_date', 'start_date'], unique=False)
+    op.create_index('ix_events_user_id_recurring', 'events', ['user_id', 'start_date'], unique=False,
+                    sqlite_where=sa.text('rrule IS NOT NULL'), postgresql_where=sa.text('rrule IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_events_user_id_recurring', table_name='events')
+    op.drop_index('ix_events_user_id_end_date_start_date', table_name='events')
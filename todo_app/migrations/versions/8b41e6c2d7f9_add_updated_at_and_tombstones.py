@@ -0,0 +1,60 @@
+"""Add updated_at columns and tombstones for incremental sync
+
+Revision ID: 8b41e6c2d7f9
+Revises: 5d2f8a91c0e4
+Create Date: 2026-10-17 11:40:03.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e6c2d7f9'
+down_revision = '5d2f8a91c0e4'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ['tasks', 'events', 'comments', 'checklist_items', 'shared_items']
+
+
+def upgrade():
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('item_type', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_user_id_deleted_at', 'tombstones', ['user_id', 'deleted_at'], unique=False)
+
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing rows count as last modified when they were created
+        op.execute(f'UPDATE {table} SET updated_at = created_at')
+
+    op.create_index('ix_tasks_user_id_updated_at', 'tasks', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_events_user_id_updated_at', 'events', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_comments_updated_at', 'comments', ['updated_at'], unique=False)
+    op.create_index('ix_checklist_items_updated_at', 'checklist_items', ['updated_at'], unique=False)
+    op.create_index('ix_shared_items_shared_with_updated_at', 'shared_items', ['shared_with_id', 'updated_at'], unique=False)
+    op.create_index('ix_shared_items_owner_updated_at', 'shared_items', ['owner_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shared_items_owner_updated_at', table_name='shared_items')
+    op.drop_index('ix_shared_items_shared_with_updated_at', table_name='shared_items')
+    op.drop_index('ix_checklist_items_updated_at', table_name='checklist_items')
+    op.drop_index('ix_comments_updated_at', table_name='comments')
+    op.drop_index('ix_events_user_id_updated_at', table_name='events')
+    op.drop_index('ix_tasks_user_id_updated_at', table_name='tasks')
+
+    for table in reversed(SYNCED_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+
+    op.drop_index('ix_tombstones_user_id_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
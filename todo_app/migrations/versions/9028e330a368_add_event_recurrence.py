@@ -0,0 +1,44 @@
+"""Add recurrence rules and per-occurrence exceptions to events
+
+Revision ID: 9028e330a368
+Revises: 96c5b12b5ed7
+Create Date: 2026-10-17 22:05:56.310773
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9028e330a368'
+down_revision = '96c5b12b5ed7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rrule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+
+    op.create_table('event_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('original_start', sa.DateTime(), nullable=False),
+    sa.Column('cancelled', sa.Boolean(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('end_date', sa.DateTime(), nullable=True),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_event_exceptions_event_original_start', 'event_exceptions', ['event_id', 'original_start'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_event_exceptions_event_original_start', table_name='event_exceptions')
+    op.drop_table('event_exceptions')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('recurrence_end')
+        batch_op.drop_column('rrule')
@@ -0,0 +1,24 @@
+"""Add index for calendar range queries on events
+
+Revision ID: 96c5b12b5ed7
+Revises: 2c7d0e5f3a18
+Create Date: 2026-10-17 22:03:49.501274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '96c5b12b5ed7'
+down_revision = '2c7d0e5f3a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_events_user_id_start_date_end_date', 'events', ['user_id', 'start_date', 'end_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_events_user_id_start_date_end_date', table_name='events')
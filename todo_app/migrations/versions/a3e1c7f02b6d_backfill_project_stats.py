@@ -0,0 +1,49 @@
+"""Backfill project stats rollup rows
+
+Rows used to be built on the first summary read. New projects now get
+theirs when they are created, so build the rows of existing projects here.
+
+Revision ID: a3e1c7f02b6d
+Revises: 08d36de8515e
+Create Date: 2026-10-18 09:12:41.228064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e1c7f02b6d'
+down_revision = '08d36de8515e'
+branch_labels = None
+depends_on = None
+
+
+def _count(condition='1 = 1'):
+    return f'(SELECT COUNT(*) FROM tasks WHERE tasks.project_id = projects.id AND {condition})'
+
+
+def upgrade():
+    # Same rules as app/services/project_stats.py: a NULL status counts as pending
+    counts = [
+        _count(),
+        _count("COALESCE(tasks.status, 'pending') = 'pending'"),
+        _count("tasks.status = 'in_progress'"),
+        _count("tasks.status = 'completed'"),
+        _count("tasks.status = 'archived'"),
+    ]
+    tracked = (
+        '(SELECT COALESCE(SUM(time_entries.duration), 0) FROM time_entries '
+        'JOIN tasks ON tasks.id = time_entries.task_id WHERE tasks.project_id = projects.id)'
+    )
+    op.execute(
+        'INSERT INTO project_stats (project_id, task_count, pending_count, in_progress_count, '
+        'completed_count, archived_count, tracked_seconds) '
+        f"SELECT projects.id, {', '.join(counts)}, {tracked} FROM projects "
+        'WHERE projects.id NOT IN (SELECT project_id FROM project_stats)'
+    )
+
+
+def downgrade():
+    # The rows are still valid without this revision
+    pass
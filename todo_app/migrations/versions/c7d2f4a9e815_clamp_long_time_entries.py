@@ -0,0 +1,58 @@
+"""Clamp time entries to the longest entry length
+
+Stopped timers are now cut at TIME_ENTRY_MAX_HOURS (168 by default) and
+reports only look that far back for entries overlapping a range, so cut
+the longer entries stopped before. Same as ``flask time-clamp-entries``.
+
+Revision ID: c7d2f4a9e815
+Revises: a3e1c7f02b6d
+Create Date: 2026-10-18 14:03:27.519310
+
+"""
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f4a9e815'
+down_revision = 'a3e1c7f02b6d'
+branch_labels = None
+depends_on = None
+
+MAX_HOURS = 168
+
+time_entries = sa.table(
+    'time_entries', sa.column('id', sa.Integer), sa.column('task_id', sa.Integer),
+    sa.column('start_time', sa.DateTime), sa.column('end_time', sa.DateTime), sa.column('duration', sa.Integer)
+)
+
+
+def upgrade():
+    connection = op.get_bind()
+    longest = timedelta(hours=MAX_HOURS)
+    # Done in Python, as date arithmetic differs between databases
+    rows = connection.execute(sa.select(time_entries).where(
+        time_entries.c.end_time.isnot(None),
+        sa.or_(time_entries.c.duration.is_(None), time_entries.c.duration > longest.total_seconds())
+    )).all()
+    clamped = [
+        {'entry_id': row.id, 'end_time': row.start_time + longest, 'duration': int(longest.total_seconds())}
+        for row in rows if row.end_time - row.start_time > longest
+    ]
+    if not clamped:
+        return
+    connection.execute(time_entries.update().where(time_entries.c.id == sa.bindparam('entry_id')).values(
+        end_time=sa.bindparam('end_time', type_=sa.DateTime), duration=sa.bindparam('duration')), clamped)
+
+    # Tracked time of the projects, as in the project stats backfill
+    op.execute(
+        'UPDATE project_stats SET tracked_seconds = (SELECT COALESCE(SUM(time_entries.duration), 0) '
+        'FROM time_entries JOIN tasks ON tasks.id = time_entries.task_id '
+        'WHERE tasks.project_id = project_stats.project_id)'
+    )
+
+
+def downgrade():
+    # The original end times are gone, and the shorter entries are still valid
+    pass
@@ -0,0 +1,26 @@
+"""Add version column to events for optimistic locking
+
+Revision ID: cf6995e92435
+Revises: dc55892902dd
+Create Date: 2026-10-17 22:09:54.225191
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf6995e92435'
+down_revision = 'dc55892902dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,51 @@
+"""Add scheduled reminders to events and link notifications to events
+
+Revision ID: dc55892902dd
+Revises: 9028e330a368
+Create Date: 2026-10-17 22:07:58.019714
+
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dc55892902dd'
+down_revision = '9028e330a368'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('remind_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_events_remind_at', 'events', ['remind_at'], unique=False)
+
+    # Schedule reminders for upcoming one-off events; recurring ones are
+    # scheduled when next saved
+    events = sa.table('events', sa.column('id', sa.Integer), sa.column('start_date', sa.DateTime),
+                      sa.column('reminder', sa.Integer), sa.column('rrule', sa.String),
+                      sa.column('remind_at', sa.DateTime))
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(events.c.id, events.c.start_date, events.c.reminder).where(
+        events.c.reminder > 0, events.c.rrule.is_(None), events.c.start_date > datetime.utcnow())).all()
+    if rows:
+        connection.execute(
+            events.update().where(events.c.id == sa.bindparam('eid')).values(remind_at=sa.bindparam('remind_at')),
+            [{'eid': id, 'remind_at': start - timedelta(minutes=reminder)} for id, start, reminder in rows]
+        )
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_notifications_event_id_events', 'events', ['event_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_notifications_event_id_events', type_='foreignkey')
+        batch_op.drop_column('event_id')
+
+    op.drop_index('ix_events_remind_at', table_name='events')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('remind_at')
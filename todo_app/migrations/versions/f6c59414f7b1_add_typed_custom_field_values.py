@@ -0,0 +1,74 @@
+"""Add typed custom field value columns
+
+Revision ID: f6c59414f7b1
+Revises: 239f0d16bc64
+Create Date: 2026-10-17 22:37:08.149922
+
+"""
+import math
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c59414f7b1'
+down_revision = '239f0d16bc64'
+branch_labels = None
+depends_on = None
+
+
+def parse(field_type, options, value):
+    # Same rules as app.services.custom_fields.parse_typed; unparsable values stay untyped
+    try:
+        if field_type == 'number':
+            number = float(value)
+            return {'number_value': number} if math.isfinite(number) else {}
+        if field_type == 'date':
+            return {'date_value': datetime.fromisoformat(value)}
+        if field_type == 'select':
+            choices = [option.strip() for option in (options or '').split(',') if option.strip()]
+            return {'option_index': choices.index(value.strip())}
+    except ValueError:
+        pass
+    return {}
+
+
+def upgrade():
+    with op.batch_alter_table('custom_field_values', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('number_value', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('date_value', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('option_index', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_custom_field_values_definition_date', ['field_definition_id', 'date_value'], unique=False)
+        batch_op.create_index('ix_custom_field_values_definition_number', ['field_definition_id', 'number_value'], unique=False)
+        batch_op.create_index('ix_custom_field_values_definition_option', ['field_definition_id', 'option_index'], unique=False)
+
+    connection = op.get_bind()
+    values = sa.table('custom_field_values', sa.column('id', sa.Integer), sa.column('number_value', sa.Float),
+                      sa.column('date_value', sa.DateTime), sa.column('option_index', sa.Integer))
+    rows = connection.execute(sa.text(
+        'SELECT v.id, d.field_type, d.options, v.value FROM custom_field_values v '
+        'JOIN custom_field_definitions d ON d.id = v.field_definition_id '
+        "WHERE v.value IS NOT NULL AND d.field_type IN ('number', 'date', 'select')"
+    )).all()
+    updates = {}
+    for value_id, field_type, options, value in rows:
+        typed = parse(field_type, options, value)
+        if typed:
+            updates.setdefault(tuple(typed), []).append({'vid': value_id, **typed})
+    for columns, params in updates.items():
+        connection.execute(
+            values.update().where(values.c.id == sa.bindparam('vid')).values(
+                {column: sa.bindparam(column) for column in columns}),
+            params
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('custom_field_values', schema=None) as batch_op:
+        batch_op.drop_index('ix_custom_field_values_definition_option')
+        batch_op.drop_index('ix_custom_field_values_definition_number')
+        batch_op.drop_index('ix_custom_field_values_definition_date')
+        batch_op.drop_column('option_index')
+        batch_op.drop_column('date_value')
+        batch_op.drop_column('number_value')
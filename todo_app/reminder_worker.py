@@ -0,0 +1,13 @@
+"""Reminder scheduler (app/services/reminders.py), run as its own process:
+
+    python reminder_worker.py
+"""
+import logging
+from app import create_app
+from app.services.reminders import ReminderScheduler
+
+app = create_app('default')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    ReminderScheduler(app).run()
@@ -4,8 +4,11 @@
  */
 
 let events = [];
+let upcomingEvents = [];
 let currentDate = new Date();
 let todosForCalendar = [];
+// The event (or occurrence) open in the edit modal, with the times it was opened with
+let editedEvent = null;
 
 // ==================== Initialization ====================
 
@@ -17,30 +20,55 @@ document.addEventListener('DOMContentLoaded', () => {
 function setupCalendarNavigation() {
     document.getElementById('prev-month')?.addEventListener('click', () => {
         currentDate.setMonth(currentDate.getMonth() - 1);
-        renderCalendar();
+        loadVisibleEvents();
     });
     
     document.getElementById('next-month')?.addEventListener('click', () => {
         currentDate.setMonth(currentDate.getMonth() + 1);
-        renderCalendar();
+        loadVisibleEvents();
     });
     
     document.getElementById('today-btn')?.addEventListener('click', () => {
         currentDate = new Date();
-        renderCalendar();
+        loadVisibleEvents();
     });
 }
 
 // ==================== Load Data ====================
 
+// The 6-week grid shown for currentDate's month, as [start, end)
+function visibleRange() {
+    const firstDay = new Date(currentDate.getFullYear(), currentDate.getMonth(), 1);
+    const start = new Date(firstDay);
+    start.setDate(1 - firstDay.getDay());
+    const end = new Date(start);
+    end.setDate(start.getDate() + 42);
+    return { start, end };
+}
+
+// With a closed range the API only returns events in it, and expands recurring ones
+function eventsUrl(start, end) {
+    const params = new URLSearchParams({
+        start: toLocalDateTimeString(start),
+        end: toLocalDateTimeString(end)
+    });
+    return `/api/events?${params}`;
+}
+
 async function loadCalendarData() {
     try {
-        const [eventsData, todosData] = await Promise.all([
-            apiRequest('/api/events'),
+        const { start, end } = visibleRange();
+        const now = new Date();
+        const upcomingEnd = new Date(now);
+        upcomingEnd.setDate(now.getDate() + 90);
+        const [eventsData, upcomingData, todosData] = await Promise.all([
+            apiRequest(eventsUrl(start, end)),
+            apiRequest(eventsUrl(now, upcomingEnd)),
             apiRequest('/api/todos')
         ]);
         
         events = eventsData;
+        upcomingEvents = upcomingData;
         todosForCalendar = todosData.filter(t => t.deadline);
         
         renderCalendar();
@@ -50,6 +78,16 @@ async function loadCalendarData() {
     }
 }
 
+async function loadVisibleEvents() {
+    try {
+        const { start, end } = visibleRange();
+        events = await apiRequest(eventsUrl(start, end));
+    } catch (error) {
+        console.error('Failed to load events:', error);
+    }
+    renderCalendar();
+}
+
 // ==================== Calendar Rendering ====================
 
 function renderCalendar() {
@@ -108,6 +146,7 @@ function renderCalendar() {
                 const newDateStr = evt.to.parentElement.dataset.date;
                 const itemId = itemEl.dataset.id;
                 const itemType = itemEl.dataset.type;
+                const recurrenceId = itemEl.dataset.recurrenceId;
                 
                 if (evt.from !== evt.to) {
                      // Date changed
@@ -115,7 +154,8 @@ function renderCalendar() {
                          if (itemType === 'event') {
                              // For events we need to keep time or reset? 
                              // Simple approach: set start date to new date, keep time if not allDay
-                             const event = events.find(e => e.id == itemId);
+                             // Occurrences of a series share its id, recurrence_id tells them apart
+                             const event = events.find(e => e.id == itemId && (e.recurrence_id || '') === (recurrenceId || ''));
                              let newStart = newDateStr;
                              if (event && !event.allDay) {
                                  // Append original time
@@ -125,7 +165,20 @@ function renderCalendar() {
                                  newStart = `${newDateStr}T09:00:00`; // Default time
                              }
                              
-                            await apiRequest(`/api/events/${itemId}`, 'PUT', { start: newStart });
+                            if (recurrenceId) {
+                                // Move just this occurrence, as an exception to the series
+                                let newEnd = null;
+                                if (event && event.end) {
+                                    const duration = new Date(event.end) - new Date(event.start);
+                                    newEnd = toLocalDateTimeString(new Date(new Date(newStart).getTime() + duration));
+                                }
+                                await apiRequest(`/api/events/${itemId}/exceptions`, 'POST', {
+                                    original_start: recurrenceId, start: newStart, end: newEnd
+                                });
+                            } else {
+                                // version makes a concurrent edit fail (412) instead of being overwritten
+                                await apiRequest(`/api/events/${itemId}`, 'PUT', { start: newStart, version: event?.version });
+                            }
                          } else if (itemType === 'todo') {
                             await apiRequest(`/api/todos/${itemId}`, 'PUT', { deadline: `${newDateStr}T12:00:00` });
                          }
@@ -168,7 +221,7 @@ function createDayElement(dayNum, date, isOtherMonth, isToday = false) {
     
     allItems.forEach(item => {
         // Add data attributes for Sortable
-        eventsHtml += `<div class="day-event ${item.type}" style="background: ${item.color}" data-id="${item.id}" data-type="${item.type}">${escapeHtml(truncate(item.title, 15))}</div>`;
+        eventsHtml += `<div class="day-event ${item.type}" style="background: ${item.color}" data-id="${item.id}" data-type="${item.type}"${item.recurrence_id ? ` data-recurrence-id="${item.recurrence_id}"` : ''}>${escapeHtml(truncate(item.title, 15))}</div>`;
     });
     
     dayEl.innerHTML = `
@@ -216,7 +269,7 @@ function renderUpcomingEvents() {
     
     // Combine events and todo deadlines
     const allItems = [
-        ...events.map(e => ({
+        ...upcomingEvents.map(e => ({
             ...e,
             type: 'event',
             date: new Date(e.start)
@@ -251,7 +304,7 @@ function renderUpcomingEvents() {
         
         return `
             <div class="event-item" style="border-left-color: ${item.color || '#3498db'}" 
-                 onclick="${item.type === 'event' ? `openEventModal(${item.id})` : `window.location.href='/dashboard'`}">
+                 onclick="${item.type === 'event' ? `openEventModal(${item.id}, null, '${item.recurrence_id || ''}')` : `window.location.href='/dashboard'`}">
                 <div class="event-date">
                     <div class="day">${day}</div>
                     <div class="month">${month}</div>
@@ -301,7 +354,7 @@ function openDayDetail(date, items) {
         content += `<div class="day-events-list">`;
         items.forEach(item => {
             content += `
-                <div class="day-event-item" onclick="${item.type === 'event' ? `closeModal(); setTimeout(() => openEventModal(${item.id}), 100)` : `window.location.href='/dashboard'`}">
+                <div class="day-event-item" onclick="${item.type === 'event' ? `closeModal(); setTimeout(() => openEventModal(${item.id}, null, '${item.recurrence_id || ''}'), 100)` : `window.location.href='/dashboard'`}">
                     <div class="event-color-dot" style="background: ${item.color || '#3498db'}"></div>
                     <div class="day-event-info">
                         <h4>${escapeHtml(item.title)}</h4>
@@ -328,15 +381,19 @@ function openDayDetail(date, items) {
 
 // ==================== Event Modal ====================
 
-function openEventModal(eventId = null, defaultDate = null) {
+function openEventModal(eventId = null, defaultDate = null, recurrenceId = '') {
     const template = document.getElementById('event-form-template');
     const content = template.content.cloneNode(true);
     
     const title = eventId ? 'Edit Event' : 'Add New Event';
     openModal(title, content);
+    editedEvent = null;
     
     if (eventId) {
-        const event = events.find(e => e.id === eventId);
+        // Opened from the upcoming list the event may be outside the visible month.
+        // Occurrences of a series share its id, recurrence_id tells them apart
+        const matches = e => e.id === eventId && (e.recurrence_id || '') === (recurrenceId || '');
+        const event = events.find(matches) || upcomingEvents.find(matches);
         if (event) {
             document.getElementById('event-id').value = event.id;
             document.getElementById('event-title').value = event.title;
@@ -353,6 +410,11 @@ function openEventModal(eventId = null, defaultDate = null) {
             document.getElementById('delete-event-btn').style.display = 'inline-flex';
             
             toggleTimeInputs();
+            editedEvent = {
+                event,
+                start: document.getElementById('event-start').value,
+                end: document.getElementById('event-end').value
+            };
         }
     } else if (defaultDate) {
         const date = new Date(defaultDate);
@@ -385,6 +447,8 @@ async function saveEvent(event) {
     
     let startValue = document.getElementById('event-start').value;
     let endValue = document.getElementById('event-end').value;
+    // An occurrence shows its own times, sending them back would move the whole series
+    const timesChanged = !editedEvent || startValue !== editedEvent.start || endValue !== editedEvent.end;
     
     // If all day, append time
     if (allDay && !startValue.includes('T')) {
@@ -404,8 +468,22 @@ async function saveEvent(event) {
     };
     
     try {
-        if (id) {
-            await apiRequest(`/api/events/${id}`, 'PUT', data);
+        if (id && editedEvent?.event.recurrence_id && timesChanged) {
+            // New times for one occurrence: an exception, the series stays put
+            await apiRequest(`/api/events/${id}/exceptions`, 'POST', {
+                original_start: editedEvent.event.recurrence_id,
+                start: data.start,
+                end: data.end,
+                title: data.title
+            });
+            showNotification('Event updated successfully');
+        } else if (id) {
+            if (!timesChanged) {
+                delete data.start;
+                delete data.end;
+            }
+            // version makes a concurrent edit fail (412) instead of being overwritten
+            await apiRequest(`/api/events/${id}`, 'PUT', { ...data, version: editedEvent?.event.version });
             showNotification('Event updated successfully');
         } else {
             await apiRequest('/api/events', 'POST', data);